@@ -0,0 +1,196 @@
+"""
+Deterministic local stand-in for `litellm.acompletion` and `litellm.aembedding`.
+
+Benchmarks install a `FakeLLM` to measure the orchestration code alone: the
+latency of every call is simulated, responses come from a responder function,
+and embeddings are derived from a hash of the input text.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import struct
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from typing import Any, Optional
+
+import litellm
+
+Responder = Callable[[list[Any], Mapping[str, Any]], str]
+
+
+def create_agent_responder(
+    tool_name: str = "add",
+    arguments: Optional[Mapping[str, Any]] = None,
+    tool_calls_per_turn: int = 2,
+    thought_length: int = 100,
+) -> Responder:
+    """
+    Answer like an agent using the text protocol: call `tool_name`
+    `tool_calls_per_turn` times, then finish the conversation.
+    """
+    if arguments is None:
+        arguments = {"a": 1, "b": 2}
+    thought = ("Let me think about it. " * (thought_length // 23 + 1))[
+        :thought_length
+    ]
+
+    def respond(messages: list[Any], kwargs: Mapping[str, Any]) -> str:
+        if _count_tool_results(messages) < tool_calls_per_turn:
+            return json.dumps(
+                {"thought": thought, "function": tool_name, "arguments": arguments}
+            )
+        return json.dumps(
+            {
+                "thought": thought,
+                "function": "finish_conversation",
+                "arguments": {"final_answer": "The answer is 3"},
+            }
+        )
+
+    return respond
+
+
+class FakeLLM:
+    """
+    Serve completions and embeddings without a network.
+
+    Every completion sleeps `latency` seconds (plus a seeded random `jitter`),
+    and is streamed in chunks of `stream_chunk_size` characters when requested.
+    Every embedding call sleeps `embedding_latency` seconds and returns
+    unit vectors of `embedding_dim` dimensions.
+    """
+
+    def __init__(
+        self,
+        responder: Optional[Responder] = None,
+        latency: float = 0,
+        jitter: float = 0,
+        embedding_latency: float = 0,
+        embedding_dim: int = 384,
+        stream_chunk_size: int = 16,
+        seed: int = 0,
+    ):
+        self._responder = create_agent_responder() if responder is None else responder
+        self._latency = latency
+        self._jitter = jitter
+        self._embedding_latency = embedding_latency
+        self._embedding_dim = embedding_dim
+        self._stream_chunk_size = stream_chunk_size
+        self._random = random.Random(seed)
+        self._stats = {
+            "completions": 0,
+            "embeddings": 0,
+            "embedded_texts": 0,
+            "simulated_latency": 0.0,
+        }
+
+    def get_stats(self) -> Mapping[str, Any]:
+        return dict(self._stats)
+
+    @contextmanager
+    def install(self) -> Iterator["FakeLLM"]:
+        original_acompletion = litellm.acompletion
+        original_aembedding = litellm.aembedding
+        litellm.acompletion = self.acompletion
+        litellm.aembedding = self.aembedding
+        try:
+            yield self
+        finally:
+            litellm.acompletion = original_acompletion
+            litellm.aembedding = original_aembedding
+
+    async def acompletion(
+        self, model: str, messages: list[Any], stream: bool = False, **kwargs: Any
+    ) -> Any:
+        self._stats["completions"] += 1
+        content = self._responder(messages, kwargs)
+        usage = {
+            "prompt_tokens": len(json.dumps(messages, default=str)) // 4,
+            "completion_tokens": len(content) // 4,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if stream:
+            return self._stream(model, content)
+        await self._sleep(self._latency + self._random.uniform(0, self._jitter))
+        return litellm.ModelResponse(
+            model=model,
+            choices=[
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+            usage=usage,
+        )
+
+    async def aembedding(self, model: str, input: list[str], **kwargs: Any) -> Any:
+        self._stats["embeddings"] += 1
+        self._stats["embedded_texts"] += len(input)
+        await self._sleep(self._embedding_latency)
+        return {
+            "object": "list",
+            "model": model,
+            "data": [
+                {"object": "embedding", "index": index, "embedding": self._embed(text)}
+                for index, text in enumerate(input)
+            ],
+            "usage": {"prompt_tokens": sum(len(text) // 4 for text in input)},
+        }
+
+    async def _stream(self, model: str, content: str):
+        chunk_count = max(math.ceil(len(content) / self._stream_chunk_size), 1)
+        # Spread the latency over the chunks, like a real token stream
+        delay = (self._latency + self._random.uniform(0, self._jitter)) / chunk_count
+        for start in range(0, len(content), self._stream_chunk_size):
+            await self._sleep(delay)
+            yield litellm.ModelResponse(
+                model=model,
+                stream=True,
+                choices=[
+                    {
+                        "index": 0,
+                        "delta": {
+                            "role": "assistant",
+                            "content": content[start : start + self._stream_chunk_size],
+                        },
+                    }
+                ],
+            )
+
+    async def _sleep(self, delay: float):
+        self._stats["simulated_latency"] += delay
+        # Still yield to the event loop, as a real network call does
+        await asyncio.sleep(delay)
+
+    def _embed(self, text: str) -> list[float]:
+        vector = []
+        counter = 0
+        seed = text.encode("utf-8")
+        while len(vector) < self._embedding_dim:
+            digest = hashlib.sha256(seed + struct.pack("<I", counter)).digest()
+            vector += [byte / 127.5 - 1 for byte in digest]
+            counter += 1
+        vector = vector[: self._embedding_dim]
+        norm = math.sqrt(sum(value * value for value in vector)) or 1
+        return [value / norm for value in vector]
+
+
+def _count_tool_results(messages: list[Any]) -> int:
+    """Count the tool results since the last message of the human."""
+    count = 0
+    for message in reversed(messages):
+        if message.get("role") != "user":
+            continue
+        try:
+            content = json.loads(message.get("content", ""))
+        except Exception:
+            return count
+        if not isinstance(content, dict) or "type" not in content:
+            return count
+        if content["type"] in ("function_call_ok", "function_call_error"):
+            count += 1
+    return count
@@ -0,0 +1,97 @@
+"""
+Benchmark for the overhead of the agent loop.
+
+Run agent turns against a `FakeLLM`, with and without streaming, and report
+the time spent per iteration outside of the (simulated) LLM latency: prompt
+building, context window fitting, parsing, validation, tool dispatch and
+bookkeeping.
+
+Usage:
+    python benchmarks/agent_loop.py [--turns 50] [--tool-calls 2] [--latency 0]
+"""
+
+import argparse
+import asyncio
+import time
+
+from _fake_llm import FakeLLM, create_agent_responder
+
+from zrb_ollama.agent import Agent, ContextWindow
+
+
+def add(a: int, b: int) -> int:
+    """Add two numbers"""
+    return a + b
+
+
+async def run(
+    turns: int, tool_calls: int, latency: float, stream: bool, thought_length: int
+) -> dict:
+    fake_llm = FakeLLM(
+        responder=create_agent_responder(
+            tool_calls_per_turn=tool_calls, thought_length=thought_length
+        ),
+        latency=latency,
+    )
+    previous_messages = []
+    context_window = ContextWindow()
+    with fake_llm.install():
+        start = time.perf_counter()
+        for _ in range(turns):
+            agent = Agent(
+                model="fake/model",
+                tools=[add],
+                previous_messages=previous_messages,
+                context_window=context_window,
+                stream=stream,
+                print_fn=lambda *_: None,
+            )
+            await agent.add_user_message("What is 1 + 2?")
+            previous_messages = agent.get_previous_messages()
+        elapsed = time.perf_counter() - start
+    iterations = fake_llm.get_stats()["completions"]
+    overhead = elapsed - fake_llm.get_stats()["simulated_latency"]
+    return {
+        "turns": turns,
+        "iterations": iterations,
+        "elapsed": elapsed,
+        "per_turn_ms": elapsed / turns * 1000,
+        "overhead_per_iteration_ms": overhead / iterations * 1000,
+        "iterations_per_second": iterations / elapsed,
+    }
+
+
+def benchmark(
+    turns: int = 50,
+    tool_calls: int = 2,
+    latency: float = 0,
+    thought_length: int = 100,
+) -> dict:
+    return {
+        mode: asyncio.run(
+            run(turns, tool_calls, latency, mode == "stream", thought_length)
+        )
+        for mode in ("complete", "stream")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--tool-calls", type=int, default=2)
+    parser.add_argument("--latency", type=float, default=0)
+    parser.add_argument("--thought-length", type=int, default=100)
+    args = parser.parse_args()
+    results = benchmark(
+        args.turns, args.tool_calls, args.latency, args.thought_length
+    )
+    for name, result in results.items():
+        print(
+            f"{name:>8}: {result['iterations']} iterations, "
+            f"{result['per_turn_ms']:.2f} ms/turn, "
+            f"{result['overhead_per_iteration_ms']:.3f} ms overhead/iteration"
+        )
+
+
+if __name__ == "__main__":
+    main()
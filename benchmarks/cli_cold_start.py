@@ -0,0 +1,79 @@
+"""
+Benchmark for the cold start of the `zrb-ollama` CLI.
+
+Start fresh interpreters that import the package, and that run the CLI until it
+quits on `/bye`, and report the wall time. Use `python -X importtime` to find
+out which module is responsible for a slow start.
+
+Usage:
+    python benchmarks/cli_cold_start.py [--repeat 10]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_COMMANDS = {
+    "import": "import zrb_ollama",
+    "cli": (
+        "import sys; sys.argv = ['zrb-ollama', '/bye']; "
+        "from zrb_ollama.__main__ import prompt; prompt()"
+    ),
+}
+
+
+def measure(code: str, repeat: int, env: dict) -> dict:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", code],
+            env=env,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        durations.append(time.perf_counter() - start)
+    return {
+        "median_ms": statistics.median(durations) * 1000,
+        "min_ms": min(durations) * 1000,
+        "max_ms": max(durations) * 1000,
+    }
+
+
+def benchmark(repeat: int = 10) -> dict:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        env = {
+            **os.environ,
+            # Keep the logs of the benchmark out of the user's history
+            "ZRB_OLLAMA_CONVERSATION_LOG_PATH": os.path.join(temp_dir, "history"),
+            "ZRB_OLLAMA_CONVERSATION_VECTOR_LOG_PATH": os.path.join(
+                temp_dir, "history-vector"
+            ),
+        }
+        baseline = measure("pass", repeat, env)
+        results = {}
+        for name, code in _COMMANDS.items():
+            result = measure(code, repeat, env)
+            result["overhead_ms"] = result["median_ms"] - baseline["median_ms"]
+            results[name] = result
+    return {"python": baseline, **results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    for name, result in benchmark(args.repeat).items():
+        print(
+            f"{name:>8}: median {result['median_ms']:.1f} ms, "
+            f"min {result['min_ms']:.1f} ms, max {result['max_ms']:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark for the latency of interactive conversation turns.
+
+Run turns of the interactive `Conversation` against a `FakeLLM`, so the history
+grows like in a real session, and report the turn latency outside of the
+(simulated) LLM latency.
+
+Usage:
+    python benchmarks/conversation.py [--turns 30] [--tool-calls 1] [--latency 0]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import tempfile
+import time
+
+from _fake_llm import FakeLLM, create_agent_responder
+
+
+async def run(turns: int, tool_calls: int, latency: float) -> dict:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Keep the logs of the benchmark out of the user's history
+        os.environ["ZRB_OLLAMA_CONVERSATION_LOG_PATH"] = os.path.join(
+            temp_dir, "history"
+        )
+        os.environ["ZRB_OLLAMA_CONVERSATION_VECTOR_LOG_PATH"] = os.path.join(
+            temp_dir, "history-vector"
+        )
+        from zrb_ollama.interactive import Conversation
+        from zrb_ollama.tools import calculate
+
+        fake_llm = FakeLLM(
+            responder=create_agent_responder(
+                tool_name="calculate",
+                arguments={"expression": "1 + 2"},
+                tool_calls_per_turn=tool_calls,
+            ),
+            latency=latency,
+        )
+        conversation = Conversation(
+            model="fake/model",
+            should_show_system_prompt=False,
+            enabled_tool_names=["calculate"],
+            available_tools={"calculate": calculate},
+        )
+        latencies = []
+        output = io.StringIO()
+        with (
+            fake_llm.install(),
+            contextlib.redirect_stdout(output),
+            contextlib.redirect_stderr(output),
+        ):
+            for index in range(turns):
+                start = time.perf_counter()
+                await conversation._handle_user_prompt(f"What is 1 + {index}?")
+                latencies.append(time.perf_counter() - start)
+    simulated_latency = fake_llm.get_stats()["simulated_latency"]
+    latencies.sort()
+    return {
+        "turns": turns,
+        "turn_p50_ms": statistics.median(latencies) * 1000,
+        "turn_p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+        "overhead_per_turn_ms": (sum(latencies) - simulated_latency) / turns * 1000,
+    }
+
+
+def benchmark(turns: int = 30, tool_calls: int = 1, latency: float = 0) -> dict:
+    return asyncio.run(run(turns, tool_calls, latency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--tool-calls", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0)
+    args = parser.parse_args()
+    result = benchmark(args.turns, args.tool_calls, args.latency)
+    print(
+        f"{result['turns']} turns, p50 {result['turn_p50_ms']:.2f} ms, "
+        f"p95 {result['turn_p95_ms']:.2f} ms, "
+        f"{result['overhead_per_turn_ms']:.2f} ms overhead/turn"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark for extracting text and links from web pages.
+
+Compare the legacy BeautifulSoup based extraction with the streaming
+`HtmlExtractor` backends (`html.parser` and, if installed, `lxml`) over a corpus
+of saved pages. Pages are fed in chunks, as they are when downloaded. Use
+`--scale` to repeat the page bodies and simulate multi-megabyte pages.
+
+Usage:
+    python benchmarks/html_extraction.py [--repeat 20] [--scale 1] [--max-chars 50000]
+"""  # noqa
+
+import argparse
+import glob
+import importlib.util
+import os
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from zrb_ollama.tools._html import HtmlExtractor
+
+_CURRENT_DIR = os.path.dirname(__file__)
+_CORPUS_PATTERN = os.path.join(_CURRENT_DIR, "corpus", "pages", "*.html")
+_CHUNK_SIZE = 64 * 1024
+_LEGACY_IGNORED_TAG = [
+    "script",
+    "link",
+    "meta",
+    "style",
+    "code",
+    "footer",
+    "nav",
+    "header",
+    "aside",
+]
+
+
+def legacy_extract(html: str, max_chars: int):
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    for anchor in soup.find_all("a"):
+        if not anchor or "href" not in anchor.attrs:
+            continue
+        link: str = anchor["href"]
+        if link.startswith("#") or link.startswith("/"):
+            continue
+        links.append(link)
+    for tag in soup(_LEGACY_IGNORED_TAG):
+        tag.decompose()
+    text = soup.get_text(separator=" ", strip=True)
+    return {"content": text, "links_on_page": links}
+
+
+def create_streaming_extract(parser: str):
+    def extract(html: str, max_chars: int):
+        extractor = HtmlExtractor(max_chars=max_chars, parser=parser)
+        for start in range(0, len(html), _CHUNK_SIZE):
+            extractor.feed(html[start : start + _CHUNK_SIZE])
+            if extractor.is_done():
+                break
+        return extractor.get_content()
+
+    return extract
+
+
+def scale_page(html: str, scale: int) -> str:
+    if scale <= 1:
+        return html
+    body_start = html.index("<body>") + len("<body>")
+    body_end = html.rindex("</body>")
+    return html[:body_start] + html[body_start:body_end] * scale + html[body_end:]
+
+
+def run(extract, corpus: list[str], repeat: int, max_chars: int) -> dict:
+    tracemalloc.start()
+    for html in corpus:
+        extract(html, max_chars)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in corpus:
+            extract(html, max_chars)
+    elapsed = time.perf_counter() - start
+    total_bytes = repeat * sum(len(html.encode("utf-8")) for html in corpus)
+    return {
+        "per_page_ms": elapsed / (repeat * len(corpus)) * 1000,
+        "mb_per_second": total_bytes / elapsed / 1024 / 1024,
+        "peak_memory_mb": peak_memory / 1024 / 1024,
+    }
+
+
+def load_corpus(scale: int = 1) -> list[str]:
+    corpus = []
+    for path in sorted(glob.glob(_CORPUS_PATTERN)):
+        with open(path) as f:
+            corpus.append(scale_page(f.read(), scale))
+    return corpus
+
+
+def benchmark(repeat: int = 20, scale: int = 1, max_chars: int = 50000) -> dict:
+    corpus = load_corpus(scale)
+    extractors = {
+        "legacy": legacy_extract,
+        "html.parser": create_streaming_extract("html.parser"),
+    }
+    if importlib.util.find_spec("lxml") is not None:
+        extractors["lxml"] = create_streaming_extract("lxml")
+    return {
+        name: run(extract, corpus, repeat, max_chars)
+        for name, extract in extractors.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--max-chars", type=int, default=50000)
+    args = parser.parse_args()
+    corpus = load_corpus(args.scale)
+    corpus_size = sum(len(html.encode("utf-8")) for html in corpus)
+    print(f"{len(corpus)} pages, {corpus_size / 1024:.0f} KB")
+    results = benchmark(args.repeat, args.scale, args.max_chars)
+    for name, result in results.items():
+        print(
+            f"{name:>12}: {result['per_page_ms']:.2f} ms/page, "
+            f"{result['mb_per_second']:.1f} MB/s, "
+            f"peak memory {result['peak_memory_mb']:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
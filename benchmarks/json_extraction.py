@@ -0,0 +1,115 @@
+"""
+Micro-benchmark for extracting agent messages from raw LLM responses.
+
+Compare the single-pass scanner used by `Agent` with the legacy three-stage
+cascade (json_repair on the whole response, code fence regex, brace matching)
+over a corpus of real-world model outputs.
+
+Usage:
+    python benchmarks/json_extraction.py [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+
+import json_repair
+
+from zrb_ollama.agent import Agent
+
+_CURRENT_DIR = os.path.dirname(__file__)
+_CORPUS_PATH = os.path.join(_CURRENT_DIR, "corpus", "agent_responses.json")
+_CODE_FENCE_PATTERN = re.compile(r"```(json)?\n({.*?})\n```", re.DOTALL)
+
+
+def legacy_extract(agent: Agent, response_content: str):
+    try:
+        response_map = json_repair.loads(response_content)
+        if agent._is_agent_message(response_map):
+            return response_map
+    except Exception:
+        pass
+    match = _CODE_FENCE_PATTERN.search(response_content)
+    if match:
+        try:
+            response_map = json_repair.loads(match.group(2))
+            if agent._is_agent_message(response_map):
+                return response_map
+        except Exception:
+            pass
+    brace_stack = []
+    json_start, json_end = -1, -1
+    for i, char in enumerate(response_content):
+        if char == "{":
+            if not brace_stack:
+                json_start = i
+            brace_stack.append("{")
+        elif char == "}" and brace_stack:
+            brace_stack.pop()
+            if not brace_stack:
+                json_end = i + 1
+                break
+    if json_start != -1 and json_end != -1:
+        response_map = json_repair.loads(response_content[json_start:json_end])
+        if agent._is_agent_message(response_map):
+            return response_map
+    raise ValueError("No valid JSON object found")
+
+
+def scanner_extract(agent: Agent, response_content: str):
+    return agent._extract_agent_message(response_content)
+
+
+def run(extract, agent: Agent, corpus: list[str], repeat: int) -> dict:
+    success = 0
+    for response_content in corpus:
+        try:
+            extract(agent, response_content)
+            success += 1
+        except Exception:
+            pass
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for response_content in corpus:
+            try:
+                extract(agent, response_content)
+            except Exception:
+                pass
+    elapsed = time.perf_counter() - start
+    total = repeat * len(corpus)
+    return {
+        "success": success,
+        "corpus_size": len(corpus),
+        "elapsed": elapsed,
+        "per_response_us": elapsed / total * 1_000_000,
+        "responses_per_second": total / elapsed,
+    }
+
+
+def benchmark(repeat: int = 200) -> dict:
+    with open(_CORPUS_PATH) as f:
+        corpus = json.load(f)
+    agent = Agent(model="benchmark", print_fn=lambda *_: None)
+    return {
+        "legacy": run(legacy_extract, agent, corpus, repeat),
+        "scanner": run(scanner_extract, agent, corpus, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    results = benchmark(args.repeat)
+    for name, result in results.items():
+        print(
+            f"{name:>8}: {result['success']}/{result['corpus_size']} parsed, "
+            f"{result['per_response_us']:.1f} us/response, "
+            f"{result['responses_per_second']:.0f} responses/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark for RAG indexing and retrieval.
+
+Index synthetic documents with a `FakeLLM` serving the embeddings, then query
+the index. Report indexing throughput (chunks/s) and retrieval latency. Use
+`--embedding-latency` to simulate a remote embedding model. Requires the `rag`
+extra (chromadb).
+
+Usage:
+    python benchmarks/rag.py [--documents 20] [--document-size 20000] [--queries 50]
+"""  # noqa
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from _fake_llm import FakeLLM
+
+from zrb_ollama.tools import EmbeddingCache, create_rag
+
+_WORDS = (
+    "agent model token vector index query document chunk embedding latency "
+    "throughput cache stream parser function result context window prompt "
+    "governor priority batch retry timeout budget memory disk network"
+).split()
+
+
+def create_documents(count: int, size: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    documents = []
+    for _ in range(count):
+        words = []
+        length = 0
+        while length < size:
+            word = rng.choice(_WORDS)
+            words.append(word)
+            length += len(word) + 1
+        documents.append(" ".join(words)[:size])
+    return documents
+
+
+async def run(
+    documents: list[str],
+    queries: int,
+    embedding_latency: float,
+    chunk_size: int,
+    overlap: int,
+) -> dict:
+    fake_llm = FakeLLM(embedding_latency=embedding_latency)
+    with tempfile.TemporaryDirectory() as temp_dir, fake_llm.install():
+        retrieve = create_rag(
+            tool_name="retrieve",
+            tool_description="Retrieve benchmark documents",
+            documents=documents,
+            model="fake/embedding",
+            vector_db_path=os.path.join(temp_dir, "chroma"),
+            chunk_size=chunk_size,
+            overlap=overlap,
+            # A cold cache of its own, so every run embeds every chunk
+            embedding_cache=EmbeddingCache(
+                os.path.join(temp_dir, "embedding-cache.db")
+            ),
+        )
+        # RAG tools report their progress, keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            await retrieve("first query")
+            indexing_elapsed = time.perf_counter() - start
+            chunk_count = fake_llm.get_stats()["embedded_texts"] - 1
+            latencies = []
+            for index in range(queries):
+                start = time.perf_counter()
+                await retrieve(f"{_WORDS[index % len(_WORDS)]} query {index}")
+                latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "chunks": chunk_count,
+        "indexing_elapsed": indexing_elapsed,
+        "chunks_per_second": chunk_count / indexing_elapsed,
+        "retrieval_p50_ms": statistics.median(latencies) * 1000,
+        "retrieval_p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+def benchmark(
+    documents: int = 20,
+    document_size: int = 20000,
+    queries: int = 50,
+    embedding_latency: float = 0,
+    chunk_size: int = 1024,
+    overlap: int = 128,
+) -> dict:
+    if importlib.util.find_spec("chromadb") is None:
+        return {"skipped": "chromadb is not installed"}
+    return asyncio.run(
+        run(
+            create_documents(documents, document_size),
+            queries,
+            embedding_latency,
+            chunk_size,
+            overlap,
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--document-size", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--embedding-latency", type=float, default=0)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--overlap", type=int, default=128)
+    args = parser.parse_args()
+    result = benchmark(
+        args.documents,
+        args.document_size,
+        args.queries,
+        args.embedding_latency,
+        args.chunk_size,
+        args.overlap,
+    )
+    if "skipped" in result:
+        print(f"Skipped: {result['skipped']}")
+        return
+    print(
+        f"Indexing: {result['chunks']} chunks, "
+        f"{result['chunks_per_second']:.0f} chunks/s"
+    )
+    print(
+        f"Retrieval: p50 {result['retrieval_p50_ms']:.2f} ms, "
+        f"p95 {result['retrieval_p95_ms']:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
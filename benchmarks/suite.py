@@ -0,0 +1,169 @@
+"""
+Run the benchmark suite offline and write the results as JSON.
+
+Every benchmark runs against a `FakeLLM`, so the results only depend on the
+orchestration code. Compare the results with a previous run (`--baseline`) to
+catch regressions: throughput metrics (`*_per_second`) should not drop, and
+latency metrics (`*_ms`) should not rise, by more than `--threshold`. With
+`--profile`, every benchmark also runs under cProfile, and the profiles are
+rendered as flame graphs when `flameprof` is installed.
+
+Usage:
+    python benchmarks/suite.py [--quick] [--only agent_loop rag] [--output results.json]
+        [--baseline previous.json] [--threshold 0.1] [--profile profiles]
+"""  # noqa
+
+import argparse
+import cProfile
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+
+import agent_loop
+import cli_cold_start
+import conversation
+import html_extraction
+import json_extraction
+import rag
+
+_CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+_RESULT_DIR = os.path.join(_CURRENT_DIR, "results")
+
+# Benchmarks, and their arguments for a quick run
+BENCHMARKS = {
+    "agent_loop": (agent_loop.benchmark, {"turns": 10}),
+    "json_extraction": (json_extraction.benchmark, {"repeat": 20}),
+    "html_extraction": (html_extraction.benchmark, {"repeat": 2}),
+    "rag": (rag.benchmark, {"documents": 5, "document_size": 10000, "queries": 10}),
+    "conversation": (conversation.benchmark, {"turns": 10}),
+    "cli_cold_start": (cli_cold_start.benchmark, {"repeat": 3}),
+}
+
+
+def run_suite(names: list[str], quick: bool, profile_dir: str = "") -> dict:
+    results = {}
+    for name in names:
+        benchmark, quick_kwargs = BENCHMARKS[name]
+        kwargs = quick_kwargs if quick else {}
+        print(f"Running {name}...", file=sys.stderr)
+        if profile_dir == "":
+            results[name] = benchmark(**kwargs)
+            continue
+        profiler = cProfile.Profile()
+        results[name] = profiler.runcall(benchmark, **kwargs)
+        save_profile(profiler, profile_dir, name)
+    return results
+
+
+def save_profile(profiler: cProfile.Profile, profile_dir: str, name: str):
+    os.makedirs(profile_dir, exist_ok=True)
+    profile_path = os.path.join(profile_dir, f"{name}.prof")
+    profiler.dump_stats(profile_path)
+    flameprof = shutil.which("flameprof")
+    if flameprof is None:
+        print(f"Profile saved to {profile_path}", file=sys.stderr)
+        return
+    svg_path = os.path.join(profile_dir, f"{name}.svg")
+    with open(svg_path, "w") as f:
+        subprocess.run([flameprof, profile_path], stdout=f, check=True)
+    print(f"Flame graph saved to {svg_path}", file=sys.stderr)
+
+
+def get_metadata() -> dict:
+    try:
+        git_commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=_CURRENT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        git_commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": git_commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def flatten_metrics(results: dict, prefix: str = "") -> dict[str, float]:
+    metrics = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten_metrics(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = value
+    return metrics
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print the change of every tracked metric and return the regressions."""
+    metrics = flatten_metrics(results)
+    baseline_metrics = flatten_metrics(baseline)
+    regressions = []
+    for name, value in metrics.items():
+        baseline_value = baseline_metrics.get(name)
+        if not baseline_value:
+            continue
+        if name.endswith("_per_second"):
+            change = (value - baseline_value) / baseline_value
+        elif name.endswith("_ms"):
+            change = (baseline_value - value) / baseline_value
+        else:
+            continue
+        is_regression = change < -threshold
+        marker = "REGRESSION" if is_regression else ""
+        print(
+            f"{name:>60}: {baseline_value:12.3f} -> {value:12.3f} "
+            f"({change:+.1%}) {marker}"
+        )
+        if is_regression:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--output", default="")
+    parser.add_argument("--baseline", default="")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--profile", default="")
+    args = parser.parse_args()
+    names = list(BENCHMARKS) if args.only is None else args.only
+    report = {
+        **get_metadata(),
+        "quick": args.quick,
+        "profiled": args.profile != "",
+        "results": run_suite(names, args.quick, args.profile),
+    }
+    output = args.output
+    if output == "":
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(_RESULT_DIR, f"{timestamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {output}", file=sys.stderr)
+    if args.baseline == "":
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(report["results"], baseline["results"], args.threshold)
+    if len(regressions) > 0:
+        print(f"{len(regressions)} regression(s) found", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
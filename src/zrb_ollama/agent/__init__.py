@@ -1,3 +1,29 @@
 from .agent import Agent
+from .batch_runner import BatchResult, BatchRunner
+from .cassette import Cassette
+from .completion_cache import CompletionCache
+from .context_window import ContextWindow
+from .hooks import AgentHook, MetricsHook
+from .model_pool import LatencyTracker, ModelPool
+from .result_store import ResultStore, create_read_result_tool
+from .tool_cache import ToolCache
+from .tool_config import ToolConfig, get_tool_config, tool_config
+from .tool_executor import ToolExecutor
 
 assert Agent
+assert AgentHook
+assert BatchResult
+assert BatchRunner
+assert Cassette
+assert CompletionCache
+assert ContextWindow
+assert LatencyTracker
+assert MetricsHook
+assert ModelPool
+assert ResultStore
+assert ToolCache
+assert ToolConfig
+assert ToolExecutor
+assert create_read_result_tool
+assert get_tool_config
+assert tool_config
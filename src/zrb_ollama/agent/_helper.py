@@ -33,6 +33,65 @@ def get_metadata_signature(function_data: Mapping[str, Any]) -> str:
     return signature
 
 
+_JSON_SCHEMA_TYPES = {
+    "str": "string",
+    "int": "integer",
+    "float": "number",
+    "bool": "boolean",
+    "list": "array",
+    "tuple": "array",
+    "set": "array",
+    "frozenset": "array",
+    "dict": "object",
+}
+
+
+def get_metadata_tool_schema(function_data: Mapping[str, Any]) -> Mapping[str, Any]:
+    """
+    Convert metadata produced by `extract_metadata` into an OpenAI compatible tool
+    schema, as expected by litellm's `tools` parameter.
+    """
+    properties = {}
+    required = []
+    for arg_name, arg_data in function_data["arguments"].items():
+        properties[arg_name] = _get_annotation_json_schema(arg_data)
+        if arg_data["required"]:
+            required.append(arg_name)
+    return {
+        "type": "function",
+        "function": {
+            "name": function_data["name"],
+            "description": get_metadata_description(function_data),
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": required,
+            },
+        },
+    }
+
+
+def _get_annotation_json_schema(
+    annotation_data: Mapping[str, Any]
+) -> Mapping[str, Any]:
+    annotation_type = annotation_data["type"]
+    schema = {}
+    if annotation_type == "Literal":
+        schema["enum"] = annotation_data["values"]
+    elif annotation_type in _JSON_SCHEMA_TYPES:
+        schema["type"] = _JSON_SCHEMA_TYPES[annotation_type]
+    elements = annotation_data.get("elements", [])
+    if schema.get("type") == "array" and len(elements) > 0:
+        schema["items"] = _get_annotation_json_schema(elements[0])
+    if "value_type" in annotation_data:
+        schema["additionalProperties"] = _get_annotation_json_schema(
+            annotation_data["value_type"]
+        )
+    if annotation_data.get("description"):
+        schema["description"] = annotation_data["description"]
+    return schema
+
+
 def extract_metadata(func):
     """
     Extract metadata from a callable including its name, docstring, parameters,
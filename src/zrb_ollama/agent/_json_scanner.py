@@ -0,0 +1,290 @@
+import bisect
+import json
+import re
+from collections.abc import Callable
+from typing import Any, Optional
+
+import json_repair
+
+_OBJECT_START_PATTERN = re.compile(r"{")
+_TOKEN_PATTERN = re.compile(r'[{}\[\]",:]')
+_BRACE_TOKEN_PATTERN = re.compile(r'[{}\[\]"]')
+_STRING_TOKEN_PATTERN = re.compile(r'["\\]')
+_MAX_REPAIR_CANDIDATE = 3
+_MISSING = object()
+
+
+class JsonScanner:
+    """
+    Incremental, string-aware scanner for the first valid top-level JSON object in
+    a (possibly partial) LLM response.
+
+    Text can be fed chunk by chunk and every character is visited once. Braces
+    inside strings are ignored, so prose, code fences and trailing text around the
+    object do not matter. Objects that are not valid JSON or rejected by `is_valid`
+    are skipped, and the syntactically broken ones are kept as repair candidates.
+    When `track_fields` is set, every top-level field of the current object is
+    available as soon as its value is complete, so the caller does not need to wait
+    for the whole response.
+    """
+
+    def __init__(
+        self,
+        is_valid: Optional[Callable[[Any], bool]] = None,
+        track_fields: bool = True,
+    ):
+        self._is_valid = is_valid
+        self._track_fields = track_fields
+        # Chunks are never concatenated while scanning, positions are absolute
+        self._chunks: list[str] = []
+        self._chunk_starts: list[int] = []
+        self._length = 0
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = -1
+        self._key_start = -1
+        self._key = None
+        self._value_start = -1
+        self._object = None
+        self._is_complete = False
+        self._raw_fields: dict[str, str] = {}
+        self._parsed_fields: dict[str, Any] = {}
+        self._repair_candidates: list[str] = []
+        # Open brackets of the current object, with the complete objects they hold
+        self._frames: list[tuple[int, str, list[tuple[int, int]]]] = []
+
+    def feed(self, chunk: str):
+        if chunk == "":
+            return
+        chunk_start = self._length
+        self._chunks.append(chunk)
+        self._chunk_starts.append(chunk_start)
+        self._length += len(chunk)
+        # Only the new chunk is scanned, tokens are single characters
+        pos = self._pos - chunk_start
+        length = len(chunk)
+        while pos < length and not self._is_complete:
+            if self._in_string:
+                pos = self._scan_string(chunk, chunk_start, pos)
+                continue
+            match = self._get_token_pattern().search(chunk, pos)
+            if match is None:
+                pos = length
+                break
+            pos = match.start()
+            self._handle_token(chunk_start + pos, chunk[pos])
+            pos += 1
+        self._pos = chunk_start + pos
+
+    def get_text(self) -> str:
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+            self._chunk_starts = [0]
+        return self._chunks[0] if self._chunks else ""
+
+    def is_complete(self) -> bool:
+        return self._is_complete
+
+    def get_object(self) -> Any:
+        """Return the first valid object, or None if there is none (yet)."""
+        return self._object
+
+    def get_field(self, name: str, default: Any = None) -> Any:
+        """Return a parsed top-level field, or `default` if it is not complete."""
+        if name not in self._parsed_fields:
+            raw = self._raw_fields.get(name)
+            if raw is None:
+                return default
+            try:
+                self._parsed_fields[name] = json.loads(raw)
+            except Exception:
+                self._parsed_fields[name] = _MISSING
+        value = self._parsed_fields[name]
+        return default if value is _MISSING else value
+
+    def get_repair_candidates(self) -> list[str]:
+        """
+        Return malformed objects worth repairing, including the unterminated ones
+        at the end of the text.
+        """
+        candidates = list(self._repair_candidates)
+        if self._depth > 0:
+            for start, char, _ in self._frames:
+                if len(candidates) >= _MAX_REPAIR_CANDIDATE:
+                    break
+                if char == "{":
+                    candidates.append(self._slice(start, self._length))
+        return candidates
+
+    def get_unterminated_start(self) -> int:
+        """Return where the unterminated object starts, or -1 if there is none."""
+        return self._object_start if self._depth > 0 else -1
+
+    def get_nested_objects(self) -> list[str]:
+        """
+        Return the complete objects found inside the unterminated object, in order.
+        An unbalanced brace in the prose turns the actual object into one of them.
+        """
+        if self._depth == 0:
+            return []
+        positions = sorted(
+            position for _, _, children in self._frames for position in children
+        )
+        return [self._slice(start, end) for start, end in positions]
+
+    def _get_token_pattern(self) -> re.Pattern:
+        if self._depth == 0:
+            return _OBJECT_START_PATTERN
+        if self._track_fields and self._depth == 1:
+            return _TOKEN_PATTERN
+        # Only brackets and strings matter for finding where the object ends
+        return _BRACE_TOKEN_PATTERN
+
+    def _slice(self, start: int, end: int) -> str:
+        index = bisect.bisect_right(self._chunk_starts, start) - 1
+        parts = []
+        while index < len(self._chunks) and self._chunk_starts[index] < end:
+            chunk_start = self._chunk_starts[index]
+            parts.append(
+                self._chunks[index][max(start - chunk_start, 0) : end - chunk_start]
+            )
+            index += 1
+        return "".join(parts)
+
+    def _scan_string(self, chunk: str, chunk_start: int, pos: int) -> int:
+        if self._escape:
+            self._escape = False
+            return pos + 1
+        match = _STRING_TOKEN_PATTERN.search(chunk, pos)
+        if match is None:
+            return len(chunk)
+        pos = match.start()
+        if chunk[pos] == "\\":
+            self._escape = True
+            return pos + 1
+        self._in_string = False
+        if self._track_fields and self._depth == 1:
+            self._on_string_end(chunk_start + pos)
+        return pos + 1
+
+    def _handle_token(self, pos: int, char: str):
+        if self._depth == 0:
+            # Quotes and other tokens outside an object are just prose
+            if char == "{":
+                self._start_object(pos)
+            return
+        if char == '"':
+            self._in_string = True
+            if self._track_fields and self._depth == 1 and self._key is None:
+                self._key_start = pos
+            return
+        if char in "{[":
+            self._depth += 1
+            self._frames.append((pos, char, []))
+            return
+        if char in "}]":
+            self._depth -= 1
+            start, open_char, _ = self._frames.pop()
+            if self._depth == 1:
+                self._end_value(pos + 1)
+            elif self._depth == 0:
+                self._end_value(pos)
+                self._end_object(self._slice(self._object_start, pos + 1))
+                return
+            if open_char == "{" and char == "}":
+                self._frames[-1][2].append((start, pos + 1))
+            return
+        if self._depth != 1:
+            return
+        if char == ":" and self._key is not None and self._value_start == -1:
+            self._value_start = pos + 1
+        elif char == ",":
+            self._end_value(pos)
+
+    def _start_object(self, pos: int):
+        self._depth = 1
+        self._object_start = pos
+        self._key_start = -1
+        self._key = None
+        self._value_start = -1
+        self._raw_fields = {}
+        self._parsed_fields = {}
+        self._frames = [(pos, "{", [])]
+
+    def _end_object(self, raw_object: str):
+        self._frames = []
+        try:
+            candidate = json.loads(raw_object)
+        except Exception:
+            if len(self._repair_candidates) < _MAX_REPAIR_CANDIDATE:
+                self._repair_candidates.append(raw_object)
+            return
+        if self._is_valid is None or self._is_valid(candidate):
+            self._object = candidate
+            self._is_complete = True
+
+    def _on_string_end(self, pos: int):
+        if self._key is None and self._key_start != -1:
+            raw_key = self._slice(self._key_start, pos + 1)
+            try:
+                self._key = json.loads(raw_key)
+            except Exception:
+                self._key = raw_key[1:-1]
+            return
+        if self._value_start != -1:
+            self._end_value(pos + 1)
+
+    def _end_value(self, end: int):
+        if self._key is not None and self._value_start != -1:
+            raw = self._slice(self._value_start, end).strip()
+            if raw != "" and self._key not in self._raw_fields:
+                self._raw_fields[self._key] = raw
+        self._key_start = -1
+        self._key = None
+        self._value_start = -1
+
+
+def extract_json_object(
+    text: str, is_valid: Optional[Callable[[Any], bool]] = None
+) -> tuple[Any, str]:
+    """
+    Find the first valid top-level JSON object in `text`.
+
+    Returns the object and the stage that produced it: `json` when the object was
+    valid as is, or `repair` when it had to be fixed by `json_repair`.
+    Raises ValueError when no valid object can be found.
+    """
+    stripped_text = text.strip()
+    if stripped_text.startswith("{") and stripped_text.endswith("}"):
+        # Fast path for well-behaved models
+        try:
+            json_object = json.loads(stripped_text)
+            if is_valid is None or is_valid(json_object):
+                return json_object, "json"
+        except Exception:
+            pass
+    scanner = JsonScanner(is_valid, track_fields=False)
+    scanner.feed(text)
+    if scanner.is_complete():
+        return scanner.get_object(), "json"
+    repair_candidates = scanner.get_repair_candidates()
+    # An unbalanced brace in the prose may hide the actual object
+    for raw_object in scanner.get_nested_objects():
+        try:
+            json_object = json.loads(raw_object)
+        except Exception:
+            if len(repair_candidates) < _MAX_REPAIR_CANDIDATE:
+                repair_candidates.append(raw_object)
+            continue
+        if is_valid is None or is_valid(json_object):
+            return json_object, "json"
+    for candidate in repair_candidates[:_MAX_REPAIR_CANDIDATE]:
+        try:
+            repaired = json_repair.loads(candidate)
+        except Exception:
+            continue
+        if is_valid is None or is_valid(repaired):
+            return repaired, "repair"
+    raise ValueError("No valid JSON object found")
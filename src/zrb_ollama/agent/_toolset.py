@@ -0,0 +1,232 @@
+import inspect
+import json
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from typing import Annotated, Any
+
+from ._helper import (
+    extract_metadata,
+    get_metadata_description,
+    get_metadata_signature,
+    get_metadata_tool_schema,
+)
+
+_MAX_TOOLSET_CACHE_SIZE = 32
+_MAX_METADATA_CACHE_SIZE = 1024
+_toolset_cache: OrderedDict[tuple, "Toolset"] = OrderedDict()
+_metadata_cache: OrderedDict[tuple, Mapping[str, Any]] = OrderedDict()
+
+
+def finish_conversation(
+    final_answer: Annotated[
+        str, "Final answer containing all necessary information and citations"
+    ]  # noqa
+) -> str:
+    """Ends up conversation with user by providing the final_answer. The final_answer should contains all detailed information and citations."""  # noqa
+    return final_answer
+
+
+class Toolset:
+    """
+    Tool metadata, response format and system messages compiled from a list of
+    tools. A Toolset is immutable, so it is shared by every Agent using the same
+    tools, templates and prompts (see `get_toolset`). It holds no callable, tools
+    created by the same factory share a Toolset (see `get_function_map`).
+    """
+
+    def __init__(
+        self,
+        tools: list[Callable],
+        system_message_template: str,
+        system_prompt: str,
+        json_fixer_system_message_template: str,
+        json_fixer_system_prompt: str,
+        parallel_function_call: bool,
+    ):
+        tools = _get_all_tools(tools)
+        self._function_schemas = {fn.__name__: _get_metadata(fn) for fn in tools}
+        function_signatures = {
+            fn_name: get_metadata_signature(metadata)
+            for fn_name, metadata in self._function_schemas.items()
+        }
+        formatted_function_description = {
+            fn_name: "   \n".join(get_metadata_description(metadata).split("\n"))
+            for fn_name, metadata in self._function_schemas.items()
+        }
+        self._function_md_signature_str = "\n".join(
+            [
+                f"- {signature}\n  {formatted_function_description[fn_name]}"
+                for fn_name, signature in function_signatures.items()
+            ]
+        )
+        self._function_names = [key for key in self._function_schemas]
+        # finish_conversation is not needed, a plain answer ends the conversation
+        self._tool_schemas = [
+            get_metadata_tool_schema(metadata)
+            for fn_name, metadata in self._function_schemas.items()
+            if fn_name != "finish_conversation"
+        ]
+        function_names_str = ", ".join([f"`{key}`" for key in self._function_names])
+        function_call_format = {
+            "function": f"<function name, SHOULD STRICTLY be one of these: {function_names_str}>",  # noqa
+            "arguments": {
+                "<argument-1>": "<value-1>",
+                "<argument-2>": "<value-2>",
+            },
+        }
+        if parallel_function_call:
+            self._response_format = {
+                "thought": "<your plan and reasoning to choose one or more independent actions, finish_conversation should be called alone>",  # noqa
+                "calls": [function_call_format],
+            }
+        else:
+            self._response_format = {
+                "thought": "<your plan and reasoning to choose an action>",
+                **function_call_format,
+            }
+        self._response_schema = self._build_response_schema(parallel_function_call)
+        self._system_message = self._build_system_message(
+            system_message_template, system_prompt
+        )
+        self._json_fixer_system_message = self._build_system_message(
+            json_fixer_system_message_template, json_fixer_system_prompt
+        )
+
+    def get_function_schemas(self) -> Mapping[str, Any]:
+        return self._function_schemas
+
+    def get_function_names(self) -> list[str]:
+        return self._function_names
+
+    def get_tool_schemas(self) -> list[Mapping[str, Any]]:
+        return self._tool_schemas
+
+    def get_response_format(self) -> Mapping[str, Any]:
+        return self._response_format
+
+    def get_response_schema(self) -> Mapping[str, Any]:
+        """JSON schema of a valid response, for backends with constrained decoding"""
+        return self._response_schema
+
+    def get_system_message(self) -> Mapping[str, Any]:
+        return self._system_message
+
+    def get_json_fixer_system_message(self) -> Mapping[str, Any]:
+        return self._json_fixer_system_message
+
+    def _build_response_schema(self, parallel_function_call: bool) -> Mapping[str, Any]:
+        # Backends expect an object at the root, so arguments can't be tied to
+        # their function name
+        function_call_schema = {
+            "type": "object",
+            "properties": {
+                "function": {"type": "string", "enum": self._function_names},
+                "arguments": {
+                    "anyOf": [
+                        get_metadata_tool_schema(metadata)["function"]["parameters"]
+                        for metadata in self._function_schemas.values()
+                    ]
+                },
+            },
+            "required": ["function", "arguments"],
+        }
+        if parallel_function_call:
+            return {
+                "type": "object",
+                "properties": {
+                    "thought": {"type": "string"},
+                    "calls": {
+                        "type": "array",
+                        "items": function_call_schema,
+                        "minItems": 1,
+                    },
+                },
+                "required": ["thought", "calls"],
+            }
+        return {
+            "type": "object",
+            "properties": {
+                "thought": {"type": "string"},
+                **function_call_schema["properties"],
+            },
+            "required": ["thought"] + function_call_schema["required"],
+        }
+
+    def _build_system_message(self, template: str, prompt: str) -> Mapping[str, Any]:
+        return {
+            "role": "system",
+            "content": template.format(
+                system_prompt=prompt,
+                response_format=json.dumps(self._response_format),
+                function_names=", ".join(self._function_names),
+                function_signatures=self._function_md_signature_str,
+                function_schemas=json.dumps(self._function_schemas, indent=2),
+            ),
+        }
+
+
+def get_toolset(
+    tools: list[Callable],
+    system_message_template: str,
+    system_prompt: str,
+    json_fixer_system_message_template: str,
+    json_fixer_system_prompt: str,
+    parallel_function_call: bool,
+) -> Toolset:
+    """Return a memoized Toolset, keyed on the tool metadata and the prompts."""
+    key = (
+        tuple(_get_tool_key(fn) for fn in tools),
+        system_message_template,
+        system_prompt,
+        json_fixer_system_message_template,
+        json_fixer_system_prompt,
+        parallel_function_call,
+    )
+    if key in _toolset_cache:
+        _toolset_cache.move_to_end(key)
+        return _toolset_cache[key]
+    toolset = Toolset(
+        tools=tools,
+        system_message_template=system_message_template,
+        system_prompt=system_prompt,
+        json_fixer_system_message_template=json_fixer_system_message_template,
+        json_fixer_system_prompt=json_fixer_system_prompt,
+        parallel_function_call=parallel_function_call,
+    )
+    _toolset_cache[key] = toolset
+    if len(_toolset_cache) > _MAX_TOOLSET_CACHE_SIZE:
+        _toolset_cache.popitem(last=False)
+    return toolset
+
+
+def get_function_map(tools: list[Callable]) -> Mapping[str, Callable]:
+    """Return the callables of an Agent's tools, built-in tools included."""
+    return {fn.__name__: fn for fn in _get_all_tools(tools)}
+
+
+def _get_all_tools(tools: list[Callable]) -> list[Callable]:
+    return [finish_conversation] + tools
+
+
+def _get_tool_key(fn: Callable) -> tuple:
+    # Tool factories (e.g., `create_rag`) create new callables on every run, so
+    # tools are identified by what they look like to the LLM
+    return (
+        getattr(fn, "__module__", None),
+        getattr(fn, "__qualname__", None),
+        fn.__name__,
+        fn.__doc__,
+        str(inspect.signature(fn)),
+    )
+
+
+def _get_metadata(fn: Callable) -> Mapping[str, Any]:
+    key = _get_tool_key(fn)
+    if key in _metadata_cache:
+        _metadata_cache.move_to_end(key)
+        return _metadata_cache[key]
+    metadata = extract_metadata(fn)
+    _metadata_cache[key] = metadata
+    if len(_metadata_cache) > _MAX_METADATA_CACHE_SIZE:
+        _metadata_cache.popitem(last=False)
+    return metadata
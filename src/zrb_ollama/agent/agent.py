@@ -1,26 +1,47 @@
+import asyncio
 import json
 import os
-import re
 import time
 import traceback
-from collections.abc import Callable, Mapping
-from datetime import date
-from typing import Annotated, Any, Optional
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from typing import Any, Literal, Optional
 
 import json_repair
 import litellm
-from zrb.helper.callable import run_async
 from zrb.helper.typecheck import typechecked
 
 from ..config import (
     DEFAULT_JSON_FIXER_SYSTEM_MESSAGE_TEMPLATE,
     DEFAULT_JSON_FIXER_SYSTEM_PROMPT,
+    DEFAULT_NATIVE_SYSTEM_MESSAGE_TEMPLATE,
     DEFAULT_SYSTEM_MESSAGE_TEMPLATE,
     DEFAULT_SYSTEM_PROMPT,
+    FUNCTION_CALL_BACKEND,
+    JSON_MODE,
     LLM_MODEL,
+    TOOL_RESULT_MAX_LENGTH,
+    TOOL_TIMEOUT,
     SHOULD_SHOW_SYSTEM_PROMPT
 )
-from ._helper import extract_metadata, get_metadata_description, get_metadata_signature
+from ..governor import Priority
+from ..governor import acompletion as governed_acompletion
+from ._json_scanner import JsonScanner, extract_json_object
+from ._toolset import get_function_map, get_toolset
+from .cassette import Cassette, get_default_cassette
+from .completion_cache import CompletionCache, get_default_completion_cache
+from .context_window import ContextWindow
+from .conversation_log import get_conversation_log_writer
+from .hooks import AgentHook
+from .model_pool import ModelPool
+from .result_store import (
+    ResultStore,
+    create_read_result_tool,
+    get_continuation_note,
+)
+from .tool_cache import ToolCache
+from .tool_config import ToolConfig, get_tool_config
+from .tool_executor import ToolExecutor, get_default_tool_executor
 
 
 @typechecked
@@ -33,25 +54,38 @@ class Agent:
         system_prompt: Optional[str] = None,
         json_fixer_system_message_template: Optional[str] = None,
         json_fixer_system_prompt: Optional[str] = None,
-        previous_messages: Optional[list[Any]] = [],
+        previous_messages: Optional[list[Any]] = None,
         tools: list[Callable] = [],
         max_iteration: int = 10,
         should_show_system_prompt: bool = SHOULD_SHOW_SYSTEM_PROMPT,
         should_show_history: bool = False,
         conversation_log_path: Optional[str] = None,
         print_fn: Optional[Callable[[str], Any]] = None,
+        stream: bool = False,
+        parallel_function_call: bool = False,
+        max_concurrent_function_call: int = 4,
+        function_call_backend: Literal["text", "native"] = FUNCTION_CALL_BACKEND,
+        context_window: Optional[ContextWindow] = None,
+        tool_cache: Optional[ToolCache] = None,
+        completion_cache: Optional[CompletionCache] = None,
+        result_store: Optional[ResultStore] = None,
+        tool_executor: Optional[ToolExecutor] = None,
+        priority: Priority = "default",
+        model_pool: Optional[ModelPool] = None,
+        json_mode: Literal["none", "json_object", "json_schema"] = JSON_MODE,
+        hooks: Optional[list[AgentHook]] = None,
+        cassette: Optional[Cassette] = None,
         **kwargs: Mapping[str, Any],
     ):
-        def finish_conversation(
-            final_answer: Annotated[
-                str, "Final answer containing all necessary information and citations"
-            ]  # noqa
-        ) -> str:
-            """Ends up conversation with user by providing the final_answer. The final_answer should contains all detailed information and citations."""  # noqa
-            self._finished = True
-            return final_answer
+        if model is None and model_pool is not None:
+            model = model_pool.get_default_model()
         if model is None:
             model = LLM_MODEL
+        self._is_native_function_call = (
+            function_call_backend == "native" and _supports_function_calling(model)
+        )
+        if system_message_template is None and self._is_native_function_call:
+            system_message_template = DEFAULT_NATIVE_SYSTEM_MESSAGE_TEMPLATE
         if system_message_template is None:
             system_message_template = DEFAULT_SYSTEM_MESSAGE_TEMPLATE
         if system_prompt is None:
@@ -62,62 +96,96 @@ class Agent:
             json_fixer_system_prompt = DEFAULT_JSON_FIXER_SYSTEM_PROMPT
         if previous_messages is None:
             previous_messages = []
+        self._print = print if print_fn is None else print_fn
+        if cassette is not None and (
+            completion_cache is not None or tool_cache is not None
+        ):
+            raise ValueError(
+                "A cassette can't be used with a completion_cache or a tool_cache"
+            )
+        if cassette is None:
+            cassette = get_default_cassette()
+        if cassette is not None:
+            # Every call should reach the cassette, so it can be recorded/replayed
+            if completion_cache is not None or tool_cache is not None:
+                self._print(
+                    "🛑 Cassette is active, completion and tool caches are disabled"
+                )
+            completion_cache = None
+            tool_cache = None
+        elif completion_cache is None:
+            completion_cache = get_default_completion_cache()
+        if result_store is None:
+            result_store = ResultStore()
+        if any(_get_max_result_length(get_tool_config(tool)) > 0 for tool in tools):
+            # Only advertise `read_result` when some results can be truncated
+            tools = tools + [create_read_result_tool(result_store)]
+        if tool_executor is None:
+            tool_executor = get_default_tool_executor()
+        if hooks is None:
+            hooks = []
         self._model = model
-        self._tools = [finish_conversation] + tools
         self._max_iteration = max_iteration
         self._kwargs = kwargs
         self._should_show_system_prompt = should_show_system_prompt
         self._should_show_history = should_show_history
-        self._conversation_log_path = conversation_log_path
-        self._return = ""
-        self._print = print if print_fn is None else print_fn
-        self._function_schemas = {
-            fn.__name__: extract_metadata(fn) for fn in self._tools
-        }
-        self._function_signatures = {
-            fn_name: get_metadata_signature(metadata)
-            for fn_name, metadata in self._function_schemas.items()
-        }
-        formatted_function_description = {
-            fn_name: "   \n".join(get_metadata_description(metadata).split("\n"))
-            for fn_name, metadata in self._function_schemas.items()
-        }
-        self._function_md_signature_str = "\n".join(
-            [
-                f"- {signature}\n  {formatted_function_description[fn_name]}"
-                for fn_name, signature in self._function_signatures.items()
-            ]
+        self._conversation_log_writer = (
+            None
+            if conversation_log_path is None
+            else get_conversation_log_writer(conversation_log_path, self._print)
         )
-        self._function_names = [key for key in self._function_schemas]
-        self._function_map = {fn.__name__: fn for fn in self._tools}
-        function_names_str = ", ".join([f"`{key}`" for key in self._function_names])
-        self._response_format = {
-            "thought": "<your plan and reasoning to choose an action>",
-            "function": f"<function name, SHOULD STRICTLY be one of these: {function_names_str}>",  # noqa
-            "arguments": {
-                "<argument-1>": "<value-1>",
-                "<argument-2>": "<value-2>",
-            },
-        }
-        self._system_message = self._build_system_message(
-            system_message_template, system_prompt
+        self._return = ""
+        self._stream = stream
+        self._parallel_function_call = parallel_function_call
+        self._max_concurrent_function_call = max_concurrent_function_call
+        self._toolset = get_toolset(
+            tools=tools,
+            system_message_template=system_message_template,
+            system_prompt=system_prompt,
+            json_fixer_system_message_template=json_fixer_system_message_template,
+            json_fixer_system_prompt=json_fixer_system_prompt,
+            parallel_function_call=parallel_function_call,
         )
-        self._json_fixer_system_message = self._build_system_message(
-            json_fixer_system_message_template, json_fixer_system_prompt
+        self._function_schemas = self._toolset.get_function_schemas()
+        self._function_names = self._toolset.get_function_names()
+        self._function_map = get_function_map(tools)
+        self._tool_schemas = self._toolset.get_tool_schemas()
+        self._response_format = self._toolset.get_response_format()
+        self._system_message = self._toolset.get_system_message()
+        self._json_fixer_system_message = (
+            self._toolset.get_json_fixer_system_message()
         )
+        self._response_format_kwargs = self._get_response_format_kwargs(json_mode)
+        # Explicit kwargs (e.g., a custom response_format) take precedence
+        self._completion_kwargs = {**self._response_format_kwargs, **kwargs}
+        self._stats = {
+            "completions": 0,
+            "parse_stages": {"json": 0, "repair": 0, "fixer": 0},
+            "parse_failures": 0,
+            "fixer_calls": 0,
+            "fixer_failures": 0,
+        }
         self._previous_messages = previous_messages
+        self._context_window = context_window
+        self._tool_cache = tool_cache
+        self._completion_cache = completion_cache
+        self._result_store = result_store
+        self._tool_executor = tool_executor
+        self._priority = priority
+        self._model_pool = model_pool
+        self._hooks = hooks
+        self._cassette = cassette
+        self._turn_id = ""
+        self._iteration = -1
+        self._turn_start = -1
+        self._turn_start_time = time.time()
+        self._llm_elapsed = None
         self._finished = False
 
-    def _build_system_message(self, template: str, prompt: str) -> Mapping[str, Any]:
+    def get_stats(self) -> Mapping[str, Any]:
         return {
-            "role": "system",
-            "content": template.format(
-                system_prompt=prompt,
-                response_format=json.dumps(self._response_format),
-                function_names=", ".join(self._function_names),
-                function_signatures=self._function_md_signature_str,
-                function_schemas=json.dumps(self._function_schemas, indent=2),
-            ),
+            **self._stats,
+            "parse_stages": dict(self._stats["parse_stages"]),
         }
 
     def get_system_message(self) -> Any:
@@ -127,6 +195,47 @@ class Agent:
         return self._previous_messages
 
     def get_messages(self) -> list[Any]:
+        return self._get_prefix_messages() + self._previous_messages
+
+    def _get_prompt_messages(self) -> list[Any]:
+        if self._context_window is None:
+            return self.get_messages()
+        messages = self._context_window.fit(
+            self._get_prefix_messages(),
+            self._previous_messages,
+            self._model,
+            self._turn_start,
+        )
+        tokens_saved = self._context_window.get_stats()["last_call"]["tokens_saved"]
+        if tokens_saved > 0:
+            self._print(f"✂️ Context window: {tokens_saved} tokens saved")
+        return messages
+
+    def _get_response_format_kwargs(self, json_mode: str) -> Mapping[str, Any]:
+        if self._is_native_function_call or json_mode == "none":
+            return {}
+        if json_mode == "json_object":
+            return {"response_format": {"type": "json_object"}}
+        return {
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "agent_message",
+                    "schema": self._toolset.get_response_schema(),
+                },
+            }
+        }
+
+    def _get_prefix_messages(self) -> list[Any]:
+        if self._is_native_function_call:
+            return [
+                self._system_message,
+                {"role": "user", "content": "Hi"},
+                {
+                    "role": "assistant",
+                    "content": "Hi, I'm a useful assistant, I'm ready to help.",
+                },
+            ]
         return [
             self._system_message,
             {"role": "user", "content": "Hi"},
@@ -142,64 +251,500 @@ class Agent:
                     }
                 ),
             },
-        ] + self._previous_messages
+        ]
 
     async def add_user_message(self, user_message: str) -> list[Any]:
+        self._turn_start = len(self._previous_messages)
+        self._turn_start_time = time.time()
+        self._turn_id = os.urandom(8).hex()
+        self._iteration = -1
+        self._finished = False
+        self._emit("on_turn_start", user_message=user_message)
         self._append_user_message(user_message)
         self._print_system_prompt()
         self._print_previous_messages()
-        for _ in range(self._max_iteration):
-            start = time.time()
-            self._print("🧠 Processing...")
-            response = await litellm.acompletion(
-                model=self._model, messages=self.get_messages(), **self._kwargs
-            )
-            end = time.time()
-            elapsed = end - start
-            response_content = response.choices[0].message.content
-            self._print(f"🤖 LLM Response ({elapsed:.2f} seconds): {response_content}")
-            response_map = None
-            try:
-                response_map = await self._extract_agent_message_with_llm(
-                    user_message, response_content
-                )
-                self._append_agent_message(json.dumps(response_map))
-            except Exception as exc:
-                self._print(f"🛑 Error: {exc}")
-                traceback.print_exc()
-                if response_map is not None:
-                    self._append_agent_message(response_map)
+        result = None
+        error = None
+        try:
+            if self._is_native_function_call:
+                result = await self._run_native_function_call_loop()
+            else:
+                result = await self._run_text_function_call_loop(user_message)
+            return result
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            if self._conversation_log_writer is not None:
+                self._conversation_log_writer.flush()
+            self._emit_turn_end(result, error)
+
+    async def _run_text_function_call_loop(self, user_message: str) -> Any:
+        for iteration in range(self._max_iteration):
+            with self._track_iteration(iteration):
+                start = time.time()
+                self._print("🧠 Processing...")
+                early_call = None
+                if self._stream:
+                    response_content, early_call = (
+                        await self._get_streamed_completion()
+                    )
+                    end = time.time()
+                    elapsed = end - start
+                    self._llm_elapsed = elapsed
+                    self._print(f"🤖 LLM Response ({elapsed:.2f} seconds)")
                 else:
-                    self._append_agent_message(response_content)
-                self._append_format_error(user_message, exc)
-                continue
-            self._print(f"🥝 Extracted Response: {response_map}")
-            function_name = response_map.get("function", "")
-            function_kwargs = response_map.get("arguments", {})
-            result = None
-            try:
-                self._validate_function_call(function_name, function_kwargs)
+                    response = await self._acompletion(
+                        self._get_prompt_messages(), **self._completion_kwargs
+                    )
+                    end = time.time()
+                    elapsed = end - start
+                    self._llm_elapsed = elapsed
+                    response_content = response.choices[0].message.content
+                    self._print(
+                        f"🤖 LLM Response ({elapsed:.2f} seconds): {response_content}"  # noqa
+                    )
+                self._stats["completions"] += 1
+                response_map = None
+                try:
+                    response_map = await self._extract_agent_message_with_llm(
+                        user_message, response_content
+                    )
+                    self._append_agent_message(json.dumps(response_map))
+                except Exception as exc:
+                    self._cancel_early_call(early_call)
+                    self._print(f"🛑 Error: {exc}")
+                    traceback.print_exc()
+                    if response_map is not None:
+                        self._append_agent_message(response_map)
+                    else:
+                        self._append_agent_message(response_content)
+                    self._append_format_error(user_message, exc)
+                    continue
+                self._print(f"🥝 Extracted Response: {response_map}")
+                if "calls" in response_map:
+                    result = await self._handle_function_calls(
+                        user_message, response_map["calls"], early_call
+                    )
+                else:
+                    result = await self._handle_function_call(
+                        user_message,
+                        response_map.get("function", ""),
+                        response_map.get("arguments", {}),
+                        early_call,
+                    )
+                if self._finished:
+                    return result
+        return None
+
+    async def _run_native_function_call_loop(self) -> Any:
+        for iteration in range(self._max_iteration):
+            with self._track_iteration(iteration):
                 start = time.time()
-                result = await self._execute_function(function_name, function_kwargs)
+                self._print("🧠 Processing...")
+                message = await self._get_native_completion_message()
                 end = time.time()
                 elapsed = end - start
-                if self._finished:
-                    self._print(f"✅ Final Result ({elapsed:.2f} seconds)")
-                else:
-                    self._print(f"✅ Result ({elapsed:.2f} seconds): {result}")
-                self._append_function_call_ok(
-                    user_message, function_name, function_kwargs, result
+                self._llm_elapsed = elapsed
+                self._print(
+                    f"🤖 LLM Response ({elapsed:.2f} seconds): {message.content}"
+                )
+                tool_calls = message.tool_calls or []
+                if len(tool_calls) == 0:
+                    self._print("✅ Final Result")
+                    self._append_agent_message(message.content)
+                    return message.content
+                self._append_message(
+                    {
+                        "role": "assistant",
+                        "content": message.content,
+                        "tool_calls": [
+                            {
+                                "id": tool_call.id,
+                                "type": "function",
+                                "function": {
+                                    "name": tool_call.function.name,
+                                    "arguments": tool_call.function.arguments,
+                                },
+                            }
+                            for tool_call in tool_calls
+                        ],
+                    }
+                )
+                await self._handle_native_tool_calls(tool_calls)
+        return None
+
+    async def _get_native_completion_message(self) -> Any:
+        messages = self._get_prompt_messages()
+        kwargs = dict(self._kwargs)
+        if len(self._tool_schemas) > 0:
+            # Providers like OpenAI reject an empty `tools` list
+            kwargs = {"tools": self._tool_schemas, "tool_choice": "auto", **kwargs}
+        if not self._stream:
+            response = await self._acompletion(messages, **kwargs)
+            return response.choices[0].message
+        response = self._get_cached_completion(messages, kwargs)
+        if response is not None:
+            return response.choices[0].message
+        start = time.time()
+        stream = await self._call_llm(messages, stream=True, **kwargs)
+        chunks = []
+        line_printer = _LinePrinter(self._print)
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                content = chunk.choices[0].delta.content
+                if content:
+                    line_printer.feed(content)
+        finally:
+            line_printer.flush()
+        response = litellm.stream_chunk_builder(chunks, messages=messages)
+        self._emit_llm_call(start, response, stream=True)
+        self._set_cached_completion(messages, kwargs, response)
+        return response.choices[0].message
+
+    async def _handle_native_tool_calls(self, tool_calls: list[Any]):
+        function_calls = []
+        call_results = {}
+        for tool_call in tool_calls:
+            function_name = tool_call.function.name
+            try:
+                kwargs = self._json_loads(tool_call.function.arguments or "{}")
+                if not isinstance(kwargs, dict):
+                    raise self._map_to_exception(
+                        {
+                            "error": "INVALID ARGUMENTS",
+                            "details": "The arguments should be a JSON object",
+                            "required_action": "Revise your arguments",
+                        }
+                    )
+                self._validate_function_call(function_name, kwargs)
+                function_calls.append(
+                    {"id": tool_call.id, "function": function_name, "arguments": kwargs}
                 )
             except Exception as exc:
                 self._print(f"🛑 Error: {exc}")
-                traceback.print_exc()
-                self._append_function_call_error(
-                    user_message, function_name, function_kwargs, exc
-                )
+                call_results[tool_call.id] = {"error": self._extract_exception(exc)}
+        start = time.time()
+        for function_call, call_result in zip(
+            function_calls, await self._execute_function_calls(function_calls)
+        ):
+            call_results[function_call["id"]] = call_result
+        end = time.time()
+        elapsed = end - start
+        self._print(f"✅ Result ({elapsed:.2f} seconds): {call_results}")
+        for tool_call in tool_calls:
+            call_result = call_results[tool_call.id]
+            content = (
+                {"result": call_result["result"]}
+                if "result" in call_result
+                else {"error": call_result["error"]}
+            )
+            self._append_tool_message(tool_call.id, tool_call.function.name, content)
+
+    async def _handle_function_call(
+        self,
+        user_message: str,
+        function_name: str,
+        function_kwargs: Mapping[str, Any],
+        early_call: Optional["_EarlyCall"],
+    ) -> Any:
+        result = None
+        try:
+            function_calls = [{"function": function_name, "arguments": function_kwargs}]
+            if early_call is not None and early_call.is_matching(function_calls):
+                start = early_call.start
+                result = await early_call.task
+            else:
+                self._cancel_early_call(early_call)
+                self._validate_function_call(function_name, function_kwargs)
+                start = time.time()
+                result = await self._execute_function(function_name, function_kwargs)
+            if function_name == "finish_conversation":
+                self._finished = True
+            end = time.time()
+            elapsed = end - start
             if self._finished:
-                return result
-        self._finished = False
-        return None
+                self._print(f"✅ Final Result ({elapsed:.2f} seconds)")
+            else:
+                self._print(f"✅ Result ({elapsed:.2f} seconds): {result}")
+            self._append_function_call_ok(
+                user_message, function_name, function_kwargs, result
+            )
+        except Exception as exc:
+            self._print(f"🛑 Error: {exc}")
+            traceback.print_exc()
+            self._append_function_call_error(
+                user_message, function_name, function_kwargs, exc
+            )
+        return result
+
+    async def _handle_function_calls(
+        self,
+        user_message: str,
+        function_calls: list[Mapping[str, Any]],
+        early_call: Optional["_EarlyCall"],
+    ) -> Any:
+        result = None
+        try:
+            if early_call is not None and early_call.is_matching(function_calls):
+                start = early_call.start
+                call_results = await early_call.task
+            else:
+                self._cancel_early_call(early_call)
+                self._validate_function_calls(function_calls)
+                start = time.time()
+                call_results = await self._execute_function_calls(function_calls)
+            end = time.time()
+            elapsed = end - start
+            for call_result in call_results:
+                if (
+                    call_result["function"] == "finish_conversation"
+                    and "result" in call_result
+                ):
+                    result = call_result["result"]
+                    self._finished = True
+            if self._finished:
+                self._print(f"✅ Final Result ({elapsed:.2f} seconds)")
+            else:
+                self._print(f"✅ Result ({elapsed:.2f} seconds): {call_results}")
+            self._append_function_calls_ok(user_message, call_results)
+        except Exception as exc:
+            self._print(f"🛑 Error: {exc}")
+            traceback.print_exc()
+            self._append_function_calls_error(user_message, function_calls, exc)
+        return result
+
+    async def _get_streamed_completion(self) -> tuple[str, Optional["_EarlyCall"]]:
+        messages = self._get_prompt_messages()
+        scanner = JsonScanner(self._is_agent_message)
+        response = self._get_cached_completion(messages, self._completion_kwargs)
+        if response is not None:
+            content = response.choices[0].message.content
+            self._print(content)
+            scanner.feed(content)
+            return scanner.get_text(), self._dispatch_early_call(scanner)
+        start = time.time()
+        stream = await self._call_llm(
+            messages, stream=True, **self._completion_kwargs
+        )
+        chunks = []
+        early_call = None
+        line_printer = _LinePrinter(self._print)
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                content = chunk.choices[0].delta.content
+                if not content:
+                    continue
+                line_printer.feed(content)
+                scanner.feed(content)
+                if early_call is None:
+                    early_call = self._dispatch_early_call(scanner)
+        except BaseException:
+            self._cancel_early_call(early_call)
+            raise
+        finally:
+            line_printer.flush()
+        response = litellm.stream_chunk_builder(chunks, messages=messages)
+        self._emit_llm_call(start, response, stream=True)
+        self._set_cached_completion(messages, self._completion_kwargs, response)
+        return scanner.get_text(), early_call
+
+    async def _acompletion(self, messages: list[Any], **kwargs) -> Any:
+        response = self._get_cached_completion(messages, kwargs)
+        if response is not None:
+            return response
+        response = await self._call_llm(messages, **kwargs)
+        self._set_cached_completion(messages, kwargs, response)
+        return response
+
+    async def _call_llm(self, messages: list[Any], **kwargs) -> Any:
+        start = time.time()
+        is_stream = kwargs.get("stream", False)
+        try:
+            response = await self._request_llm(messages, **kwargs)
+        except Exception as exc:
+            self._emit_llm_call(start, stream=is_stream, error=exc)
+            raise
+        # Streams are reported once they are consumed
+        if not is_stream:
+            self._emit_llm_call(start, response)
+        return response
+
+    async def _request_llm(self, messages: list[Any], **kwargs) -> Any:
+        if self._cassette is not None:
+            return await self._cassette.acompletion(
+                self._send_llm_request, self._model, messages, **kwargs
+            )
+        return await self._send_llm_request(messages, **kwargs)
+
+    async def _send_llm_request(self, messages: list[Any], **kwargs) -> Any:
+        if self._model_pool is not None:
+            return await self._model_pool.acompletion(
+                messages, self._priority, **kwargs
+            )
+        return await governed_acompletion(
+            self._model, messages, self._priority, **kwargs
+        )
+
+    def _get_cached_completion(
+        self, messages: list[Any], kwargs: Mapping[str, Any]
+    ) -> Optional[Any]:
+        if self._completion_cache is None:
+            return None
+        start = time.time()
+        response = self._completion_cache.get(self._model, messages, kwargs)
+        if response is not None:
+            self._print("💾 Using cached LLM response")
+            self._emit_llm_call(start, response, cached=True)
+        return response
+
+    def _set_cached_completion(
+        self, messages: list[Any], kwargs: Mapping[str, Any], response: Any
+    ):
+        if self._completion_cache is None:
+            return
+        self._completion_cache.set(self._model, messages, kwargs, response)
+
+    def _emit(self, event_name: str, **event: Any):
+        if not self._hooks:
+            return
+        event = {
+            "event": event_name,
+            "model": self._model,
+            "turn_id": self._turn_id,
+            "iteration": self._iteration,
+            "time": time.time(),
+            **event,
+        }
+        for hook in self._hooks:
+            try:
+                getattr(hook, event_name)(event)
+            except Exception as exc:
+                self._print(f"🛑 Hook error on {event_name}: {exc}")
+
+    def _emit_turn_end(self, result: Any, error: Optional[BaseException]):
+        if not self._hooks:
+            return
+        status = "finished" if result is not None else "max_iteration"
+        if error is not None:
+            status = "error"
+        self._emit(
+            "on_turn_end",
+            elapsed=time.time() - self._turn_start_time,
+            status=status,
+            error=None if error is None else f"{error!r}",
+        )
+
+    @contextmanager
+    def _track_iteration(self, iteration: int) -> Iterator[None]:
+        self._iteration = iteration
+        if not self._hooks:
+            yield
+            return
+        start = time.time()
+        error = None
+        self._emit("on_iteration_start")
+        try:
+            yield
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._emit(
+                "on_iteration_end",
+                elapsed=time.time() - start,
+                error=None if error is None else f"{error!r}",
+            )
+
+    def _emit_llm_call(
+        self,
+        start: float,
+        response: Any = None,
+        stream: bool = False,
+        cached: bool = False,
+        error: Optional[Exception] = None,
+    ):
+        if not self._hooks:
+            return
+        usage = getattr(response, "usage", None)
+        self._emit(
+            "on_llm_call",
+            elapsed=time.time() - start,
+            stream=stream,
+            cached=cached,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            error=None if error is None else f"{error}",
+        )
+
+    def _emit_tool_call(
+        self,
+        function_name: str,
+        start: float,
+        status: str,
+        error: Optional[Exception] = None,
+    ):
+        if not self._hooks:
+            return
+        self._emit(
+            "on_tool_call",
+            name=function_name,
+            elapsed=time.time() - start,
+            status=status,
+            error=None if error is None else f"{error}",
+        )
+
+    def _dispatch_early_call(self, scanner: JsonScanner) -> Optional["_EarlyCall"]:
+        # Only a complete agent message is final, a partial one may still change
+        agent_message = scanner.get_object()
+        if agent_message is None:
+            return None
+        function_calls = agent_message.get("calls")
+        if function_calls is not None:
+            if not self._is_speculative_function_calls(function_calls):
+                return None
+            self._print("⚡ Dispatching function calls while streaming")
+            task = asyncio.create_task(self._execute_function_calls(function_calls))
+            return _EarlyCall(function_calls, task)
+        function_name = agent_message["function"]
+        function_kwargs = agent_message["arguments"]
+        function_calls = [{"function": function_name, "arguments": function_kwargs}]
+        if not self._is_speculative_function_calls(function_calls):
+            return None
+        self._print(f"⚡ Dispatching `{function_name}` while streaming")
+        task = asyncio.create_task(
+            self._execute_function(function_name, function_kwargs)
+        )
+        return _EarlyCall(function_calls, task)
+
+    def _is_speculative_function_calls(self, function_calls: Any) -> bool:
+        """
+        Whether the calls can run before the response is complete. A call that
+        has already started can't be undone, so only side-effect free tools can.
+        """
+        if len(self._get_function_call_errors(function_calls)) > 0:
+            return False
+        try:
+            self._validate_function_calls(function_calls)
+        except Exception:
+            # Let the regular flow report the error once the response is complete
+            return False
+        for function_call in function_calls:
+            config = get_tool_config(self._function_map[function_call["function"]])
+            if not (config.side_effect_free or config.cacheable):
+                return False
+        return True
+
+    def _cancel_early_call(self, early_call: Optional["_EarlyCall"]):
+        if early_call is None:
+            return
+        if not early_call.task.done():
+            early_call.task.cancel()
+        elif not early_call.task.cancelled():
+            # Mark the outcome as retrieved, the result is discarded anyway
+            early_call.task.exception()
 
     def _print_system_prompt(self):
         if self._should_show_system_prompt:
@@ -215,81 +760,111 @@ class Agent:
 
     def _append_user_message(self, user_message: str):
         self._append_message({"role": "user", "content": user_message})
-        self._write_conversation_log(f"User: {user_message}")
+        self._write_conversation_log("user", "message", user_message)
 
     def _append_agent_message(self, assistant_message: str):
         self._append_message({"role": "assistant", "content": assistant_message})
-        self._write_conversation_log(f"Assistant: {assistant_message}")
+        self._write_conversation_log(
+            "assistant", "message", assistant_message, llm_elapsed=self._llm_elapsed
+        )
 
     def _append_format_error(self, user_message: str, exc: Exception):
-        self._append_message(
-            {
-                "role": "user",
-                "content": json.dumps(
-                    {
-                        "type": "format_error",
-                        "details": "Assistant response is unparseable.",
-                        "error": self._extract_exception(exc),
-                        "original_user_message": user_message,
-                    }
-                ),
-            }
-        )
-        self._write_conversation_log("[ERROR] Invalid message")
+        content = {
+            "type": "format_error",
+            "details": "Assistant response is unparseable.",
+            "error": self._extract_exception(exc),
+            "original_user_message": user_message,
+        }
+        self._append_message({"role": "user", "content": json.dumps(content)})
+        self._write_conversation_log("user", content["type"], content)
 
     def _append_function_call_error(
         self, user_message: str, function: str, arguments: list[str], exc: Exception
     ):
-        self._append_message(
-            {
-                "role": "user",
-                "content": json.dumps(
-                    {
-                        "type": "function_call_error",
-                        "details": "Assistant function call is incorrect.",
-                        "function": function,
-                        "arguments": arguments,
-                        "error": self._extract_exception(exc),
-                        "original_user_message": user_message,
-                    }
-                ),
-            }
-        )
-        self._write_conversation_log("[ERROR] Function call error")
+        content = {
+            "type": "function_call_error",
+            "details": "Assistant function call is incorrect.",
+            "function": function,
+            "arguments": arguments,
+            "error": self._extract_exception(exc),
+            "original_user_message": user_message,
+        }
+        self._append_message({"role": "user", "content": json.dumps(content)})
+        self._write_conversation_log("user", content["type"], content)
 
     def _append_function_call_ok(
         self, user_message: str, function_name: str, arguments: list[str], result: Any
+    ):
+        content = {
+            "type": "function_call_ok",
+            "function": function_name,
+            "arguments": arguments,
+            "result": result,
+            "original_user_message": user_message,
+        }
+        self._append_message({"role": "user", "content": json.dumps(content)})
+        self._write_conversation_log("user", content["type"], content)
+
+    def _append_function_calls_error(
+        self,
+        user_message: str,
+        function_calls: list[Mapping[str, Any]],
+        exc: Exception,
+    ):
+        content = {
+            "type": "function_call_error",
+            "details": "Assistant function calls are incorrect.",
+            "calls": function_calls,
+            "error": self._extract_exception(exc),
+            "original_user_message": user_message,
+        }
+        self._append_message({"role": "user", "content": json.dumps(content)})
+        self._write_conversation_log("user", content["type"], content)
+
+    def _append_function_calls_ok(
+        self, user_message: str, call_results: list[Mapping[str, Any]]
+    ):
+        content = {
+            "type": "function_call_ok",
+            "results": call_results,
+            "original_user_message": user_message,
+        }
+        self._append_message({"role": "user", "content": json.dumps(content)})
+        self._write_conversation_log("user", content["type"], content)
+
+    def _append_tool_message(
+        self, tool_call_id: str, function_name: str, content: Mapping[str, Any]
     ):
         self._append_message(
             {
-                "role": "user",
-                "content": json.dumps(
-                    {
-                        "type": "function_call_ok",
-                        "function": function_name,
-                        "arguments": arguments,
-                        "result": result,
-                        "original_user_message": user_message,
-                    }
-                ),
+                "role": "tool",
+                "tool_call_id": tool_call_id,
+                "name": function_name,
+                "content": json.dumps(content),
             }
         )
-        self._write_conversation_log(f"[SUCCESS] {result}")
+        record_type = "function_call_ok"
+        if "error" in content:
+            record_type = "function_call_error"
+        self._write_conversation_log("tool", record_type, content, name=function_name)
 
     def _append_message(self, message: Any):
         self._previous_messages.append(message)
 
-    def _write_conversation_log(self, message: str):
-        if self._conversation_log_path is None:
+    def _write_conversation_log(
+        self, role: str, record_type: str, content: Any, **kwargs: Any
+    ):
+        if self._conversation_log_writer is None:
             return
-        conversation_log_path = os.path.expanduser(self._conversation_log_path)
-        if not os.path.isdir(conversation_log_path):
-            os.makedirs(conversation_log_path)
-        current_date = date.today()
-        formatted_date = current_date.strftime('%Y-%m-%d')
-        file_name = os.path.join(conversation_log_path, f"{formatted_date}.txt")
-        with open(file_name, "a") as file:
-            file.write(f"{message}\n")
+        self._conversation_log_writer.write(
+            {
+                "role": role,
+                "type": record_type,
+                "content": content,
+                "turn_elapsed": time.time() - self._turn_start_time,
+                **kwargs,
+            }
+        )
 
     def _extract_exception(self, exc: Exception) -> Any:
         exc_str = f"{exc}"
@@ -339,13 +914,79 @@ class Agent:
                 }
             )
 
+    def _validate_function_calls(self, function_calls: list[Mapping[str, Any]]):
+        call_errors = []
+        for index, function_call in enumerate(function_calls):
+            try:
+                self._validate_function_call(
+                    function_call["function"], function_call["arguments"]
+                )
+            except Exception as exc:
+                call_errors.append(
+                    {
+                        "index": index,
+                        "function": function_call["function"],
+                        "error": self._extract_exception(exc),
+                    }
+                )
+        if len(call_errors) > 0:
+            raise self._map_to_exception(
+                {
+                    "error": "INVALID FUNCTION CALLS",
+                    "details": call_errors,
+                    "required_action": "Revise the invalid calls, none of the calls has been executed",  # noqa
+                }
+            )
+
+    async def _execute_function_calls(
+        self, function_calls: list[Mapping[str, Any]]
+    ) -> list[Mapping[str, Any]]:
+        semaphore = asyncio.Semaphore(self._max_concurrent_function_call)
+
+        async def execute(function_call: Mapping[str, Any]) -> Mapping[str, Any]:
+            function_name = function_call["function"]
+            kwargs = function_call["arguments"]
+            call_result = {"function": function_name, "arguments": kwargs}
+            async with semaphore:
+                try:
+                    call_result["result"] = await self._execute_function(
+                        function_name, kwargs
+                    )
+                except Exception as exc:
+                    call_result["error"] = self._extract_exception(exc)
+            return call_result
+
+        return list(
+            await asyncio.gather(*[execute(call) for call in function_calls])
+        )
+
     async def _execute_function(
         self, function_name: str, kwargs: Mapping[str, Any]
     ) -> Any:
+        start = time.time()
+        function = self._function_map[function_name]
+        config = get_tool_config(function)
+        is_cacheable = self._tool_cache is not None and config.cacheable
+        if is_cacheable:
+            is_cached, result = self._tool_cache.get(function_name, kwargs)
+            if is_cached:
+                self._print(f"💾 Using cached result of `{function_name}`")
+                self._emit_tool_call(function_name, start, "cached")
+                return self._apply_result_budget(function_name, result, config)
+        timeout = TOOL_TIMEOUT if config.timeout is None else config.timeout
         try:
-            function_map = self._function_map
-            return await run_async(function_map[function_name], **kwargs)
+            result = await self._run_function(function_name, function, kwargs, timeout)
+        except TimeoutError as exc:
+            self._emit_tool_call(function_name, start, "timeout", exc)
+            raise self._map_to_exception(
+                {
+                    "error": "EXECUTION FAILED",
+                    "details": f"{exc}",
+                    "required_action": "Narrow down your arguments or use another function",  # noqa
+                }
+            )
         except Exception as exc:
+            self._emit_tool_call(function_name, start, "error", exc)
             raise self._map_to_exception(
                 {
                     "error": "EXECUTION FAILED",
@@ -354,19 +995,62 @@ class Agent:
                     "required_action": "Revise your arguments",
                 }
             )
+        self._emit_tool_call(function_name, start, "ok")
+        if is_cacheable:
+            self._tool_cache.set(function_name, kwargs, result, config.cache_ttl)
+        return self._apply_result_budget(function_name, result, config)
+
+    async def _run_function(
+        self,
+        function_name: str,
+        function: Callable,
+        kwargs: Mapping[str, Any],
+        timeout: float,
+    ) -> Any:
+        if self._cassette is None:
+            return await self._tool_executor.run(function, kwargs, timeout)
+        return await self._cassette.run_tool(
+            lambda: self._tool_executor.run(function, kwargs, timeout),
+            function_name,
+            kwargs,
+        )
+
+    def _apply_result_budget(
+        self, function_name: str, result: Any, config: ToolConfig
+    ) -> Any:
+        if function_name in ("finish_conversation", "read_result"):
+            return result
+        max_length = _get_max_result_length(config)
+        if max_length <= 0:
+            return result
+        result_str = (
+            result if isinstance(result, str) else json.dumps(result, default=str)
+        )
+        if len(result_str) <= max_length:
+            return result
+        handle = self._result_store.put(result_str)
+        self._print(
+            f"📦 Result of `{function_name}` is truncated ({len(result_str)} characters)"  # noqa
+        )
+        return result_str[:max_length] + get_continuation_note(
+            handle, 0, max_length, len(result_str)
+        )
 
     async def _extract_agent_message_with_llm(
         self, user_message, response_content
     ) -> Mapping[str, Any]:
         try:
-            response_map = self._extract_agent_message(response_content)
+            response_map, stage = self._parse_agent_message(response_content)
+            self._stats["parse_stages"][stage] += 1
+            self._emit("on_parse", stage=stage)
             return response_map
         except Exception:
+            self._stats["parse_failures"] += 1
+            self._stats["fixer_calls"] += 1
             start = time.time()
             self._print("🛑 Trying to create a valid JSON by using LLM...")
-            response = await litellm.acompletion(
-                model=self._model,
-                messages=[
+            response = await self._acompletion(
+                [
                     self._json_fixer_system_message,
                     {
                         "role": "user",
@@ -380,48 +1064,33 @@ class Agent:
                         ),
                     },
                 ],
+                **self._response_format_kwargs,
             )
             end = time.time()
             elapsed = end - start
             revised_content = response.choices[0].message.content
             self._print(f"Revised content ({elapsed:.2f}): {revised_content}")
-            return self._extract_agent_message(revised_content)
+            try:
+                response_map, _ = self._parse_agent_message(revised_content)
+            except Exception:
+                self._stats["fixer_failures"] += 1
+                self._emit("on_parse", stage="failed")
+                raise
+            self._stats["parse_stages"]["fixer"] += 1
+            self._emit("on_parse", stage="fixer")
+            return response_map
 
     def _extract_agent_message(self, response_content) -> Mapping[str, Any]:
+        response_map, _ = self._parse_agent_message(response_content)
+        return response_map
+
+    def _parse_agent_message(self, response_content) -> tuple[Mapping[str, Any], str]:
         try:
-            response_map = self._json_loads(response_content)
-            self._validate_agent_message(response_map)
-            return response_map
+            response_map, stage = extract_json_object(
+                response_content, self._is_agent_message
+            )
         except Exception:
-            self._print("🛑 Trying to determine JSON by using code delimiters...")
-            json_pattern = re.compile(r"```(json)?\n({.*?})\n```", re.DOTALL)
-            # Search for the pattern in the content
-            match = json_pattern.search(response_content)
-            if match:
-                json_str = match.group(2)
-                # Parse the JSON string to ensure it is valid
-                try:
-                    response_map = self._json_loads(json_str)
-                    self._validate_agent_message(response_map)
-                    return response_map
-                except Exception as e:
-                    self._print(f"🛑 Failed: {e}")
-            else:
-                self._print("🛑 Failed: Not found")
-            # The seemingly working way
-            self._print("🛑 Trying to determine JSON by using matching braces...")
-            json_start, json_end = self._get_json_start_and_end(response_content)
-            if json_start != -1 and json_end != -1:
-                json_str = response_content[json_start:json_end]
-                # Parse the JSON string to ensure it is valid
-                try:
-                    response_map = self._json_loads(json_str)
-                    self._validate_agent_message(response_map)
-                    return response_map
-                except Exception as e:
-                    self._print(f"🛑 Failed: {e}")
-            else:
-                self._print("🛑 Failed: Not found")
+            self._raise_malformed_payload(response_content)
             raise self._map_to_exception(
                 {
                     "error": "MALFORMED RESPONSE",
@@ -430,49 +1099,115 @@ class Agent:
                     "required_action": "Reformat your entire response to match the expected_format",  # noqa
                 }
             )
-
-    def _get_json_start_and_end(self, response_content: str) -> tuple[int, int]:
-        brace_stack = []
-        json_start, json_end = -1, -1
-        for i, char in enumerate(response_content):
-            if char == "{":
-                if not brace_stack:
-                    json_start = i
-                brace_stack.append("{")
-            elif char == "}":
-                if brace_stack:
-                    brace_stack.pop()
-                    if not brace_stack:
-                        json_end = i + 1
-                        break
-        return json_start, json_end
+        if stage != "json":
+            self._print(f"🛑 Response has been fixed by using {stage} stage")
+        return response_map, stage
 
     def _json_loads(self, json_str: str) -> Any:
         return json_repair.loads(json_str)
 
-    def _validate_agent_message(self, json_message: Mapping[str, Any]):
+    def _get_function_call_errors(self, function_calls: Any) -> list[str]:
+        if not isinstance(function_calls, list) or len(function_calls) == 0:
+            return ["The `calls` field is not a non-empty list"]
+        error_details = []
+        for function_call in function_calls:
+            if not isinstance(function_call, dict):
+                error_details.append("Every item of `calls` should be an object")
+                continue
+            if "function" not in function_call:
+                error_details.append("The `function` field is missing")
+            if "function" in function_call and not isinstance(
+                function_call["function"], str
+            ):
+                error_details.append("The `function` field is not a string")
+            if "arguments" not in function_call:
+                error_details.append("The `arguments` field is missing")
+            if "arguments" in function_call and not isinstance(
+                function_call["arguments"], dict
+            ):
+                error_details.append("The `arguments` field is not an object")
+        return error_details
+
+    def _raise_malformed_payload(self, response_content: str):
+        """Explain what is wrong if the response contains a JSON object at all."""
+        scanner = JsonScanner()
+        scanner.feed(response_content)
+        json_message = scanner.get_object()
+        if json_message is None:
+            return
+        raise self._map_to_exception(
+            {
+                "error": "MALFORMED PAYLOAD",
+                "error_message": "The response payload is missing required information or contains invalid data",  # noqa
+                "details": self._get_agent_message_errors(json_message),
+                "expected_format": self._response_format,
+                "required_action": "Reformat your entire response to match the expected_format",  # noqa
+            }
+        )
+
+    def _is_agent_message(self, json_message: Any) -> bool:
+        return len(self._get_agent_message_errors(json_message)) == 0
+
+    def _get_agent_message_errors(self, json_message: Any) -> list[str]:
+        if not isinstance(json_message, dict):
+            return ["The response payload is not a JSON object"]
         error_details = []
         if "thought" not in json_message:
             error_details.append("The `thought` field is missing")
         if "thought" in json_message and not isinstance(json_message["thought"], str):
             error_details.append("The `thought` field is not a string")
-        if "function" not in json_message:
-            error_details.append("The `function` field is missing")
-        if "function" in json_message and not isinstance(json_message["function"], str):
-            error_details.append("The `function` field is not a string")
-        if "arguments" not in json_message:
-            error_details.append("The `arguments` field is missing")
-        if "arguments" in json_message and not isinstance(
-            json_message["arguments"], dict
-        ):
-            error_details.append("The `arguments` field is not an object")
-        if len(error_details) > 0:
-            raise self._map_to_exception(
-                {
-                    "error": "MALFORMED PAYLOAD",
-                    "error_message": "The response payload is missing required information or contains invalid data",  # noqa
-                    "details": error_details,
-                    "expected_format": self._response_format,
-                    "required_action": "Reformat your entire response to match the expected_format",  # noqa
-                }
-            )
+        if "calls" in json_message:
+            error_details += self._get_function_call_errors(json_message["calls"])
+        else:
+            error_details += self._get_function_call_errors([json_message])
+        return error_details
+
+
+def _get_max_result_length(config: ToolConfig) -> int:
+    if config.max_result_length is None:
+        return TOOL_RESULT_MAX_LENGTH
+    return config.max_result_length
+
+
+def _supports_function_calling(model: str) -> bool:
+    try:
+        return litellm.supports_function_calling(model=model)
+    except Exception:
+        return False
+
+
+class _LinePrinter:
+    """
+    Send streamed text to a print function line by line, since print functions
+    usually add a newline (and a prefix) to every call.
+    """
+
+    def __init__(self, print_fn: Callable[[str], Any]):
+        self._print = print_fn
+        self._buffer: list[str] = []
+
+    def feed(self, text: str):
+        lines = text.split("\n")
+        self._buffer.append(lines[0])
+        if len(lines) == 1:
+            return
+        self._print("".join(self._buffer))
+        for line in lines[1:-1]:
+            self._print(line)
+        self._buffer = [lines[-1]]
+
+    def flush(self):
+        text = "".join(self._buffer)
+        self._buffer = []
+        if text != "":
+            self._print(text)
+
+
+class _EarlyCall:
+    def __init__(self, function_calls: list[Mapping[str, Any]], task: asyncio.Task):
+        self.function_calls = function_calls
+        self.task = task
+        self.start = time.time()
+
+    def is_matching(self, function_calls: list[Mapping[str, Any]]) -> bool:
+        return self.function_calls == function_calls
@@ -0,0 +1,175 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping, Sized
+from typing import Any, Optional
+
+from .agent import Agent
+
+
+class BatchResult:
+    """Outcome of a single prompt of a batch."""
+
+    def __init__(
+        self,
+        index: int,
+        prompt: str,
+        result: Any = None,
+        error: Optional[Exception] = None,
+        attempts: int = 0,
+        elapsed: float = 0,
+    ):
+        self.index = index
+        self.prompt = prompt
+        self.result = result
+        self.error = error
+        self.attempts = attempts
+        self.elapsed = elapsed
+
+    def is_ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        status = "ok" if self.is_ok() else f"error={self.error!r}"
+        return f"<BatchResult index={self.index} attempts={self.attempts} {status}>"
+
+
+class BatchRunner:
+    """
+    Run many prompts through Agents concurrently.
+
+    Every prompt gets its own Agent (and so its own history), created with
+    `agent_kwargs`. At most `concurrency` prompts run at the same time, and a
+    failed prompt is retried up to `retry` times. Use `run` to get the results
+    as soon as they finish, or `run_all` to get them in order.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        retry: int = 2,
+        retry_interval: float = 1,
+        agent_factory: Optional[Callable[..., Agent]] = None,
+        print_fn: Optional[Callable[[str], Any]] = None,
+        progress_interval: int = 10,
+        **agent_kwargs: Any,
+    ):
+        self._concurrency = concurrency
+        self._retry = retry
+        self._retry_interval = retry_interval
+        self._agent_factory = Agent if agent_factory is None else agent_factory
+        self._print = print if print_fn is None else print_fn
+        self._progress_interval = progress_interval
+        # Agents are silent unless told otherwise, their output would interleave
+        self._agent_kwargs = {
+            "print_fn": lambda *_: None,
+            "priority": "background",
+            **agent_kwargs,
+        }
+        self._reset_stats(total=None, started_at=None)
+
+    def get_stats(self) -> Mapping[str, Any]:
+        stats = dict(self._stats)
+        if stats["started_at"] is not None:
+            stats["elapsed"] = time.time() - stats["started_at"]
+            if stats["elapsed"] > 0:
+                stats["throughput"] = stats["completed"] / stats["elapsed"]
+        return stats
+
+    async def run(self, prompts: Iterable[str]) -> AsyncIterator[BatchResult]:
+        """Yield a BatchResult for every prompt, in order of completion."""
+        total = len(prompts) if isinstance(prompts, Sized) else None
+        self._reset_stats(total=total, started_at=time.time())
+        semaphore = asyncio.Semaphore(self._concurrency)
+        results: asyncio.Queue[BatchResult] = asyncio.Queue()
+        tasks: set[asyncio.Task] = set()
+
+        async def run_prompt(index: int, prompt: str):
+            try:
+                await results.put(await self._run_prompt(index, prompt))
+            finally:
+                semaphore.release()
+
+        scheduled_count, yielded_count = 0, 0
+        try:
+            for index, prompt in enumerate(prompts):
+                # Only schedule prompts when there is room, prompts can be lazy
+                await semaphore.acquire()
+                task = asyncio.create_task(run_prompt(index, prompt))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                scheduled_count += 1
+                while not results.empty():
+                    yielded_count += 1
+                    yield self._on_result(results.get_nowait())
+            while yielded_count < scheduled_count:
+                yielded_count += 1
+                yield self._on_result(await results.get())
+        finally:
+            for task in tasks:
+                task.cancel()
+        self._print_progress(force=True)
+
+    async def run_all(self, prompts: Iterable[str]) -> list[BatchResult]:
+        """Return a BatchResult for every prompt, in the order of the prompts."""
+        results = [result async for result in self.run(prompts)]
+        return sorted(results, key=lambda result: result.index)
+
+    async def _run_prompt(self, index: int, prompt: str) -> BatchResult:
+        start = time.time()
+        self._stats["in_flight"] += 1
+        batch_result = BatchResult(index=index, prompt=prompt)
+        try:
+            for attempt in range(self._retry + 1):
+                if attempt > 0:
+                    self._stats["retries"] += 1
+                    await asyncio.sleep(self._retry_interval)
+                batch_result.attempts = attempt + 1
+                try:
+                    agent = self._agent_factory(
+                        previous_messages=[], **self._agent_kwargs
+                    )
+                    result = await agent.add_user_message(prompt)
+                    if result is None:
+                        raise ValueError("Agent did not give any final answer")
+                    batch_result.result = result
+                    batch_result.error = None
+                    break
+                except Exception as exc:
+                    batch_result.error = exc
+        finally:
+            self._stats["in_flight"] -= 1
+        batch_result.elapsed = time.time() - start
+        return batch_result
+
+    def _on_result(self, batch_result: BatchResult) -> BatchResult:
+        self._stats["completed"] += 1
+        if batch_result.is_ok():
+            self._stats["succeeded"] += 1
+        else:
+            self._stats["failed"] += 1
+        self._print_progress()
+        return batch_result
+
+    def _print_progress(self, force: bool = False):
+        stats = self.get_stats()
+        completed = stats["completed"]
+        if completed == 0 or (not force and completed % self._progress_interval != 0):
+            return
+        total = "?" if stats["total"] is None else stats["total"]
+        self._print(
+            f"📦 Batch: {completed}/{total} done, {stats['failed']} failed, "
+            f"{stats['throughput']:.2f} prompts/s"
+        )
+
+    def _reset_stats(self, total: Optional[int], started_at: Optional[float]):
+        self._stats = {
+            "total": total,
+            "completed": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "in_flight": 0,
+            "started_at": started_at,
+            "elapsed": 0.0,
+            "throughput": 0.0,
+        }
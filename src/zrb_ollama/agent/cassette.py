@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Mapping
+from typing import Any, Literal, Optional
+
+import litellm
+
+from ..config import CASSETTE_MODE, CASSETTE_PATH
+
+CassetteMode = Literal["record", "replay"]
+
+# These arguments don't change what the LLM answers, and may contain secrets
+_IGNORED_KWARGS = (
+    "api_key",
+    "metadata",
+    "timeout",
+    "request_timeout",
+    "num_retries",
+)
+
+
+class Cassette:
+    """
+    Record LLM and tool calls to a JSONL file, and serve them back.
+
+    In `record` mode, every LLM request and response (streamed chunks included)
+    and every tool call and result is appended to the file. In `replay` mode,
+    nothing is called: every request is answered from the file, without any
+    latency, and a request that was not recorded raises an error. Requests are
+    matched on their content, and identical requests are answered in recorded
+    order, so replays are deterministic even when calls run concurrently.
+    """
+
+    def __init__(self, path: str, mode: CassetteMode = "replay"):
+        self._path = os.path.abspath(os.path.expanduser(path))
+        self._mode = mode
+        self._lock = threading.Lock()
+        self._interactions: dict[str, deque[Mapping[str, Any]]] = {}
+        self._stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "record":
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            # Start a new recording
+            open(self._path, "w").close()
+            return
+        with open(self._path) as f:
+            for line in f:
+                if line.strip() == "":
+                    continue
+                interaction = json.loads(line)
+                self._interactions.setdefault(interaction["key"], deque()).append(
+                    interaction
+                )
+
+    def get_mode(self) -> CassetteMode:
+        return self._mode
+
+    def get_stats(self) -> Mapping[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+    async def acompletion(
+        self,
+        call: Callable[..., Awaitable[Any]],
+        model: str,
+        messages: list[Any],
+        **kwargs: Any,
+    ) -> Any:
+        """Return `await call(messages, **kwargs)`, or its recorded response."""
+        is_stream = kwargs.get("stream", False)
+        request = {
+            "model": model,
+            "messages": messages,
+            "kwargs": {
+                key: value
+                for key, value in kwargs.items()
+                if key not in _IGNORED_KWARGS
+            },
+        }
+        key = _get_key("llm", request)
+        if self._mode == "replay":
+            interaction = self._pop(key, f"LLM request to {model}")
+            if is_stream:
+                return _replay_stream(interaction["chunks"])
+            return litellm.ModelResponse(**interaction["response"])
+        response = await call(messages, **kwargs)
+        if is_stream:
+            return self._record_stream(key, request, response)
+        self._write(
+            {"key": key, "type": "llm", "request": request, "response": _dump(response)}
+        )
+        return response
+
+    async def run_tool(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        function_name: str,
+        kwargs: Mapping[str, Any],
+    ) -> Any:
+        """Return `await call()`, or the recorded result of the tool."""
+        request = {"name": function_name, "arguments": kwargs}
+        key = _get_key("tool", request)
+        if self._mode == "replay":
+            interaction = self._pop(key, f"Call to `{function_name}`")
+            if interaction.get("error_type") == "timeout":
+                raise TimeoutError(interaction["error"])
+            if "error" in interaction:
+                raise Exception(interaction["error"])
+            return interaction["result"]
+        interaction = {"key": key, "type": "tool", "request": request}
+        try:
+            result = await call()
+        except TimeoutError as exc:
+            self._write({**interaction, "error": f"{exc}", "error_type": "timeout"})
+            raise
+        except Exception as exc:
+            self._write({**interaction, "error": f"{exc}", "error_type": "error"})
+            raise
+        self._write({**interaction, "result": result})
+        return result
+
+    async def _record_stream(
+        self, key: str, request: Mapping[str, Any], stream: Any
+    ) -> AsyncIterator[Any]:
+        chunks = []
+        async for chunk in stream:
+            chunks.append(_dump(chunk))
+            yield chunk
+        # Incomplete streams are not recorded
+        self._write({"key": key, "type": "llm", "request": request, "chunks": chunks})
+
+    def _pop(self, key: str, description: str) -> Mapping[str, Any]:
+        with self._lock:
+            interactions = self._interactions.get(key)
+            if not interactions:
+                self._stats["misses"] += 1
+                raise ValueError(f"{description} is not recorded in {self._path}")
+            self._stats["replayed"] += 1
+            return interactions.popleft()
+
+    def _write(self, interaction: Mapping[str, Any]):
+        line = json.dumps(interaction, default=str)
+        with self._lock:
+            with open(self._path, "a") as f:
+                f.write(line + "\n")
+            self._stats["recorded"] += 1
+
+
+def _get_key(interaction_type: str, request: Mapping[str, Any]) -> str:
+    canonical_request = json.dumps(
+        {"type": interaction_type, **request},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+
+
+def _dump(response: Any) -> Any:
+    if hasattr(response, "model_dump"):
+        return response.model_dump()
+    return response
+
+
+async def _replay_stream(chunks: list[Mapping[str, Any]]) -> AsyncIterator[Any]:
+    for chunk in chunks:
+        yield litellm.ModelResponse(stream=True, **chunk)
+
+
+_default_cassette: Optional[Cassette] = None
+
+
+def get_default_cassette() -> Optional[Cassette]:
+    """
+    Return the process-wide Cassette, or None if ZRB_OLLAMA_CASSETTE_PATH is not
+    set.
+    """
+    global _default_cassette
+    if CASSETTE_PATH == "":
+        return None
+    if _default_cassette is None:
+        _default_cassette = Cassette(CASSETTE_PATH, CASSETTE_MODE)
+    return _default_cassette
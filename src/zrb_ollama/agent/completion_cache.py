@@ -0,0 +1,101 @@
+import hashlib
+import json
+from collections.abc import Mapping
+from typing import Any, Optional
+
+import litellm
+
+from ..cache import DiskCache
+from ..config import COMPLETION_CACHE_MAX_SIZE, COMPLETION_CACHE_PATH
+
+# These arguments don't change what the LLM answers
+_IGNORED_KWARGS = (
+    "stream",
+    "api_key",
+    "metadata",
+    "timeout",
+    "request_timeout",
+    "num_retries",
+)
+
+
+class CompletionCache:
+    """
+    Cache LLM completions on disk, keyed on the model, the messages and the
+    completion arguments, so that a conversation can be replayed without calling
+    the LLM again.
+
+    By default, completions are stored in ZRB_OLLAMA_COMPLETION_CACHE_PATH.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_size: int = COMPLETION_CACHE_MAX_SIZE,
+    ):
+        if path is None:
+            path = COMPLETION_CACHE_PATH
+        self._backend = DiskCache(path, max_size=max_size)
+
+    def get(
+        self, model: str, messages: list[Any], kwargs: Mapping[str, Any]
+    ) -> Optional[Any]:
+        is_hit, data = self._backend.get(self._get_key(model, messages, kwargs))
+        if not is_hit:
+            return None
+        try:
+            return litellm.ModelResponse(**data)
+        except Exception:
+            return None
+
+    def set(
+        self,
+        model: str,
+        messages: list[Any],
+        kwargs: Mapping[str, Any],
+        response: Any,
+    ):
+        try:
+            data = response.model_dump()
+            self._backend.set(self._get_key(model, messages, kwargs), data)
+        except Exception:
+            # Response is not serializable, simply don't cache it
+            pass
+
+    def get_stats(self) -> Mapping[str, Any]:
+        return self._backend.get_stats()
+
+    def _get_key(
+        self, model: str, messages: list[Any], kwargs: Mapping[str, Any]
+    ) -> str:
+        canonical_request = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "kwargs": {
+                    key: value
+                    for key, value in kwargs.items()
+                    if key not in _IGNORED_KWARGS
+                },
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+
+
+_default_completion_cache: Optional[CompletionCache] = None
+
+
+def get_default_completion_cache() -> Optional[CompletionCache]:
+    """
+    Return the process-wide CompletionCache, or None if
+    ZRB_OLLAMA_COMPLETION_CACHE_PATH is not set.
+    """
+    global _default_completion_cache
+    if COMPLETION_CACHE_PATH == "":
+        return None
+    if _default_completion_cache is None:
+        _default_completion_cache = CompletionCache()
+    return _default_completion_cache
@@ -0,0 +1,168 @@
+import hashlib
+import json
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Optional
+
+import litellm
+
+from ..config import CONTEXT_TOKEN_BUDGET
+
+_FALLBACK_TOKEN_BUDGET = 6144
+_MAX_TOKEN_CACHE_SIZE = 4096
+_TOOL_RESULT_TYPES = ("function_call_ok", "function_call_error")
+
+
+class ContextWindow:
+    """
+    Keep the messages sent to the LLM under a token budget.
+
+    Older tool results are collapsed into short stubs first, then the oldest
+    turns are dropped. Messages of the current turn are never dropped.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        keep_recent_messages: int = 4,
+        tool_result_stub_length: int = 200,
+    ):
+        self._max_tokens = max_tokens
+        self._keep_recent_messages = keep_recent_messages
+        self._tool_result_stub_length = tool_result_stub_length
+        self._token_cache: OrderedDict[str, int] = OrderedDict()
+        self._stats = {
+            "calls": 0,
+            "tokens_before": 0,
+            "tokens_after": 0,
+            "tokens_saved": 0,
+            "last_call": None,
+        }
+
+    def get_stats(self) -> Mapping[str, Any]:
+        return dict(self._stats)
+
+    def get_token_budget(self, model: str) -> int:
+        if self._max_tokens is not None:
+            return self._max_tokens
+        if CONTEXT_TOKEN_BUDGET > 0:
+            return CONTEXT_TOKEN_BUDGET
+        try:
+            model_info = litellm.get_model_info(model)
+        except Exception:
+            return _FALLBACK_TOKEN_BUDGET
+        # `max_tokens` is the output limit for some providers, so only use it
+        # when the input limit is unknown
+        context_size = model_info.get("max_input_tokens") or model_info.get(
+            "max_tokens"
+        )
+        if not context_size:
+            return _FALLBACK_TOKEN_BUDGET
+        # Leave some room for the completion
+        return int(context_size * 0.75)
+
+    def fit(
+        self,
+        prefix_messages: list[Any],
+        history: list[Any],
+        model: str,
+        turn_start: int = -1,
+    ) -> list[Any]:
+        """
+        Return `prefix_messages` followed by as much of `history` as the budget
+        allows. `turn_start` is the index of the current turn in `history`.
+        """
+        budget = self.get_token_budget(model)
+        if turn_start < 0:
+            turn_start = len(history)
+        recent_start = max(len(history) - self._keep_recent_messages, 0)
+        prefix_tokens = sum(self.count_tokens(msg, model) for msg in prefix_messages)
+        message_tokens = [self.count_tokens(msg, model) for msg in history]
+        tokens_before = prefix_tokens + sum(message_tokens)
+        total = tokens_before
+        history = list(history)
+        # Collapse old tool results, oldest first
+        for index in range(recent_start):
+            if total <= budget:
+                break
+            collapsed_message = self._collapse_tool_result(history[index])
+            if collapsed_message is None:
+                continue
+            collapsed_tokens = self.count_tokens(collapsed_message, model)
+            total -= message_tokens[index] - collapsed_tokens
+            history[index] = collapsed_message
+            message_tokens[index] = collapsed_tokens
+        # Drop the oldest turns, but never the current one
+        drop_count = 0
+        droppable_count = min(turn_start, recent_start)
+        while total > budget and drop_count < droppable_count:
+            total -= message_tokens[drop_count]
+            drop_count += 1
+        # Tool messages cannot be sent without their assistant message
+        while drop_count < len(history) and history[drop_count].get("role") == "tool":
+            total -= message_tokens[drop_count]
+            drop_count += 1
+        self._record(tokens_before, total)
+        return prefix_messages + history[drop_count:]
+
+    def count_tokens(self, message: Mapping[str, Any], model: str) -> int:
+        key = hashlib.sha1(
+            f"{model}\n{json.dumps(message, sort_keys=True, default=str)}".encode()
+        ).hexdigest()
+        if key in self._token_cache:
+            self._token_cache.move_to_end(key)
+            return self._token_cache[key]
+        try:
+            token_count = litellm.token_counter(model=model, messages=[message])
+        except Exception:
+            token_count = len(f"{message.get('content')}") // 4 + 4
+        self._token_cache[key] = token_count
+        if len(self._token_cache) > _MAX_TOKEN_CACHE_SIZE:
+            self._token_cache.popitem(last=False)
+        return token_count
+
+    def _record(self, tokens_before: int, tokens_after: int):
+        tokens_saved = tokens_before - tokens_after
+        self._stats["calls"] += 1
+        self._stats["tokens_before"] += tokens_before
+        self._stats["tokens_after"] += tokens_after
+        self._stats["tokens_saved"] += tokens_saved
+        self._stats["last_call"] = {
+            "tokens_before": tokens_before,
+            "tokens_after": tokens_after,
+            "tokens_saved": tokens_saved,
+        }
+
+    def _collapse_tool_result(
+        self, message: Mapping[str, Any]
+    ) -> Optional[Mapping[str, Any]]:
+        content = message.get("content")
+        if not isinstance(content, str):
+            return None
+        try:
+            payload = json.loads(content)
+        except Exception:
+            return None
+        if not isinstance(payload, dict):
+            return None
+        if message.get("role") == "user" and payload.get("type") in _TOOL_RESULT_TYPES:
+            payload.pop("original_user_message", None)
+        elif message.get("role") != "tool":
+            return None
+        if "result" in payload:
+            payload["result"] = self._get_stub(payload["result"])
+        for call_result in payload.get("results", []):
+            if isinstance(call_result, dict) and "result" in call_result:
+                call_result["result"] = self._get_stub(call_result["result"])
+        collapsed_content = json.dumps(payload)
+        if len(collapsed_content) >= len(content):
+            return None
+        return {**message, "content": collapsed_content}
+
+    def _get_stub(self, result: Any) -> Any:
+        result_str = result if isinstance(result, str) else json.dumps(result)
+        if len(result_str) <= self._tool_result_stub_length:
+            return result
+        omitted = len(result_str) - self._tool_result_stub_length
+        stub = result_str[: self._tool_result_stub_length]
+        return f"{stub}... [{omitted} characters omitted]"
@@ -0,0 +1,150 @@
+import atexit
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from collections.abc import Callable, Mapping
+from datetime import date, datetime
+from typing import Any, Optional, TextIO
+
+from ..config import CONVERSATION_LOG_FLUSH_INTERVAL
+
+_FLUSH = object()
+_CLOSE = object()
+# Another process may still flush records of a previous day to its file
+_MIN_COMPRESS_AGE = 60
+
+
+class ConversationLogWriter:
+    """
+    Write conversation records as JSONL, one file per day (`YYYY-MM-DD.jsonl`).
+
+    Records are queued and written by a background thread, so logging never
+    blocks the event loop. The file stays open, and it is flushed every
+    `flush_interval` seconds, even under a steady stream of records, or when
+    `flush` is called (e.g., at the end of a turn). Files of previous days are
+    compressed with gzip, once they have not been modified for a minute (or
+    `flush_interval`, if longer). Errors are reported with `print_fn`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = CONVERSATION_LOG_FLUSH_INTERVAL,
+        print_fn: Optional[Callable[[str], Any]] = None,
+    ):
+        self._path = os.path.expanduser(path)
+        self._flush_interval = flush_interval
+        self._print = print if print_fn is None else print_fn
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._file: Optional[TextIO] = None
+        self._file_date: Optional[date] = None
+        self._thread = threading.Thread(
+            target=self._run, name="zrb-ollama-conversation-log", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, record: Mapping[str, Any]):
+        self._queue.put({"timestamp": datetime.now().isoformat(), **record})
+
+    def flush(self):
+        self._queue.put(_FLUSH)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+
+    def _run(self):
+        next_flush = time.monotonic() + self._flush_interval
+        while True:
+            timeout = (
+                None
+                if self._flush_interval <= 0
+                else max(next_flush - time.monotonic(), 0)
+            )
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _CLOSE:
+                self._try(self._close_file)
+                return
+            if item is not None and item is not _FLUSH:
+                self._try(self._write_record, item)
+            now = time.monotonic()
+            if item is _FLUSH or self._flush_interval <= 0 or now >= next_flush:
+                self._try(self._flush_file)
+                next_flush = now + self._flush_interval
+
+    def _try(self, fn: Callable[..., Any], *args: Any):
+        try:
+            fn(*args)
+        except Exception as exc:
+            # Losing log records should never break the conversation
+            self._print(f"🛑 Failed to write conversation log: {exc}")
+
+    def _write_record(self, record: Mapping[str, Any]):
+        today = date.today()
+        if self._file is None or self._file_date != today:
+            self._open_file(today)
+        self._file.write(json.dumps(record, default=str) + "\n")
+
+    def _open_file(self, today: date):
+        self._close_file()
+        os.makedirs(self._path, exist_ok=True)
+        file_name = os.path.join(self._path, f"{today.strftime('%Y-%m-%d')}.jsonl")
+        self._file = open(file_name, "a", encoding="utf-8")
+        self._file_date = today
+        self._compress_previous_files(file_name)
+
+    def _compress_previous_files(self, current_file_name: str):
+        min_age = max(self._flush_interval, _MIN_COMPRESS_AGE)
+        now = time.time()
+        for file_name in glob.glob(os.path.join(self._path, "*.jsonl")):
+            if file_name == current_file_name:
+                continue
+            if now - os.path.getmtime(file_name) < min_age:
+                # Compressed on the next rotation instead
+                continue
+            with open(file_name, "rb") as src:
+                with gzip.open(f"{file_name}.gz", "ab") as dst:
+                    shutil.copyfileobj(src, dst)
+            os.remove(file_name)
+
+    def _flush_file(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_writers: dict[str, ConversationLogWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_conversation_log_writer(
+    path: str, print_fn: Optional[Callable[[str], Any]] = None
+) -> ConversationLogWriter:
+    """
+    Return the ConversationLogWriter of `path`, shared by every Agent. Errors are
+    reported with the `print_fn` of the Agent that created it.
+    """
+    path = os.path.abspath(os.path.expanduser(path))
+    with _writers_lock:
+        if path not in _writers:
+            _writers[path] = ConversationLogWriter(path, print_fn=print_fn)
+        return _writers[path]
+
+
+@atexit.register
+def _close_writers():
+    for writer in list(_writers.values()):
+        writer.close()
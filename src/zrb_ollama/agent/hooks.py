@@ -0,0 +1,194 @@
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from ..metrics import (
+    MetricsRegistry,
+    Span,
+    SpanRecorder,
+    get_metrics_registry,
+    get_span_recorder,
+)
+
+
+class AgentHook:
+    """
+    Receive structured events from the agent loop. Override the methods you need,
+    the others do nothing.
+
+    Every event is a mapping containing `event`, `model`, `turn_id`, `iteration`,
+    and `time`, plus:
+    - on_turn_start: `user_message`
+    - on_turn_end: `elapsed`, `status` (`finished`, `max_iteration`, or `error`),
+      `error`
+    - on_iteration_start: nothing else
+    - on_iteration_end: `elapsed`, `error`
+    - on_llm_call: `elapsed`, `stream`, `cached`, `prompt_tokens`,
+      `completion_tokens`, `error`
+    - on_parse: `stage` (`json`, `repair`, `fixer`, or `failed`)
+    - on_tool_call: `name`, `elapsed`, `status` (`ok`, `cached`, `timeout`, or
+      `error`), `error`
+
+    Hooks are called from the event loop, so they should return quickly.
+    """
+
+    def on_turn_start(self, event: Mapping[str, Any]):
+        pass
+
+    def on_turn_end(self, event: Mapping[str, Any]):
+        pass
+
+    def on_iteration_start(self, event: Mapping[str, Any]):
+        pass
+
+    def on_iteration_end(self, event: Mapping[str, Any]):
+        pass
+
+    def on_llm_call(self, event: Mapping[str, Any]):
+        pass
+
+    def on_parse(self, event: Mapping[str, Any]):
+        pass
+
+    def on_tool_call(self, event: Mapping[str, Any]):
+        pass
+
+
+class MetricsHook(AgentHook):
+    """
+    Record agent events as metrics (see `MetricsRegistry.export_prometheus`) and
+    as spans (see `SpanRecorder.export_spans`). Every turn is a trace, with
+    iterations, LLM calls and tool calls as child spans.
+    """
+
+    def __init__(
+        self,
+        registry: Optional[MetricsRegistry] = None,
+        span_recorder: Optional[SpanRecorder] = None,
+    ):
+        if registry is None:
+            registry = get_metrics_registry()
+        if span_recorder is None:
+            span_recorder = get_span_recorder()
+        self._span_recorder = span_recorder
+        self._turns = registry.counter("agent_turns", "Agent turns")
+        self._turn_duration = registry.histogram(
+            "agent_turn_duration_seconds", "Duration of agent turns"
+        )
+        self._iterations = registry.counter("agent_iterations", "Agent iterations")
+        self._iteration_duration = registry.histogram(
+            "agent_iteration_duration_seconds", "Duration of agent iterations"
+        )
+        self._llm_calls = registry.counter("llm_calls", "LLM calls")
+        self._llm_duration = registry.histogram(
+            "llm_call_duration_seconds", "Duration of LLM calls"
+        )
+        self._llm_tokens = registry.counter("llm_tokens", "Tokens used by LLM calls")
+        self._parses = registry.counter(
+            "agent_parses", "Parsed LLM responses by stage"
+        )
+        self._tool_calls = registry.counter("tool_calls", "Tool calls")
+        self._tool_duration = registry.histogram(
+            "tool_call_duration_seconds", "Duration of tool calls"
+        )
+        self._turn_spans: dict[str, Span] = {}
+        self._iteration_spans: dict[tuple[str, int], Span] = {}
+
+    def on_turn_start(self, event: Mapping[str, Any]):
+        self._turn_spans[event["turn_id"]] = Span(
+            "agent.turn",
+            start_time=event["time"],
+            attributes={"model": event["model"]},
+        )
+
+    def on_turn_end(self, event: Mapping[str, Any]):
+        self._turns.inc(model=event["model"], status=event["status"])
+        self._turn_duration.observe(event["elapsed"], model=event["model"])
+        span = self._turn_spans.pop(event["turn_id"], None)
+        if span is None:
+            return
+        span.set_attribute("status", event["status"])
+        span.set_attribute("iterations", event["iteration"] + 1)
+        self._end_span(span, event)
+
+    def on_iteration_start(self, event: Mapping[str, Any]):
+        self._iteration_spans[(event["turn_id"], event["iteration"])] = (
+            self._create_child_span(
+                "agent.iteration",
+                event,
+                event["time"],
+                {"iteration": event["iteration"]},
+            )
+        )
+
+    def on_iteration_end(self, event: Mapping[str, Any]):
+        self._iterations.inc(model=event["model"])
+        self._iteration_duration.observe(event["elapsed"], model=event["model"])
+        span = self._iteration_spans.pop(
+            (event["turn_id"], event["iteration"]), None
+        )
+        if span is not None:
+            self._end_span(span, event)
+
+    def on_llm_call(self, event: Mapping[str, Any]):
+        status = "error" if event["error"] is not None else "ok"
+        labels = {"model": event["model"], "cached": event["cached"]}
+        self._llm_calls.inc(status=status, **labels)
+        self._llm_duration.observe(event["elapsed"], **labels)
+        if not event["cached"]:
+            for token_type in ("prompt", "completion"):
+                token_count = event[f"{token_type}_tokens"]
+                if token_count:
+                    self._llm_tokens.inc(
+                        token_count, model=event["model"], type=token_type
+                    )
+        span = self._create_child_span(
+            "llm.call",
+            event,
+            event["time"] - event["elapsed"],
+            {
+                "model": event["model"],
+                "stream": event["stream"],
+                "cached": event["cached"],
+                "prompt_tokens": event["prompt_tokens"],
+                "completion_tokens": event["completion_tokens"],
+            },
+        )
+        self._end_span(span, event)
+
+    def on_parse(self, event: Mapping[str, Any]):
+        self._parses.inc(model=event["model"], stage=event["stage"])
+
+    def on_tool_call(self, event: Mapping[str, Any]):
+        self._tool_calls.inc(tool=event["name"], status=event["status"])
+        self._tool_duration.observe(event["elapsed"], tool=event["name"])
+        span = self._create_child_span(
+            f"tool.{event['name']}",
+            event,
+            event["time"] - event["elapsed"],
+            {"tool": event["name"], "status": event["status"]},
+        )
+        self._end_span(span, event)
+
+    def _create_child_span(
+        self,
+        name: str,
+        event: Mapping[str, Any],
+        start_time: float,
+        attributes: Mapping[str, Any],
+    ) -> Span:
+        parent = self._iteration_spans.get((event["turn_id"], event["iteration"]))
+        if parent is None:
+            parent = self._turn_spans.get(event["turn_id"])
+        return Span(
+            name,
+            trace_id=None if parent is None else parent.trace_id,
+            parent_span_id=None if parent is None else parent.span_id,
+            start_time=start_time,
+            attributes=attributes,
+        )
+
+    def _end_span(self, span: Span, event: Mapping[str, Any]):
+        if event.get("error") is not None:
+            span.set_error(event["error"])
+        span.end(event["time"])
+        self._span_recorder.record(span)
@@ -0,0 +1,239 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import Mapping
+from typing import Any, Optional, Union
+
+from ..config import (
+    HEDGE_DEFAULT_DELAY,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_PERCENTILE,
+    LATENCY_WINDOW_SIZE,
+)
+from ..governor import Priority
+from ..governor import acompletion as governed_acompletion
+
+_MISSING = object()
+
+
+class LatencyTracker:
+    """Latencies and errors of the most recent calls to a model or endpoint."""
+
+    def __init__(self, window_size: int = LATENCY_WINDOW_SIZE):
+        self._latencies: deque[float] = deque(maxlen=window_size)
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+
+    def record(self, latency: float):
+        self._latencies.append(latency)
+        self._outcomes.append(True)
+
+    def record_error(self):
+        self._outcomes.append(False)
+
+    def get_count(self) -> int:
+        return len(self._latencies)
+
+    def get_percentile(self, percentile: float) -> Optional[float]:
+        if len(self._latencies) == 0:
+            return None
+        latencies = sorted(self._latencies)
+        index = min(int(percentile * len(latencies)), len(latencies) - 1)
+        return latencies[index]
+
+    def get_error_rate(self) -> float:
+        if len(self._outcomes) == 0:
+            return 0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def get_stats(self) -> Mapping[str, Any]:
+        return {
+            "count": self.get_count(),
+            "error_rate": self.get_error_rate(),
+            "p50": self.get_percentile(0.5),
+            "p90": self.get_percentile(0.9),
+            "p99": self.get_percentile(0.99),
+        }
+
+
+_latency_trackers: dict[str, LatencyTracker] = {}
+
+
+def get_latency_tracker(key: str) -> LatencyTracker:
+    """Return the process-wide LatencyTracker of a model or endpoint."""
+    if key not in _latency_trackers:
+        _latency_trackers[key] = LatencyTracker()
+    return _latency_trackers[key]
+
+
+class ModelPool:
+    """
+    Send completions to the fastest of several models or endpoints.
+
+    A model is either a litellm model name or a mapping of completion arguments
+    (e.g., `{"model": "ollama/mistral", "api_base": "http://gpu-2:11434"}`).
+    Models are ranked by their median latency. When the fastest one takes
+    longer than its `hedge_percentile` latency, the same request is sent to the
+    next one, the first answer wins and the other request is cancelled. When a
+    request fails, the next model is tried.
+    """
+
+    def __init__(
+        self,
+        models: list[Union[str, Mapping[str, Any]]],
+        hedge_percentile: float = HEDGE_PERCENTILE,
+        hedge_default_delay: float = HEDGE_DEFAULT_DELAY,
+        hedge_min_samples: int = HEDGE_MIN_SAMPLES,
+        max_hedges: int = 1,
+    ):
+        if len(models) == 0:
+            raise ValueError("ModelPool needs at least one model")
+        self._endpoints = [
+            {"model": model} if isinstance(model, str) else dict(model)
+            for model in models
+        ]
+        self._hedge_percentile = hedge_percentile
+        self._hedge_default_delay = hedge_default_delay
+        self._hedge_min_samples = hedge_min_samples
+        self._max_hedges = max_hedges
+        self._stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0}
+
+    def get_default_model(self) -> str:
+        return self._endpoints[0]["model"]
+
+    def get_stats(self) -> Mapping[str, Any]:
+        return {
+            **self._stats,
+            "endpoints": {
+                self._get_key(endpoint, False): self._get_tracker(
+                    endpoint, False
+                ).get_stats()
+                for endpoint in self._endpoints
+            },
+        }
+
+    async def acompletion(
+        self, messages: list[Any], priority: Priority = "default", **kwargs: Any
+    ) -> Any:
+        is_stream = kwargs.get("stream", False)
+        endpoints = self._get_ranked_endpoints(is_stream)
+        self._stats["requests"] += 1
+        pending: dict[asyncio.Task, int] = {}
+        errors: list[BaseException] = []
+
+        def start_next():
+            index = len(pending) + len(errors)
+            task = asyncio.create_task(
+                self._call(endpoints[index], is_stream, messages, priority, kwargs)
+            )
+            pending[task] = index
+
+        start_next()
+        try:
+            while len(pending) > 0:
+                started_count = len(pending) + len(errors)
+                can_hedge = (
+                    started_count < len(endpoints)
+                    and len(pending) <= self._max_hedges
+                )
+                hedge_delay = (
+                    self._get_hedge_delay(endpoints[started_count - 1], is_stream)
+                    if can_hedge
+                    else None
+                )
+                done, _ = await asyncio.wait(
+                    pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if len(done) == 0:
+                    self._stats["hedges"] += 1
+                    start_next()
+                    continue
+                response = _MISSING
+                for task in done:
+                    index = pending.pop(task)
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                    elif response is _MISSING:
+                        response = task.result()
+                        if index > 0:
+                            self._stats["hedge_wins"] += 1
+                    else:
+                        await _discard(task.result())
+                if response is not _MISSING:
+                    return response
+                if len(pending) == 0 and len(errors) < len(endpoints):
+                    self._stats["failovers"] += 1
+                    start_next()
+            raise errors[-1]
+        finally:
+            for task in pending:
+                task.cancel()
+                # The request may complete before it is cancelled
+                task.add_done_callback(_discard_task_result)
+
+    async def _call(
+        self,
+        endpoint: Mapping[str, Any],
+        is_stream: bool,
+        messages: list[Any],
+        priority: Priority,
+        kwargs: Mapping[str, Any],
+    ) -> Any:
+        tracker = self._get_tracker(endpoint, is_stream)
+        start = time.monotonic()
+        try:
+            response = await governed_acompletion(
+                messages=messages, priority=priority, **{**kwargs, **endpoint}
+            )
+        except Exception:
+            tracker.record_error()
+            raise
+        # For streams, this is the time to the first byte
+        tracker.record(time.monotonic() - start)
+        return response
+
+    def _get_ranked_endpoints(self, is_stream: bool) -> list[Mapping[str, Any]]:
+        def get_rank(index: int) -> tuple:
+            tracker = self._get_tracker(self._endpoints[index], is_stream)
+            median = tracker.get_percentile(0.5)
+            if tracker.get_count() < self._hedge_min_samples or median is None:
+                # Not enough data, keep the configured order
+                median = 0
+            return (tracker.get_error_rate() >= 0.5, median, index)
+
+        indexes = sorted(range(len(self._endpoints)), key=get_rank)
+        return [self._endpoints[index] for index in indexes]
+
+    def _get_hedge_delay(self, endpoint: Mapping[str, Any], is_stream: bool) -> float:
+        tracker = self._get_tracker(endpoint, is_stream)
+        if tracker.get_count() < self._hedge_min_samples:
+            return self._hedge_default_delay
+        return tracker.get_percentile(self._hedge_percentile)
+
+    def _get_tracker(
+        self, endpoint: Mapping[str, Any], is_stream: bool
+    ) -> LatencyTracker:
+        return get_latency_tracker(self._get_key(endpoint, is_stream))
+
+    def _get_key(self, endpoint: Mapping[str, Any], is_stream: bool) -> str:
+        key = endpoint["model"]
+        if "api_base" in endpoint:
+            key = f"{key}@{endpoint['api_base']}"
+        return f"{key} (stream)" if is_stream else key
+
+
+async def _discard(response: Any):
+    # A stream holds a connection and a governor slot until it is closed
+    if hasattr(response, "aclose"):
+        await response.aclose()
+
+
+_discard_tasks: set[asyncio.Task] = set()
+
+
+def _discard_task_result(task: asyncio.Task):
+    if task.cancelled() or task.exception() is not None:
+        return
+    # Keep a reference, the event loop only keeps weak ones
+    discard_task = asyncio.ensure_future(_discard(task.result()))
+    _discard_tasks.add(discard_task)
+    discard_task.add_done_callback(_discard_tasks.discard)
@@ -0,0 +1,88 @@
+import hashlib
+import json
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Annotated, Any, Optional
+
+from ..config import TOOL_RESULT_MAX_LENGTH
+
+_DEFAULT_READ_LENGTH = 4000
+
+
+class ResultStore:
+    """
+    Keep tool results that are too large to be sent to the LLM as is.
+
+    The LLM only gets a preview and a handle, and it can page through the rest
+    by calling the built-in `read_result` tool. Handles are derived from the
+    content, so a result always gets the same handle.
+    """
+
+    def __init__(
+        self, max_entries: int = 64, max_read_length: Optional[int] = None
+    ):
+        if max_read_length is None:
+            max_read_length = TOOL_RESULT_MAX_LENGTH
+        self._max_entries = max_entries
+        self._max_read_length = max_read_length
+        self._results: OrderedDict[str, str] = OrderedDict()
+
+    def put(self, result: Any) -> str:
+        result_str = (
+            result if isinstance(result, str) else json.dumps(result, default=str)
+        )
+        handle = hashlib.sha1(result_str.encode("utf-8")).hexdigest()[:12]
+        self._results[handle] = result_str
+        self._results.move_to_end(handle)
+        if len(self._results) > self._max_entries:
+            self._results.popitem(last=False)
+        return handle
+
+    def get_length(self, handle: str) -> int:
+        return len(self._get(handle))
+
+    def read(
+        self, handle: str, offset: int = 0, length: int = _DEFAULT_READ_LENGTH
+    ) -> str:
+        result_str = self._get(handle)
+        offset = max(offset, 0)
+        if self._max_read_length > 0:
+            length = min(length, self._max_read_length)
+        end = min(offset + max(length, 1), len(result_str))
+        return result_str[offset:end] + get_continuation_note(
+            handle, offset, end, len(result_str)
+        )
+
+    def _get(self, handle: str) -> str:
+        if handle not in self._results:
+            raise ValueError(f"Unknown or expired result handle: {handle}")
+        self._results.move_to_end(handle)
+        return self._results[handle]
+
+
+def create_read_result_tool(result_store: ResultStore) -> Callable[..., str]:
+    """Create the `read_result` tool, paging through the results of a ResultStore."""
+
+    def read_result(
+        handle: Annotated[str, "Handle of the truncated result"],
+        offset: Annotated[int, "Position of the first character to read"] = 0,
+        length: Annotated[
+            int, "Number of characters to read"
+        ] = _DEFAULT_READ_LENGTH,
+    ) -> str:
+        """Reads more of a truncated function result, given its handle."""
+        return result_store.read(handle, offset, length)
+
+    return read_result
+
+
+def get_continuation_note(handle: str, start: int, end: int, total: int) -> str:
+    if end >= total:
+        return ""
+    return "".join(
+        [
+            f"\n... [showing characters {start}-{end} of {total}, ",
+            f'call `read_result` with handle="{handle}" and offset={end} ',
+            "to read more]",
+        ]
+    )
@@ -0,0 +1,52 @@
+import hashlib
+import json
+from collections.abc import Mapping
+from typing import Any, Optional, Union
+
+from ..cache import DiskCache, MemoryCache
+from ..config import TOOL_CACHE_MAX_SIZE, TOOL_CACHE_PATH
+
+
+class ToolCache:
+    """
+    Cache tool results, keyed on the tool name and the canonicalized arguments.
+    Only tools declared as cacheable (see `tool_config`) are cached.
+
+    By default, results are cached in memory, or on disk when
+    ZRB_OLLAMA_TOOL_CACHE_PATH is set.
+    """
+
+    def __init__(self, backend: Optional[Union[MemoryCache, DiskCache]] = None):
+        if backend is None and TOOL_CACHE_PATH != "":
+            backend = DiskCache(TOOL_CACHE_PATH, max_size=TOOL_CACHE_MAX_SIZE)
+        if backend is None:
+            backend = MemoryCache()
+        self._backend = backend
+
+    def get(self, function_name: str, kwargs: Mapping[str, Any]) -> tuple[bool, Any]:
+        return self._backend.get(self._get_key(function_name, kwargs))
+
+    def set(
+        self,
+        function_name: str,
+        kwargs: Mapping[str, Any],
+        result: Any,
+        ttl: Optional[float] = None,
+    ):
+        try:
+            self._backend.set(self._get_key(function_name, kwargs), result, ttl)
+        except (TypeError, ValueError):
+            # Result is not serializable, simply don't cache it
+            pass
+
+    def get_stats(self) -> Mapping[str, Any]:
+        return self._backend.get_stats()
+
+    def _get_key(self, function_name: str, kwargs: Mapping[str, Any]) -> str:
+        canonical_call = json.dumps(
+            {"function": function_name, "arguments": kwargs},
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(canonical_call.encode("utf-8")).hexdigest()
@@ -0,0 +1,59 @@
+from collections.abc import Callable
+from typing import Optional
+
+_TOOL_CONFIG_ATTRIBUTE = "__zrb_ollama_tool_config__"
+
+
+class ToolConfig:
+    """
+    Declare how the agent should treat a tool.
+
+    - `cacheable`: whether the result can be served from the tool cache. Tools
+      with side effects or non-deterministic results should not be cacheable.
+    - `side_effect_free`: whether the tool can be called speculatively, while the
+      LLM response is still streamed. Cacheable tools are side-effect free too.
+    - `cache_ttl`: how long (in seconds) a cached result stays valid, `None` means
+      forever.
+    - `max_result_length`: how many characters of the result are sent to the LLM,
+      `None` means ZRB_OLLAMA_TOOL_RESULT_MAX_LENGTH and `0` means unlimited. The
+      rest is kept in the agent's ResultStore.
+    - `timeout`: how long (in seconds) the tool may run, `None` means
+      ZRB_OLLAMA_TOOL_TIMEOUT and `0` means no timeout.
+    """
+
+    def __init__(
+        self,
+        cacheable: bool = False,
+        side_effect_free: bool = False,
+        cache_ttl: Optional[float] = None,
+        max_result_length: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.cacheable = cacheable
+        self.side_effect_free = side_effect_free
+        self.cache_ttl = cache_ttl
+        self.max_result_length = max_result_length
+        self.timeout = timeout
+
+
+_DEFAULT_TOOL_CONFIG = ToolConfig()
+
+
+def tool_config(**kwargs) -> Callable[[Callable], Callable]:
+    """
+    Decorator to attach a ToolConfig to a tool, e.g.:
+
+        @tool_config(cacheable=True, cache_ttl=3600)
+        def query_internet(query: str) -> str:
+            ...
+    """
+
+    def decorate(fn: Callable) -> Callable:
+        setattr(fn, _TOOL_CONFIG_ATTRIBUTE, ToolConfig(**kwargs))
+        return fn
+
+    return decorate
+
+
+def get_tool_config(fn: Callable) -> ToolConfig:
+    return getattr(fn, _TOOL_CONFIG_ATTRIBUTE, _DEFAULT_TOOL_CONFIG)
@@ -0,0 +1,125 @@
+import asyncio
+import inspect
+import threading
+import time
+from collections.abc import Callable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from ..config import TOOL_EXECUTOR_MAX_WORKERS
+
+
+class ToolExecutor:
+    """
+    Run tools with a wall-clock timeout.
+
+    Async tools run on the event loop and are cancelled on timeout, so they can
+    clean up (e.g., kill their subprocesses). Sync tools run in a dedicated,
+    bounded thread pool instead of the default executor. A thread cannot be
+    interrupted, so a timed out sync tool keeps its worker until it returns.
+
+    Queue-wait (time spent waiting for a free worker) and run-time metrics are
+    available through `get_stats`.
+    """
+
+    def __init__(self, max_workers: int = TOOL_EXECUTOR_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="zrb-ollama-tool"
+        )
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "errors": 0,
+            "timeouts": 0,
+            "active": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+            "run_time_total": 0.0,
+            "run_time_max": 0.0,
+        }
+
+    def get_stats(self) -> Mapping[str, Any]:
+        with self._lock:
+            return dict(self._stats)
+
+    async def run(
+        self,
+        fn: Callable,
+        kwargs: Mapping[str, Any],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """
+        Run `fn(**kwargs)`, raise TimeoutError if it takes more than `timeout`
+        seconds (`None` or `0` means no timeout).
+        """
+        start = time.perf_counter()
+        self._update_stats(calls=1, active=1)
+        # Not `asyncio.wait_for`: a TimeoutError raised by the tool itself would
+        # be indistinguishable from the tool timing out
+        task = asyncio.ensure_future(self._run(fn, kwargs, start))
+        try:
+            try:
+                done, _ = await asyncio.wait(
+                    [task], timeout=timeout if timeout else None
+                )
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            if not done:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                self._update_stats(timeouts=1)
+                raise TimeoutError(f"Tool did not finish within {timeout} seconds")
+            try:
+                return task.result()
+            except Exception:
+                self._update_stats(errors=1)
+                raise
+        finally:
+            self._update_stats(active=-1)
+            run_time = time.perf_counter() - start
+            self._update_stats(run_time_total=run_time)
+            self._update_max("run_time_max", run_time)
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    async def _run(self, fn: Callable, kwargs: Mapping[str, Any], start: float) -> Any:
+        if inspect.iscoroutinefunction(fn):
+            self._record_queue_wait(start)
+            return await fn(**kwargs)
+        loop = asyncio.get_running_loop()
+
+        def run_in_thread() -> Any:
+            self._record_queue_wait(start)
+            return fn(**kwargs)
+
+        result = await loop.run_in_executor(self._executor, run_in_thread)
+        if inspect.isawaitable(result):
+            return await result
+        return result
+
+    def _record_queue_wait(self, start: float):
+        queue_wait = time.perf_counter() - start
+        self._update_stats(queue_wait_total=queue_wait)
+        self._update_max("queue_wait_max", queue_wait)
+
+    def _update_stats(self, **increments: float):
+        with self._lock:
+            for key, increment in increments.items():
+                self._stats[key] += increment
+
+    def _update_max(self, key: str, value: float):
+        with self._lock:
+            self._stats[key] = max(self._stats[key], value)
+
+
+_default_tool_executor: Optional[ToolExecutor] = None
+
+
+def get_default_tool_executor() -> ToolExecutor:
+    """Return the process-wide ToolExecutor, shared by every Agent by default."""
+    global _default_tool_executor
+    if _default_tool_executor is None:
+        _default_tool_executor = ToolExecutor()
+    return _default_tool_executor
@@ -0,0 +1,5 @@
+from .disk_cache import DiskCache
+from .memory_cache import MemoryCache
+
+assert DiskCache
+assert MemoryCache
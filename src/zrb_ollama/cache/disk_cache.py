@@ -0,0 +1,204 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Mapping
+from typing import Any, Optional
+
+# Stay below SQLITE_MAX_VARIABLE_NUMBER of older SQLite versions
+_MAX_VARIABLE_COUNT = 500
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value).encode("utf-8")
+
+
+def _json_loads(data: bytes) -> Any:
+    return json.loads(data.decode("utf-8"))
+
+
+class DiskCache:
+    """
+    SQLite based cache with optional per-entry TTL. Least recently used entries
+    are evicted once the total size of the stored values exceeds `max_size` bytes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = 256 * 1024 * 1024,
+        dumps: Callable[[Any], bytes] = _json_dumps,
+        loads: Callable[[bytes], Any] = _json_loads,
+    ):
+        self._path = os.path.expanduser(path)
+        self._max_size = max_size
+        self._dumps = dumps
+        self._loads = loads
+        self._lock = threading.Lock()
+        self._connection = None
+        self._size = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        with self._lock:
+            connection = self._get_connection()
+            row = connection.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return False, None
+            data, expires_at = row
+            if expires_at is not None and expires_at < time.time():
+                self._delete(connection, key)
+                self._stats["misses"] += 1
+                return False, None
+            connection.execute(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            connection.commit()
+            self._stats["hits"] += 1
+        return True, self._loads(data)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        data = self._dumps(value)
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        with self._lock:
+            connection = self._get_connection()
+            self._delete(connection, key)
+            connection.execute(
+                "INSERT INTO cache (key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), expires_at, now),
+            )
+            self._size += len(data)
+            if self._size > self._max_size:
+                self._evict(connection)
+            connection.commit()
+
+    def get_many(self, keys: list[str]) -> list[tuple[bool, Any]]:
+        """Like `get`, for several keys at once, in a single transaction."""
+        now = time.time()
+        rows = {}
+        with self._lock:
+            connection = self._get_connection()
+            for start in range(0, len(keys), _MAX_VARIABLE_COUNT):
+                batch = keys[start : start + _MAX_VARIABLE_COUNT]
+                placeholders = ",".join("?" * len(batch))
+                rows.update(
+                    (key, (data, expires_at))
+                    for key, data, expires_at in connection.execute(
+                        "SELECT key, value, expires_at FROM cache "
+                        f"WHERE key IN ({placeholders})",
+                        batch,
+                    )
+                )
+            hit_keys = []
+            for key in set(rows):
+                expires_at = rows[key][1]
+                if expires_at is not None and expires_at < now:
+                    self._delete(connection, key)
+                    del rows[key]
+                    continue
+                hit_keys.append((now, key))
+            connection.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?", hit_keys
+            )
+            connection.commit()
+            hit_count = sum(1 for key in keys if key in rows)
+            self._stats["hits"] += hit_count
+            self._stats["misses"] += len(keys) - hit_count
+        return [
+            (True, self._loads(rows[key][0])) if key in rows else (False, None)
+            for key in keys
+        ]
+
+    def set_many(self, items: list[tuple[str, Any]], ttl: Optional[float] = None):
+        """Like `set`, for several entries at once, in a single transaction."""
+        entries = [(key, self._dumps(value)) for key, value in items]
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        with self._lock:
+            connection = self._get_connection()
+            for key, data in entries:
+                self._delete(connection, key)
+                connection.execute(
+                    "INSERT INTO cache (key, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, data, len(data), expires_at, now),
+                )
+                self._size += len(data)
+            if self._size > self._max_size:
+                self._evict(connection)
+            connection.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            connection = self._get_connection()
+            self._delete(connection, key)
+            connection.commit()
+
+    def clear(self):
+        with self._lock:
+            connection = self._get_connection()
+            connection.execute("DELETE FROM cache")
+            connection.commit()
+            self._size = 0
+
+    def get_stats(self) -> Mapping[str, Any]:
+        with self._lock:
+            connection = self._get_connection()
+            entries = connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            return {**self._stats, "entries": entries, "size": self._size}
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is not None:
+            return self._connection
+        directory = os.path.dirname(self._path)
+        if directory != "" and not os.path.isdir(directory):
+            os.makedirs(directory)
+        connection = sqlite3.connect(self._path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB, size INTEGER, "
+            "expires_at REAL, accessed_at REAL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)"
+        )
+        connection.commit()
+        self._size = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()[0]
+        self._connection = connection
+        return connection
+
+    def _delete(self, connection: sqlite3.Connection, key: str):
+        row = connection.execute(
+            "SELECT size FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return
+        connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+        self._size -= row[0]
+
+    def _evict(self, connection: sqlite3.Connection):
+        # Expired entries go first, then the least recently used ones
+        now = time.time()
+        target_size = self._max_size * 0.9
+        rows = connection.execute(
+            "SELECT key, size FROM cache "
+            "ORDER BY (expires_at IS NOT NULL AND expires_at < ?) DESC, accessed_at",
+            (now,),
+        )
+        evicted_keys = []
+        for key, size in rows:
+            if self._size <= target_size:
+                break
+            evicted_keys.append((key,))
+            self._size -= size
+        connection.executemany("DELETE FROM cache WHERE key = ?", evicted_keys)
+        self._stats["evictions"] += len(evicted_keys)
@@ -0,0 +1,50 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Any, Optional
+
+
+class MemoryCache:
+    """In-memory LRU cache with optional per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024):
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[Any, Optional[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        with self._lock:
+            if key not in self._entries:
+                self._stats["misses"] += 1
+                return False, None
+            value, expires_at = self._entries[key]
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                self._stats["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Mapping[str, Any]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
@@ -40,6 +40,45 @@ CONVERSATION_LOG_PATH = os.getenv(
 CONVERSATION_VECTOR_LOG_PATH = os.path.expanduser(os.getenv(
     "ZRB_OLLAMA_CONVERSATION_LOG_PATH", "~/.zrb-ollama/.vector"
 ))
+CONVERSATION_LOG_FLUSH_INTERVAL = float(
+    os.getenv("ZRB_OLLAMA_CONVERSATION_LOG_FLUSH_INTERVAL", "1")
+)
+
+LLM_MAX_IN_FLIGHT = int(os.getenv("ZRB_OLLAMA_LLM_MAX_IN_FLIGHT", "8"))
+LLM_REQUESTS_PER_SECOND = float(os.getenv("ZRB_OLLAMA_LLM_REQUESTS_PER_SECOND", "0"))
+LLM_TOKENS_PER_SECOND = float(os.getenv("ZRB_OLLAMA_LLM_TOKENS_PER_SECOND", "0"))
+
+HEDGE_PERCENTILE = float(os.getenv("ZRB_OLLAMA_HEDGE_PERCENTILE", "0.95"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("ZRB_OLLAMA_HEDGE_DEFAULT_DELAY", "30"))
+HEDGE_MIN_SAMPLES = int(os.getenv("ZRB_OLLAMA_HEDGE_MIN_SAMPLES", "20"))
+LATENCY_WINDOW_SIZE = int(os.getenv("ZRB_OLLAMA_LATENCY_WINDOW_SIZE", "200"))
+
+JSON_MODE = os.getenv("ZRB_OLLAMA_JSON_MODE", "none")
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("ZRB_OLLAMA_CONTEXT_TOKEN_BUDGET", "0"))
+
+TOOL_CACHE_PATH = os.getenv("ZRB_OLLAMA_TOOL_CACHE_PATH", "")
+TOOL_CACHE_MAX_SIZE = int(
+    os.getenv("ZRB_OLLAMA_TOOL_CACHE_MAX_SIZE", f"{64 * 1024 * 1024}")
+)
+TOOL_EXECUTOR_MAX_WORKERS = int(os.getenv("ZRB_OLLAMA_TOOL_EXECUTOR_MAX_WORKERS", "8"))
+TOOL_TIMEOUT = float(os.getenv("ZRB_OLLAMA_TOOL_TIMEOUT", "120"))
+TOOL_RESULT_MAX_LENGTH = int(os.getenv("ZRB_OLLAMA_TOOL_RESULT_MAX_LENGTH", "0"))
+HTTP_TIMEOUT = float(os.getenv("ZRB_OLLAMA_HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("ZRB_OLLAMA_HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("ZRB_OLLAMA_HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(
+    os.getenv("ZRB_OLLAMA_HTTP_MAX_CONNECTIONS_PER_HOST", "8")
+)
+HTML_PARSER = os.getenv("ZRB_OLLAMA_HTML_PARSER", "auto")
+HTML_MAX_BYTES = int(os.getenv("ZRB_OLLAMA_HTML_MAX_BYTES", f"{5 * 1024 * 1024}"))
+HTML_MAX_CHARS = int(os.getenv("ZRB_OLLAMA_HTML_MAX_CHARS", "50000"))
+COMPLETION_CACHE_PATH = os.getenv("ZRB_OLLAMA_COMPLETION_CACHE_PATH", "")
+COMPLETION_CACHE_MAX_SIZE = int(
+    os.getenv("ZRB_OLLAMA_COMPLETION_CACHE_MAX_SIZE", f"{256 * 1024 * 1024}")
+)
+CASSETTE_PATH = os.getenv("ZRB_OLLAMA_CASSETTE_PATH", "")
+CASSETTE_MODE = os.getenv("ZRB_OLLAMA_CASSETTE_MODE", "replay")
 
 RAG_EMBEDDING_MODEL = os.getenv(
     "ZRB_OLLAMA_RAG_EMBEDDING_MODEL", "ollama/nomic-embed-text"
@@ -47,6 +86,18 @@ RAG_EMBEDDING_MODEL = os.getenv(
 RAG_CHUNK_SIZE = int(os.getenv("ZRB_OLLAMA_RAG_CHUNK_SIZE", "1024"))
 RAG_OVERLAP = int(os.getenv("ZRB_OLLAMA_RAG_OVERLAP", "128"))
 RAG_MAX_RESULT_COUNT = int(os.getenv("ZRB_OLLAMA_RAG_MAX_RESULT_COUNT", "5"))
+RAG_EMBEDDING_BATCH_SIZE = int(os.getenv("ZRB_OLLAMA_RAG_EMBEDDING_BATCH_SIZE", "32"))
+RAG_EMBEDDING_CONCURRENCY = int(os.getenv("ZRB_OLLAMA_RAG_EMBEDDING_CONCURRENCY", "4"))
+RAG_QUERY_EMBEDDING_CACHE_SIZE = int(
+    os.getenv("ZRB_OLLAMA_RAG_QUERY_EMBEDDING_CACHE_SIZE", "256")
+)
+RAG_REFRESH_INTERVAL = float(os.getenv("ZRB_OLLAMA_RAG_REFRESH_INTERVAL", "10"))
+RAG_EMBEDDING_CACHE_PATH = os.getenv(
+    "ZRB_OLLAMA_RAG_EMBEDDING_CACHE_PATH", "~/.zrb-ollama/embedding-cache.db"
+)
+RAG_EMBEDDING_CACHE_MAX_SIZE = int(
+    os.getenv("ZRB_OLLAMA_RAG_EMBEDDING_CACHE_MAX_SIZE", f"{512 * 1024 * 1024}")
+)
 
 DEFAULT_SYSTEM_PROMPT = os.getenv(
     "ZRB_OLLAMA_DEFAULT_SYSTEM_PROMPT",
@@ -82,6 +133,20 @@ DEFAULT_SYSTEM_MESSAGE_TEMPLATE = os.getenv(
     "ZRB_OLLAMA_DEFAULT_SYSTEM_MESSAGE_TEMPLATE", _default_system_message_template
 )
 
+FUNCTION_CALL_BACKEND = os.getenv("ZRB_OLLAMA_FUNCTION_CALL_BACKEND", "text")
+
+_default_native_system_message_template = (
+    "{system_prompt}\n\n"
+    "Use the provided tools whenever you need more information or need to perform "
+    "an action.\n"
+    "Once you have all necessary information, answer the user directly with all "
+    "detailed information and citations."
+)
+DEFAULT_NATIVE_SYSTEM_MESSAGE_TEMPLATE = os.getenv(
+    "ZRB_OLLAMA_DEFAULT_NATIVE_SYSTEM_MESSAGE_TEMPLATE",
+    _default_native_system_message_template,
+)
+
 
 DEFAULT_JSON_FIXER_SYSTEM_PROMPT = os.getenv(
     "ZRB_OLLAMA_DEFAULT_JSON_FIXER_SYSTEM_PROMPT",
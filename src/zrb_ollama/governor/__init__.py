@@ -0,0 +1,16 @@
+from .governor import (
+    Governor,
+    Priority,
+    get_governor,
+    get_governor_stats,
+    set_governor,
+)
+from .llm import acompletion, aembedding
+
+assert Governor
+assert Priority
+assert get_governor
+assert get_governor_stats
+assert set_governor
+assert acompletion
+assert aembedding
@@ -0,0 +1,170 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import AsyncIterator, Mapping
+from contextlib import asynccontextmanager
+from typing import Any, Literal, Optional
+
+from ..config import (
+    LLM_MAX_IN_FLIGHT,
+    LLM_REQUESTS_PER_SECOND,
+    LLM_TOKENS_PER_SECOND,
+)
+
+Priority = Literal["interactive", "default", "background"]
+PRIORITIES: tuple[Priority, ...] = ("interactive", "default", "background")
+
+
+class _TokenBucket:
+    """
+    Token bucket that can go into debt, so a request larger than the bucket is
+    still admitted once the previous debt has been paid off.
+    """
+
+    def __init__(self, rate: float):
+        self._rate = rate
+        self._level = rate
+        self._updated_at = time.monotonic()
+
+    def get_delay(self) -> float:
+        if self._rate <= 0:
+            return 0
+        self._refill()
+        return 0 if self._level >= 0 else -self._level / self._rate
+
+    def consume(self, amount: float):
+        if self._rate <= 0:
+            return
+        self._refill()
+        self._level -= amount
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(
+            self._rate, self._level + (now - self._updated_at) * self._rate
+        )
+        self._updated_at = now
+
+
+class Governor:
+    """
+    Admission control for calls to a single model or endpoint.
+
+    A call waits until fewer than `max_in_flight` calls are running and the
+    requests-per-second and tokens-per-second budgets allow it (`0` means
+    unlimited). Waiting calls are admitted by priority (`interactive` first,
+    then `default`, then `background`), and in arrival order within a priority.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+        requests_per_second: float = LLM_REQUESTS_PER_SECOND,
+        tokens_per_second: float = LLM_TOKENS_PER_SECOND,
+    ):
+        self._max_in_flight = max_in_flight
+        self._request_bucket = _TokenBucket(requests_per_second)
+        self._token_bucket = _TokenBucket(tokens_per_second)
+        self._in_flight = 0
+        self._waiters: list[tuple[int, int, float, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._stats = {
+            "requests": 0,
+            "tokens": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    def get_stats(self) -> Mapping[str, Any]:
+        queue_depth_by_priority = {priority: 0 for priority in PRIORITIES}
+        for rank, _, _, future in self._waiters:
+            if not future.done():
+                queue_depth_by_priority[PRIORITIES[rank]] += 1
+        return {
+            **self._stats,
+            "in_flight": self._in_flight,
+            "queue_depth": sum(queue_depth_by_priority.values()),
+            "queue_depth_by_priority": queue_depth_by_priority,
+        }
+
+    @asynccontextmanager
+    async def acquire(
+        self, priority: Priority = "default", tokens: int = 0
+    ) -> AsyncIterator[None]:
+        """Wait for a slot, and hold it until the end of the `async with` block."""
+        await self.wait(priority, tokens)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def wait(self, priority: Priority = "default", tokens: int = 0):
+        """Wait for a slot, `release` has to be called once the call is done."""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters,
+            (PRIORITIES.index(priority), next(self._counter), tokens, future),
+        )
+        start = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted right before the cancellation
+                self.release()
+            raise
+        wait_time = time.monotonic() - start
+        self._stats["wait_time_total"] += wait_time
+        self._stats["wait_time_max"] = max(self._stats["wait_time_max"], wait_time)
+
+    def release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                # Cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            if self._max_in_flight > 0 and self._in_flight >= self._max_in_flight:
+                return
+            delay = max(
+                self._request_bucket.get_delay(), self._token_bucket.get_delay()
+            )
+            if delay > 0:
+                self._timer = future.get_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self._request_bucket.consume(1)
+            self._token_bucket.consume(tokens)
+            self._in_flight += 1
+            self._stats["requests"] += 1
+            self._stats["tokens"] += tokens
+            future.set_result(None)
+
+
+_governors: dict[str, Governor] = {}
+
+
+def get_governor(key: str) -> Governor:
+    """Return the process-wide Governor of a model or endpoint."""
+    if key not in _governors:
+        _governors[key] = Governor()
+    return _governors[key]
+
+
+def set_governor(key: str, governor: Governor):
+    """Use custom limits for a model or endpoint."""
+    _governors[key] = governor
+
+
+def get_governor_stats() -> Mapping[str, Mapping[str, Any]]:
+    return {key: governor.get_stats() for key, governor in _governors.items()}
@@ -0,0 +1,84 @@
+import json
+from collections.abc import AsyncIterator
+from typing import Any, Optional
+
+import litellm
+
+from .governor import Governor, Priority, get_governor
+
+
+async def acompletion(
+    model: str, messages: list[Any], priority: Priority = "default", **kwargs: Any
+) -> Any:
+    """
+    `litellm.acompletion` admitted by the Governor of the model (or of
+    `api_base`, if set). A streamed completion holds its slot until the stream
+    is consumed.
+    """
+    governor = _get_governor(model, kwargs.get("api_base"))
+    tokens = len(json.dumps(messages, default=str)) // 4
+    await governor.wait(priority, tokens)
+    try:
+        response = await litellm.acompletion(model=model, messages=messages, **kwargs)
+    except BaseException:
+        governor.release()
+        raise
+    if not kwargs.get("stream", False):
+        governor.release()
+        return response
+    return _GovernedStream(governor, response)
+
+
+async def aembedding(
+    model: str, input: list[str], priority: Priority = "default", **kwargs: Any
+) -> Any:
+    """`litellm.aembedding` admitted by the Governor of the model."""
+    governor = _get_governor(model, kwargs.get("api_base"))
+    tokens = sum(len(text) for text in input) // 4
+    async with governor.acquire(priority, tokens):
+        return await litellm.aembedding(model=model, input=input, **kwargs)
+
+
+class _GovernedStream:
+    """
+    Streamed completion holding a Governor slot. The slot is released once the
+    stream is exhausted, fails or is closed, even if it was never iterated.
+    """
+
+    def __init__(self, governor: Governor, stream: Any):
+        self._governor = governor
+        self._stream = stream
+        self._iterator: Optional[AsyncIterator[Any]] = None
+        self._is_released = False
+
+    def __aiter__(self) -> "_GovernedStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        if self._is_released:
+            raise StopAsyncIteration
+        if self._iterator is None:
+            self._iterator = self._stream.__aiter__()
+        try:
+            return await self._iterator.__anext__()
+        except BaseException:
+            self._release()
+            raise
+
+    async def aclose(self):
+        self._release()
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+    def __del__(self):
+        # An abandoned stream must not hold its slot forever
+        self._release()
+
+    def _release(self):
+        if not self._is_released:
+            self._is_released = True
+            self._governor.release()
+
+
+def _get_governor(model: str, api_base: Optional[str]) -> Governor:
+    return get_governor(model if api_base is None else api_base)
@@ -7,7 +7,7 @@ from zrb.helper.accessories.color import colored
 from zrb.helper.typecheck import typechecked
 from zrb.helper.util import to_snake_case
 
-from ..agent import Agent
+from ..agent import Agent, ContextWindow, ResultStore, ToolCache
 from ..config import (
     CONVERSATION_LOG_PATH,
     CONVERSATION_VECTOR_LOG_PATH,
@@ -19,6 +19,7 @@ from ..config import (
     SHOULD_SHOW_SYSTEM_PROMPT
 )
 from ..tools import create_get_changes, create_rag_from_directory
+from ..tools._http import close_http_client
 
 
 @typechecked
@@ -39,6 +40,9 @@ class Conversation:
         self._mutiline_user_inputs = []
         self._enabled_tool_names = enabled_tool_names
         self._available_tools = available_tools
+        self._context_window = ContextWindow()
+        self._tool_cache = ToolCache()
+        self._result_store = ResultStore()
         # Add conversation RAG
         conversation_log_path = os.path.expanduser(CONVERSATION_LOG_PATH)
         conversation_vector_log_path = os.path.expanduser(CONVERSATION_VECTOR_LOG_PATH)
@@ -53,6 +57,12 @@ class Conversation:
         self._available_tools[conversation_rag.__name__] = conversation_rag
 
     async def loop(self):
+        try:
+            await self._loop()
+        finally:
+            await close_http_client()
+
+    async def _loop(self):
         self._print_all_instructions()
         while True:
             try:
@@ -79,6 +89,10 @@ class Conversation:
             conversation_log_path=CONVERSATION_LOG_PATH,
             should_show_system_prompt=self._should_show_system_prompt,
             previous_messages=self._previous_messages,
+            context_window=self._context_window,
+            tool_cache=self._tool_cache,
+            result_store=self._result_store,
+            priority="interactive",
             print_fn=self._print_dark_indented,
         )
         self._should_show_system_prompt = False
@@ -0,0 +1,10 @@
+from .registry import Counter, Histogram, MetricsRegistry, get_metrics_registry
+from .tracer import Span, SpanRecorder, get_span_recorder
+
+assert Counter
+assert Histogram
+assert MetricsRegistry
+assert get_metrics_registry
+assert Span
+assert SpanRecorder
+assert get_span_recorder
@@ -0,0 +1,233 @@
+import bisect
+import math
+import threading
+from collections.abc import Mapping
+from typing import Any, Optional
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_LabelKey = tuple[tuple[str, str], ...]
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, description: str, lock: threading.Lock):
+        self._name = name
+        self._description = description
+        self._lock = lock
+
+    def get_name(self) -> str:
+        return self._name
+
+    def get_description(self) -> str:
+        return self._description
+
+    def get_values(self) -> list[tuple[Mapping[str, str], Any]]:
+        raise NotImplementedError()
+
+    def get_samples(self) -> list[tuple[str, Mapping[str, str], float]]:
+        raise NotImplementedError()
+
+
+class Counter(_Metric):
+    """Monotonic counter, one value per set of labels."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, lock: threading.Lock):
+        super().__init__(name, description, lock)
+        self._values: dict[_LabelKey, float] = {}
+
+    def inc(self, value: float = 1, **labels: Any):
+        key = _get_label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def get_values(self) -> list[tuple[Mapping[str, str], float]]:
+        with self._lock:
+            return [(dict(key), value) for key, value in self._values.items()]
+
+    def get_samples(self) -> list[tuple[str, Mapping[str, str], float]]:
+        return [
+            (f"{self._name}_total", labels, value)
+            for labels, value in self.get_values()
+        ]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values, bucketed like a Prometheus histogram."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        lock: threading.Lock,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, lock)
+        self._buckets = tuple(sorted(buckets))
+        self._values: dict[_LabelKey, dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels: Any):
+        key = _get_label_key(labels)
+        with self._lock:
+            if key not in self._values:
+                self._values[key] = {
+                    "counts": [0] * (len(self._buckets) + 1),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            data = self._values[key]
+            data["counts"][bisect.bisect_left(self._buckets, value)] += 1
+            data["sum"] += value
+            data["count"] += 1
+
+    def get_values(self) -> list[tuple[Mapping[str, str], Mapping[str, Any]]]:
+        with self._lock:
+            return [
+                (
+                    dict(key),
+                    {"sum": data["sum"], "count": data["count"]},
+                )
+                for key, data in self._values.items()
+            ]
+
+    def get_samples(self) -> list[tuple[str, Mapping[str, str], float]]:
+        samples = []
+        with self._lock:
+            items = [
+                (dict(key), list(data["counts"]), data["sum"], data["count"])
+                for key, data in self._values.items()
+            ]
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for upper_bound, bucket_count in zip(self._buckets, counts):
+                cumulative += bucket_count
+                samples.append(
+                    (
+                        f"{self._name}_bucket",
+                        {**labels, "le": _format_value(upper_bound)},
+                        cumulative,
+                    )
+                )
+            samples.append((f"{self._name}_bucket", {**labels, "le": "+Inf"}, count))
+            samples.append((f"{self._name}_sum", labels, total))
+            samples.append((f"{self._name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    In-process registry of counters and histograms.
+
+    Metrics are created on first use and can be exported in the Prometheus text
+    format, e.g., to be served by any HTTP endpoint or written to a file for the
+    node exporter's textfile collector.
+    """
+
+    def __init__(self, prefix: str = "zrb_ollama"):
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        return self._get_metric(Counter, name, description)
+
+    def histogram(
+        self,
+        name: str,
+        description: str = "",
+        buckets: Optional[tuple[float, ...]] = None,
+    ) -> Histogram:
+        if buckets is None:
+            return self._get_metric(Histogram, name, description)
+        return self._get_metric(Histogram, name, description, buckets=buckets)
+
+    def get_stats(self) -> Mapping[str, Any]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            metric.get_name(): [
+                {"labels": labels, "value": value}
+                for labels, value in metric.get_values()
+            ]
+            for metric in metrics
+        }
+
+    def export_prometheus(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            if metric.get_description():
+                description = _escape_help(metric.get_description())
+                lines.append(f"# HELP {metric.get_name()} {description}")
+            lines.append(f"# TYPE {metric.get_name()} {metric.type_name}")
+            for sample_name, labels, value in metric.get_samples():
+                lines.append(
+                    f"{sample_name}{_format_labels(labels)} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def clear(self):
+        with self._lock:
+            self._metrics = {}
+
+    def _get_metric(self, metric_class: type, name: str, description: str, **kwargs):
+        full_name = f"{self._prefix}_{name}" if self._prefix else name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = metric_class(full_name, description, self._lock, **kwargs)
+                self._metrics[full_name] = metric
+        if not isinstance(metric, metric_class):
+            raise ValueError(f"Metric {full_name} is not a {metric_class.type_name}")
+        return metric
+
+
+def _get_label_key(labels: Mapping[str, Any]) -> _LabelKey:
+    return tuple(
+        sorted((key, _format_label_value(value)) for key, value in labels.items())
+    )
+
+
+def _format_label_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return f"{value}"
+
+
+def _format_labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ""
+    label_str = ",".join(
+        f'{key}="{_escape_label_value(value)}"' for key, value in labels.items()
+    )
+    return "{" + label_str + "}"
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return f"{int(value)}"
+    return f"{value}"
+
+
+_default_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Return the process-wide MetricsRegistry."""
+    return _default_registry
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Mapping
+from typing import Any, Optional
+
+
+class Span:
+    """A timed operation, modeled after OpenTelemetry spans."""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: Optional[str] = None,
+        parent_span_id: Optional[str] = None,
+        start_time: Optional[float] = None,
+        attributes: Optional[Mapping[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = os.urandom(16).hex() if trace_id is None else trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.start_time = time.time() if start_time is None else start_time
+        self.end_time: Optional[float] = None
+        self.attributes = {} if attributes is None else dict(attributes)
+        self.status = "UNSET"
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        self.status = "ERROR"
+        self.status_message = message
+
+    def end(self, end_time: Optional[float] = None):
+        self.end_time = time.time() if end_time is None else end_time
+        if self.status == "UNSET":
+            self.status = "OK"
+
+    def get_duration(self) -> Optional[float]:
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def to_dict(self) -> Mapping[str, Any]:
+        """Return the span in the OTLP/JSON layout."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": int(self.start_time * 1e9),
+            "endTimeUnixNano": (
+                None if self.end_time is None else int(self.end_time * 1e9)
+            ),
+            "attributes": [
+                {"key": key, "value": _to_any_value(value)}
+                for key, value in self.attributes.items()
+                if value is not None
+            ],
+            "status": {"code": f"STATUS_CODE_{self.status}"},
+        }
+        if self.parent_span_id is not None:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class SpanRecorder:
+    """
+    Keep the most recent finished spans in memory. `on_end` is called with every
+    finished span, e.g., to forward it to an OpenTelemetry exporter.
+    """
+
+    def __init__(
+        self,
+        max_spans: int = 1000,
+        on_end: Optional[Callable[[Span], Any]] = None,
+    ):
+        self._spans: deque[Span] = deque(maxlen=max_spans)
+        self._on_end = on_end
+        self._lock = threading.Lock()
+
+    def record(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+        if self._on_end is not None:
+            self._on_end(span)
+
+    def get_spans(self) -> list[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def export_spans(self) -> list[Mapping[str, Any]]:
+        return [span.to_dict() for span in self.get_spans()]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+def _to_any_value(value: Any) -> Mapping[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": f"{value}"}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": f"{value}"}
+
+
+_default_span_recorder = SpanRecorder()
+
+
+def get_span_recorder() -> SpanRecorder:
+    """Return the process-wide SpanRecorder."""
+    return _default_span_recorder
@@ -16,7 +16,7 @@ from zrb.task_env.env_file import EnvFile
 from zrb.task_group.group import Group
 from zrb.task_input.any_input import AnyInput
 
-from ..agent import Agent
+from ..agent import Agent, Cassette
 from ..tools import query_internet, run_shell_command
 
 
@@ -62,6 +62,7 @@ class LLMTask(Task):
         tool_factories: Iterable[ToolFactory] = [],
         max_iteration: Union[int, str] = 10,
         agent_kwargs: Mapping[str, Any] = {},
+        cassette: Optional[Cassette] = None,
         user_message: str = "Who are you?",
         upstreams: Iterable[AnyTask] = [],
         fallbacks: Iterable[AnyTask] = [],
@@ -114,6 +115,7 @@ class LLMTask(Task):
         self._tool_factories = tool_factories
         self._max_iteration = max_iteration
         self._agent_kwargs = agent_kwargs
+        self._cassette = cassette
         self._user_message = user_message
 
     async def run(self, *args: Any, **kwargs: Any) -> Any:
@@ -130,6 +132,7 @@ class LLMTask(Task):
             + [factory.get_tool() for factory in self._tool_factories],
             max_iteration=self.render_int(self._max_iteration),
             print_fn=self.print_out_dark,
+            cassette=self._cassette,
             **{
                 self.render_str(key): self.render_any(val)
                 for key, val in self._agent_kwargs.items()
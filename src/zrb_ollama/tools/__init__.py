@@ -1,6 +1,7 @@
 from .calculate import calculate
 from .get_current_location import get_current_location
 from .get_current_weather import get_current_weather
+from .embedding_cache import EmbeddingCache, get_default_embedding_cache
 from .git import create_get_changes
 from .open_web_page import open_web_page
 from .query_internet import query_internet
@@ -12,6 +13,8 @@ from .rag import (
 )
 from .run_shell_command import run_shell_command
 
+assert EmbeddingCache
+assert get_default_embedding_cache
 assert create_rag
 assert create_rag_from_directory
 assert get_rag_documents
@@ -1,30 +1,36 @@
+import codecs
 from collections.abc import Mapping
+from typing import Any, Optional
 
-from bs4 import BeautifulSoup
+from ..config import HTML_MAX_BYTES, HTML_MAX_CHARS
+from ._html import HtmlExtractor
+from ._http import http_stream
 
-_IGNORED_TAG = [
-    "script",
-    "link",
-    "meta",
-    "style",
-    "code",
-    "footer",
-    "nav",
-    "header",
-    "aside",
-]
 
-
-def parse_content(soup: BeautifulSoup) -> Mapping[str, str]:
-    links = []
-    for anchor in soup.find_all("a"):
-        if not anchor or "href" not in anchor.attrs:
-            continue
-        link: str = anchor["href"]
-        if link.startswith("#") or link.startswith("/"):
-            continue
-        links.append(link)
-    for tag in soup(_IGNORED_TAG):
-        tag.decompose()
-    text = soup.get_text(separator=" ", strip=True)
-    return {"content": text, "links_on_page": links}
+async def fetch_html_content(
+    url: str,
+    params: Optional[Mapping[str, Any]] = None,
+    max_bytes: int = HTML_MAX_BYTES,
+    max_chars: int = HTML_MAX_CHARS,
+) -> Mapping[str, Any]:
+    """
+    Fetch a web page and extract its text and links while it is downloaded.
+    Stop reading after `max_bytes` bytes or once `max_chars` characters of text
+    have been collected.
+    """
+    async with http_stream(url, params=params) as response:
+        if response.status_code != 200:
+            raise Exception(
+                f"Error: Unable to retrieve search results (status code: {response.status_code})"  # noqa
+            )
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(
+            errors="replace"
+        )
+        extractor = HtmlExtractor(max_chars=max_chars)
+        received_bytes = 0
+        async for chunk in response.aiter_bytes():
+            received_bytes += len(chunk)
+            extractor.feed(decoder.decode(chunk))
+            if extractor.is_done() or received_bytes >= max_bytes:
+                break
+        return extractor.get_content()
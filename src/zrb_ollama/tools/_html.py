@@ -0,0 +1,174 @@
+import importlib.util
+from collections.abc import Mapping
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Any, Optional
+
+from ..config import HTML_MAX_CHARS, HTML_PARSER
+
+# Text in these tags is not part of the page content
+_IGNORED_TAG = [
+    "script",
+    "style",
+    "code",
+    "footer",
+    "nav",
+    "header",
+    "aside",
+    "noscript",
+    "template",
+]
+
+
+class _ContentCollector:
+    """Collect visible text and links from parser events, up to `max_chars`."""
+
+    def __init__(self, max_chars: int):
+        self._max_chars = max_chars
+        self._texts: list[str] = []
+        self._text_length = 0
+        self._pending_texts: list[str] = []
+        self._ignored_tags: list[str] = []
+        self._links: list[str] = []
+
+    def is_done(self) -> bool:
+        return self._max_chars > 0 and self._text_length >= self._max_chars
+
+    def get_content(self) -> Mapping[str, Any]:
+        self._flush_text()
+        content = " ".join(self._texts)
+        if self._max_chars > 0:
+            content = content[: self._max_chars]
+        return {"content": content, "links_on_page": self._links}
+
+    def start(self, tag: str, attrs: Mapping[str, Optional[str]]):
+        self._flush_text()
+        if tag == "a":
+            link = attrs.get("href")
+            if link and not link.startswith("#") and not link.startswith("/"):
+                self._links.append(link)
+        if tag in _IGNORED_TAG:
+            self._ignored_tags.append(tag)
+
+    def end(self, tag: str):
+        self._flush_text()
+        if tag in self._ignored_tags:
+            # Also close ignored tags that were never closed
+            while self._ignored_tags.pop() != tag:
+                pass
+
+    def data(self, text: str):
+        if not self._ignored_tags:
+            self._pending_texts.append(text)
+
+    def close(self):
+        self._flush_text()
+
+    def _flush_text(self):
+        if not self._pending_texts:
+            return
+        text = " ".join("".join(self._pending_texts).split())
+        self._pending_texts = []
+        if text == "" or self.is_done():
+            return
+        self._texts.append(text)
+        self._text_length += len(text) + 1
+
+
+class _StdlibHtmlParser(HTMLParser):
+    def __init__(self, collector: _ContentCollector):
+        super().__init__(convert_charrefs=True)
+        self._collector = collector
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]):
+        self._collector.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, Optional[str]]]):
+        # Self-closing tags (e.g., <br/>) can't contain text
+        self._collector.start(tag, dict(attrs))
+        self._collector.end(tag)
+
+    def handle_endtag(self, tag: str):
+        self._collector.end(tag)
+
+    def handle_data(self, data: str):
+        self._collector.data(data)
+
+
+class HtmlExtractor:
+    """
+    Incremental extraction of the visible text and the links of an HTML page.
+
+    HTML can be fed chunk by chunk, and `is_done` tells when `max_chars`
+    characters of text have been collected, so the caller can stop reading the
+    page. `lxml` is used if it is installed, otherwise the standard library's
+    `html.parser` is used.
+    """
+
+    def __init__(self, max_chars: int = HTML_MAX_CHARS, parser: str = HTML_PARSER):
+        self._collector = _ContentCollector(max_chars)
+        self._is_closed = False
+        if parser == "auto":
+            parser = "lxml" if _is_lxml_available() else "html.parser"
+        self._parser_name = parser
+        if parser == "lxml":
+            from lxml import etree
+
+            self._parser = etree.HTMLParser(
+                target=_LxmlTarget(self._collector), remove_comments=True
+            )
+        elif parser == "html.parser":
+            self._parser = _StdlibHtmlParser(self._collector)
+        else:
+            raise ValueError(f"Unsupported HTML parser: {parser}")
+
+    def get_parser_name(self) -> str:
+        return self._parser_name
+
+    def feed(self, html: str):
+        if not self._is_closed and not self.is_done():
+            self._parser.feed(html)
+
+    def is_done(self) -> bool:
+        return self._collector.is_done()
+
+    def get_content(self) -> Mapping[str, Any]:
+        if not self._is_closed:
+            self._is_closed = True
+            try:
+                self._parser.close()
+            except Exception:
+                # lxml complains about documents without any element
+                pass
+            self._collector.close()
+        return self._collector.get_content()
+
+
+class _LxmlTarget:
+    def __init__(self, collector: _ContentCollector):
+        self._collector = collector
+
+    def start(self, tag: str, attrib: Mapping[str, str]):
+        self._collector.start(tag, attrib)
+
+    def end(self, tag: str):
+        self._collector.end(tag)
+
+    def data(self, data: str):
+        self._collector.data(data)
+
+    def close(self):
+        self._collector.close()
+
+
+def extract_html_content(
+    html: str, max_chars: int = HTML_MAX_CHARS, parser: str = HTML_PARSER
+) -> Mapping[str, Any]:
+    extractor = HtmlExtractor(max_chars=max_chars, parser=parser)
+    extractor.feed(html)
+    return extractor.get_content()
+
+
+@lru_cache(maxsize=1)
+def _is_lxml_available() -> bool:
+    return importlib.util.find_spec("lxml") is not None
@@ -0,0 +1,101 @@
+import asyncio
+import importlib.util
+import weakref
+from collections.abc import AsyncIterator, Mapping
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from ..config import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+    HTTP_TIMEOUT,
+)
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"  # noqa
+
+# A client (and its connection pool) can only be used in the loop that created it
+_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_host_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared HTTP client of the running event loop. Connections are
+    kept alive and reused across tool calls, using HTTP/2 if `h2` is installed.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            follow_redirects=True,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def http_get(
+    url: str,
+    params: Optional[Mapping[str, Any]] = None,
+    headers: Optional[Mapping[str, str]] = None,
+) -> httpx.Response:
+    """
+    GET `url` with the shared client, limiting concurrent requests per host.
+    Raise TimeoutError if the request times out.
+    """
+    async with _get_host_semaphore(urlsplit(url).netloc):
+        try:
+            return await get_http_client().get(url, params=params, headers=headers)
+        except httpx.TimeoutException as exc:
+            raise _get_timeout_error(url, exc) from exc
+
+
+@asynccontextmanager
+async def http_stream(
+    url: str,
+    params: Optional[Mapping[str, Any]] = None,
+    headers: Optional[Mapping[str, str]] = None,
+) -> AsyncIterator[httpx.Response]:
+    """
+    Like `http_get`, but the body is not read, so the caller can stop reading
+    whenever it has enough.
+    """
+    async with _get_host_semaphore(urlsplit(url).netloc):
+        client = get_http_client()
+        try:
+            async with client.stream(
+                "GET", url, params=params, headers=headers
+            ) as resp:
+                yield resp
+        except httpx.TimeoutException as exc:
+            raise _get_timeout_error(url, exc) from exc
+
+
+async def close_http_client():
+    """Close the shared HTTP client of the running event loop."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def _get_timeout_error(url: str, exc: httpx.TimeoutException) -> TimeoutError:
+    # The agent reports TimeoutError as a timeout, not as wrong arguments
+    return TimeoutError(f"Request to {url} timed out ({type(exc).__name__})")
+
+
+def _get_host_semaphore(host: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphores = _host_semaphores.setdefault(loop, {})
+    if host not in semaphores:
+        semaphores[host] = asyncio.Semaphore(HTTP_MAX_CONNECTIONS_PER_HOST)
+    return semaphores[host]
@@ -0,0 +1,60 @@
+import asyncio
+import os
+import signal
+import subprocess
+from collections.abc import Sequence
+from typing import Optional, Union
+
+
+async def run_process(
+    command: Union[str, Sequence[str]],
+    cwd: Optional[str] = None,
+    merge_stderr: bool = False,
+) -> str:
+    """
+    Run a command (a shell command if `command` is a string) and return its
+    output. Raise CalledProcessError on non-zero exit code. The whole process
+    group is killed if the caller is cancelled (e.g., on timeout).
+    """
+    stderr = subprocess.STDOUT if merge_stderr else subprocess.PIPE
+    if isinstance(command, str):
+        process = await asyncio.create_subprocess_shell(
+            command,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            start_new_session=True,
+        )
+    else:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+            start_new_session=True,
+        )
+    try:
+        stdout, stderr_output = await process.communicate()
+    except asyncio.CancelledError:
+        _kill_process_group(process)
+        await process.wait()
+        raise
+    output = stdout.decode(errors="replace")
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode,
+            command,
+            output=output,
+            stderr=None if stderr_output is None else stderr_output.decode(),
+        )
+    return output
+
+
+def _kill_process_group(process: asyncio.subprocess.Process):
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
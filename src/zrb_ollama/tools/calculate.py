@@ -1,6 +1,9 @@
 from typing import Annotated
 
+from ..agent.tool_config import tool_config
 
+
+@tool_config(cacheable=True)
 def calculate(
     formula: Annotated[
         str,
@@ -0,0 +1,85 @@
+import hashlib
+import struct
+from collections.abc import Mapping
+from typing import Any, Optional
+
+from ..cache import DiskCache
+from ..config import RAG_EMBEDDING_CACHE_MAX_SIZE, RAG_EMBEDDING_CACHE_PATH
+
+Embedding = list[float]
+
+
+def _pack_embedding(embedding: Embedding) -> bytes:
+    try:
+        # Half precision is plenty for similarity search, at half the size
+        return b"e" + struct.pack(f"<{len(embedding)}e", *embedding)
+    except OverflowError:
+        return b"f" + struct.pack(f"<{len(embedding)}f", *embedding)
+
+
+def _unpack_embedding(data: bytes) -> Embedding:
+    value_format = chr(data[0])
+    count = (len(data) - 1) // struct.calcsize(value_format)
+    return list(struct.unpack(f"<{count}{value_format}", data[1:]))
+
+
+class EmbeddingCache:
+    """
+    Cache embeddings on disk, keyed on the embedding model and the hash of the
+    embedded text, so that unchanged chunks are never embedded twice, whatever
+    the RAG tool or collection they belong to.
+
+    Embeddings are stored as float16. By default, they are stored in
+    ZRB_OLLAMA_RAG_EMBEDDING_CACHE_PATH.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_size: int = RAG_EMBEDDING_CACHE_MAX_SIZE,
+    ):
+        if path is None:
+            path = RAG_EMBEDDING_CACHE_PATH
+        self._backend = DiskCache(
+            path, max_size=max_size, dumps=_pack_embedding, loads=_unpack_embedding
+        )
+
+    def get_many(self, model: str, texts: list[str]) -> list[Optional[Embedding]]:
+        """Return the cached embedding of every text, or None if it is missing."""
+        results = self._backend.get_many(
+            [self._get_key(model, text) for text in texts]
+        )
+        return [embedding if is_hit else None for is_hit, embedding in results]
+
+    def set_many(self, model: str, texts: list[str], embeddings: list[Embedding]):
+        self._backend.set_many(
+            [
+                (self._get_key(model, text), embedding)
+                for text, embedding in zip(texts, embeddings)
+            ]
+        )
+
+    def get_stats(self) -> Mapping[str, Any]:
+        stats = self._backend.get_stats()
+        lookup_count = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookup_count if lookup_count > 0 else 0
+        return {**stats, "hit_rate": hit_rate}
+
+    def _get_key(self, model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+_default_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_default_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Return the process-wide EmbeddingCache, or None if
+    ZRB_OLLAMA_RAG_EMBEDDING_CACHE_PATH is empty.
+    """
+    global _default_embedding_cache
+    if RAG_EMBEDDING_CACHE_PATH == "":
+        return None
+    if _default_embedding_cache is None:
+        _default_embedding_cache = EmbeddingCache()
+    return _default_embedding_cache
@@ -1,11 +1,16 @@
 import json
 from typing import Annotated
 
-import requests
+from ..agent.tool_config import tool_config
+from ._http import http_get
 
+_LOCATION_URL = "http://ip-api.com/json?fields=lat,lon"
 
-def get_current_location() -> (
+
+@tool_config(cacheable=True, cache_ttl=600)
+async def get_current_location() -> (
     Annotated[str, "JSON string representing latitude and longitude"]
 ):  # noqa
     """Get the user's current location."""
-    return json.dumps(requests.get("http://ip-api.com/json?fields=lat,lon").json())
+    response = await http_get(_LOCATION_URL)
+    return json.dumps(response.json())
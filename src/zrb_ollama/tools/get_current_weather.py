@@ -1,17 +1,21 @@
 import json
 from typing import Literal
 
-import requests
+from ..agent.tool_config import tool_config
+from ._http import http_get
 
+_FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
 
-def get_current_weather(
+
+@tool_config(cacheable=True, cache_ttl=600)
+async def get_current_weather(
     latitude: float,
     longitude: float,
     temperature_unit: Literal["celsius", "fahrenheit"],
 ) -> str:
     """Get the current weather in a given location."""
-    resp = requests.get(
-        "https://api.open-meteo.com/v1/forecast",
+    response = await http_get(
+        _FORECAST_URL,
         params={
             "latitude": latitude,
             "longitude": longitude,
@@ -19,4 +23,4 @@ def get_current_weather(
             "current_weather": True,
         },
     )
-    return json.dumps(resp.json())
+    return json.dumps(response.json())
@@ -1,5 +1,7 @@
 import json
-import subprocess
+
+from ..agent.tool_config import tool_config
+from ._subprocess import run_process
 
 
 def create_get_changes(
@@ -9,18 +11,13 @@ def create_get_changes(
     new_branch: str,
     directory: str,
 ):
-    def get_changes() -> str:
+    async def get_changes() -> str:
         # Fetch the latest changes in the specified directory
-        subprocess.run(["git", "fetch"], cwd=directory, check=True)
+        await run_process(["git", "fetch"], cwd=directory)
         # Get the diff between the two branches in the specified directory
-        result = subprocess.run(
-            ["git", "diff", f"{initial_branch}..{new_branch}"],
-            cwd=directory,
-            capture_output=True,
-            text=True,
-            check=True,
+        diff_output = await run_process(
+            ["git", "diff", f"{initial_branch}..{new_branch}"], cwd=directory
         )
-        diff_output = result.stdout
         # Initialize an empty list to store the dictionaries
         diff_list = []
         # Split the diff output by file
@@ -34,14 +31,9 @@ def create_get_changes(
             # Join the lines to get the full diff for the file
             changes = "\n".join(lines[1:])
             # Get the current content of the file in the new branch
-            file_content_result = subprocess.run(
-                ["git", "show", f"{new_branch}:{file_path}"],
-                cwd=directory,
-                capture_output=True,
-                text=True,
-                check=True,
+            current_content = await run_process(
+                ["git", "show", f"{new_branch}:{file_path}"], cwd=directory
             )
-            current_content = file_content_result.stdout
             # Create a dictionary for the file
             file_dict = {
                 "file_path": file_path,
@@ -54,4 +46,4 @@ def create_get_changes(
 
     get_changes.__name__ = tool_name
     get_changes.__doc__ = tool_description
-    return get_changes
+    return tool_config(max_result_length=16000)(get_changes)
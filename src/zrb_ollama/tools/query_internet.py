@@ -1,22 +1,20 @@
 import json
 from typing import Annotated
 
-import requests
-from bs4 import BeautifulSoup
+from ..agent.tool_config import tool_config
+from ._helper import fetch_html_content
 
-from ._helper import parse_content
+_SEARCH_URL = "https://google.com/search"
 
 
-def query_internet(
+@tool_config(cacheable=True, cache_ttl=3600, max_result_length=8000)
+async def query_internet(
     query: Annotated[str, "Search query"],
     num_results: Annotated[int, "Search result count, by default 10"] = 10,
 ) -> str:
     """Search factual information from the internet by using Google."""
-    response = requests.get(
-        "https://google.com/search",
-        headers={
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"  # noqa
-        },
+    content = await fetch_html_content(
+        _SEARCH_URL,
         params={
             "q": query,
             "num": num_results,
@@ -24,9 +22,4 @@ def query_internet(
             "safe": "off",
         },
     )
-    if response.status_code != 200:
-        raise Exception(
-            f"Error: Unable to retrieve search results (status code: {response.status_code})"  # noqa
-        )
-    soup = BeautifulSoup(response.text, "html.parser")
-    return json.dumps(parse_content(soup))
+    return json.dumps(content)
@@ -1,21 +1,43 @@
+import asyncio
+import gzip
+import hashlib
 import json
 import os
-from collections.abc import Callable, Iterable
+import time
+import weakref
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping
+from typing import Any, Optional
 
-import litellm
 from zrb.helper.accessories.color import colored
 from zrb.helper.callable import run_async
 
+from ..agent.tool_config import tool_config
+from ..cache import MemoryCache
 from ..config import (
     RAG_CHUNK_SIZE,
+    RAG_EMBEDDING_BATCH_SIZE,
+    RAG_EMBEDDING_CONCURRENCY,
     RAG_EMBEDDING_MODEL,
     RAG_MAX_RESULT_COUNT,
     RAG_OVERLAP,
+    RAG_QUERY_EMBEDDING_CACHE_SIZE,
+    RAG_REFRESH_INTERVAL,
 )
+from ..governor import aembedding
+from .embedding_cache import EmbeddingCache, get_default_embedding_cache
 
+# Callables with a `path` attribute (e.g., from `get_rag_documents`) are only
+# read again when the size or the mtime of their file changes, other callables
+# are read on every refresh
 Document = str | Callable[[], str]
 Documents = Callable[[], Iterable[Document]] | Iterable[Document]
 
+_MANIFEST_VERSION = 1
+_DELETE_BATCH_SIZE = 5000
+
+# Agents often ask the same question several times in a session
+_query_embedding_cache = MemoryCache(RAG_QUERY_EMBEDDING_CACHE_SIZE)
+
 
 def create_rag_from_directory(
     tool_name: str,
@@ -27,6 +49,11 @@ def create_rag_from_directory(
     chunk_size: int = RAG_CHUNK_SIZE,
     overlap: int = RAG_OVERLAP,
     max_result_count: int = RAG_MAX_RESULT_COUNT,
+    embedding_batch_size: int = RAG_EMBEDDING_BATCH_SIZE,
+    embedding_concurrency: int = RAG_EMBEDDING_CONCURRENCY,
+    embedding_cache: Optional[EmbeddingCache] = None,
+    refresh_interval: float = RAG_REFRESH_INTERVAL,
+    multi_query: bool = False,
 ):
     return create_rag(
         tool_name=tool_name,
@@ -35,13 +62,14 @@ def create_rag_from_directory(
         model=model,
         vector_db_path=vector_db_path,
         vector_db_collection=vector_db_collection,
-        reset_db=get_rag_reset_db(
-            document_dir_path=os.path.expanduser(document_dir_path),
-            vector_db_path=os.path.expanduser(vector_db_path)
-        ),
         chunk_size=chunk_size,
         overlap=overlap,
         max_result_count=max_result_count,
+        embedding_batch_size=embedding_batch_size,
+        embedding_concurrency=embedding_concurrency,
+        embedding_cache=embedding_cache,
+        refresh_interval=refresh_interval,
+        multi_query=multi_query,
     )
 
 
@@ -56,56 +84,514 @@ def create_rag(
     chunk_size: int = RAG_CHUNK_SIZE,
     overlap: int = RAG_OVERLAP,
     max_result_count: int = RAG_MAX_RESULT_COUNT,
-) -> Callable[[str], str]:
+    embedding_batch_size: int = RAG_EMBEDDING_BATCH_SIZE,
+    embedding_concurrency: int = RAG_EMBEDDING_CONCURRENCY,
+    embedding_cache: Optional[EmbeddingCache] = None,
+    refresh_interval: float = RAG_REFRESH_INTERVAL,
+    multi_query: bool = False,
+) -> Callable[[str], str] | Callable[[list[str]], str]:
+    """
+    Create a RAG tool. The documents are indexed on the first call, and the
+    index is refreshed at most every `refresh_interval` seconds afterward.
+
+    With `multi_query`, the tool takes a list of queries, searches them all at
+    once, and returns the merged results without duplicates.
+    """
+    if embedding_cache is None:
+        embedding_cache = get_default_embedding_cache()
+
+    async def get_collection() -> Any:
+        vector_store = _get_vector_store(vector_db_path)
+        async with vector_store.get_lock():
+            if vector_store.is_refresh_due(vector_db_collection, refresh_interval):
+                await _refresh_collection(
+                    vector_store=vector_store,
+                    collection_name=vector_db_collection,
+                    documents=documents,
+                    reset_db=reset_db,
+                    model=model,
+                    chunk_size=chunk_size,
+                    overlap=overlap,
+                    batch_size=embedding_batch_size,
+                    concurrency=embedding_concurrency,
+                    embedding_cache=embedding_cache,
+                )
+                vector_store.set_refreshed(vector_db_collection)
+        return vector_store.get_collection(vector_db_collection)
+
     async def retrieve(query: str) -> str:
-        import chromadb
-        from chromadb.config import Settings
-        is_db_exist = os.path.isdir(vector_db_path)
-        client = chromadb.PersistentClient(
-            path=vector_db_path, settings=Settings(allow_reset=True)
-        )
-        should_reset_db = await run_async(reset_db) if callable(reset_db) else reset_db
-        if (not is_db_exist) or should_reset_db:
-            client.reset()
-            collection = client.get_or_create_collection(vector_db_collection)
-            chunk_index = 0
-            _print_dark("Scanning documents")
-            docs = await run_async(documents) if callable(documents) else documents
-            for document in docs:
-                if callable(document):
-                    try:
-                        document = await run_async(document)
-                    except Exception as error:
-                        _print_red(f"Error: {error}")
-                        continue
-                for i in range(0, len(document), chunk_size - overlap):
-                    chunk = document[i : i + chunk_size]
-                    if len(chunk) > 0:
-                        _print_dark(f"Vectorizing chunk {chunk_index}")
-                        response = await litellm.aembedding(model=model, input=[chunk])
-                        vector = response["data"][0]["embedding"]
-                        _print_dark(f"Adding chunk {chunk_index} to db")
-                        collection.upsert(
-                            ids=[f"id{chunk_index}"],
-                            embeddings=[vector],
-                            documents=[chunk],
-                        )
-                        chunk_index += 1
-        collection = client.get_or_create_collection(vector_db_collection)
+        collection = await get_collection()
         # Generate embedding for the query
         _print_dark("Vectorize query")
-        query_response = await litellm.aembedding(model=model, input=[query])
+        query_embeddings = await _embed_queries(model, [query])
         _print_dark("Search documents")
         # Search for the top_k most similar documents
         results = collection.query(
-            query_embeddings=query_response["data"][0]["embedding"],
+            query_embeddings=query_embeddings[0],
             n_results=max_result_count,
         )
         return json.dumps(results)
 
-    retrieve.__name__ = tool_name
-    retrieve.__doc__ = tool_description
-    return retrieve
+    async def retrieve_many(queries: list[str]) -> str:
+        queries = list(dict.fromkeys(queries))
+        if len(queries) == 0:
+            raise ValueError("At least one query is required")
+        collection = await get_collection()
+        _print_dark(f"Vectorize {len(queries)} queries")
+        query_embeddings = await _embed_queries(model, queries)
+        _print_dark("Search documents")
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=max_result_count,
+        )
+        return json.dumps(_merge_query_results(results))
+
+    tool = retrieve_many if multi_query else retrieve
+    tool.__name__ = tool_name
+    tool.__doc__ = tool_description
+    return tool_config(max_result_length=8000)(tool)
+
+
+async def _embed_queries(model: str, queries: list[str]) -> list[list[float]]:
+    """Embed the queries in a single request, except those embedded recently."""
+    keys = [f"{model}\n{query}" for query in queries]
+    embeddings = [_query_embedding_cache.get(key) for key in keys]
+    missing_indexes = [
+        index for index, (is_hit, _) in enumerate(embeddings) if not is_hit
+    ]
+    embeddings = [embedding for _, embedding in embeddings]
+    if len(missing_indexes) == 0:
+        return embeddings
+    response = await aembedding(
+        model=model, input=[queries[index] for index in missing_indexes]
+    )
+    missing_embeddings = [
+        item["embedding"]
+        for item in sorted(response["data"], key=lambda item: item.get("index", 0))
+    ]
+    for index, embedding in zip(missing_indexes, missing_embeddings):
+        embeddings[index] = embedding
+        _query_embedding_cache.set(keys[index], embedding)
+    return embeddings
+
+
+def _merge_query_results(results: Mapping[str, Any]) -> dict[str, Any]:
+    """
+    Merge the results of several queries into the results of a single query.
+    Every document appears once, at its best distance, closest documents first.
+    """
+    query_count = len(results["ids"])
+    distances = results.get("distances")
+    # Position of every document, among the results of its best query
+    best_positions: dict[str, tuple[float, int, int]] = {}
+    for query_index, ids in enumerate(results["ids"]):
+        for position, document_id in enumerate(ids):
+            distance = (
+                distances[query_index][position] if distances else float(position)
+            )
+            best_position = best_positions.get(document_id)
+            if best_position is None or distance < best_position[0]:
+                best_positions[document_id] = (distance, query_index, position)
+    ranked_positions = sorted(best_positions.values())
+    merged = {}
+    for key, value in results.items():
+        is_per_query = (
+            isinstance(value, list)
+            and len(value) == query_count
+            and all(isinstance(row, list) for row in value)
+        )
+        if not is_per_query:
+            merged[key] = value
+            continue
+        merged[key] = [
+            [
+                value[query_index][position]
+                for _, query_index, position in ranked_positions
+            ]
+        ]
+    return merged
+
+
+async def _refresh_collection(
+    vector_store: "_VectorStore",
+    collection_name: str,
+    documents: Documents,
+    reset_db: Callable[[], bool] | bool,
+    model: str,
+    chunk_size: int,
+    overlap: int,
+    batch_size: int,
+    concurrency: int,
+    embedding_cache: Optional[EmbeddingCache],
+):
+    should_reset_db = await run_async(reset_db) if callable(reset_db) else reset_db
+    manifest_path = os.path.join(
+        vector_store.path, f"{collection_name}.manifest.json"
+    )
+    settings = {"model": model, "chunk_size": chunk_size, "overlap": overlap}
+    manifest = _load_manifest(manifest_path)
+    # The manifest is stored in the vector database, so a new database has none
+    if should_reset_db or manifest is None or manifest["settings"] != settings:
+        # Chunks indexed with other settings (or unknown IDs) can't be reused
+        vector_store.delete_collection(collection_name)
+        manifest = {
+            "version": _MANIFEST_VERSION,
+            "settings": settings,
+            "sources": {},
+        }
+    docs = await run_async(documents) if callable(documents) else documents
+    await _refresh_index(
+        collection=vector_store.get_collection(collection_name),
+        documents=docs,
+        manifest=manifest,
+        manifest_path=manifest_path,
+        model=model,
+        chunk_size=chunk_size,
+        overlap=overlap,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        embedding_cache=embedding_cache,
+    )
+
+
+async def _refresh_index(
+    collection: Any,
+    documents: Iterable[Document],
+    manifest: dict[str, Any],
+    manifest_path: str,
+    model: str,
+    chunk_size: int,
+    overlap: int,
+    batch_size: int,
+    concurrency: int,
+    embedding_cache: Optional[EmbeddingCache],
+):
+    """
+    Index new and changed documents, and remove the chunks of changed and deleted
+    documents. The manifest records the size, mtime, content hash and chunk IDs of
+    every document, and is saved once the index is up to date.
+    """
+    old_sources = manifest["sources"]
+    new_sources = {}
+    stale_ids = []
+    changed_count = 0
+
+    async def iterate_changed_sources() -> AsyncIterator[tuple[str, str]]:
+        nonlocal changed_count
+        for index, document in enumerate(documents):
+            source_key = _get_source_key(document, index)
+            old_source = old_sources.get(source_key)
+            file_stat = _get_file_stat(document)
+            if (
+                old_source is not None
+                and file_stat is not None
+                and _is_same_stat(old_source, file_stat)
+            ):
+                new_sources[source_key] = old_source
+                continue
+            # Other documents are compared by the hash of their content
+            content = document
+            if callable(document):
+                try:
+                    content = await run_async(document)
+                except Exception as error:
+                    _print_red(f"Error: {error}")
+                    if old_source is not None:
+                        new_sources[source_key] = old_source
+                    continue
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            if old_source is not None and old_source["hash"] == content_hash:
+                new_sources[source_key] = {**old_source, **(file_stat or {})}
+                continue
+            chunk_ids = [
+                _get_chunk_id(source_key, offset)
+                for offset, _ in _iterate_chunks(content, chunk_size, overlap)
+            ]
+            new_sources[source_key] = {
+                **(file_stat or {}),
+                "hash": content_hash,
+                "chunk_ids": chunk_ids,
+            }
+            if old_source is not None:
+                new_chunk_ids = set(chunk_ids)
+                stale_ids.extend(
+                    chunk_id
+                    for chunk_id in old_source["chunk_ids"]
+                    if chunk_id not in new_chunk_ids
+                )
+            changed_count += 1
+            yield source_key, content
+
+    await _index_documents(
+        collection=collection,
+        sources=iterate_changed_sources(),
+        model=model,
+        chunk_size=chunk_size,
+        overlap=overlap,
+        batch_size=batch_size,
+        concurrency=concurrency,
+        embedding_cache=embedding_cache,
+    )
+    deleted_count = 0
+    for source_key, old_source in old_sources.items():
+        if source_key not in new_sources:
+            stale_ids.extend(old_source["chunk_ids"])
+            deleted_count += 1
+    for start in range(0, len(stale_ids), _DELETE_BATCH_SIZE):
+        collection.delete(ids=stale_ids[start : start + _DELETE_BATCH_SIZE])
+    if changed_count > 0 or deleted_count > 0:
+        _print_dark(
+            f"Updated {changed_count} document(s), removed {deleted_count} document(s)"  # noqa
+        )
+    if changed_count > 0 or deleted_count > 0 or new_sources != old_sources:
+        manifest["sources"] = new_sources
+        _save_manifest(manifest_path, manifest)
+
+
+async def _index_documents(
+    collection: Any,
+    sources: AsyncIterator[tuple[str, str]],
+    model: str,
+    chunk_size: int,
+    overlap: int,
+    batch_size: int,
+    concurrency: int,
+    embedding_cache: Optional[EmbeddingCache],
+):
+    """
+    Embed chunks in batches, with up to `concurrency` batches in flight, and add
+    every batch to the collection at once. Chunks found in `embedding_cache` are
+    not embedded again.
+    """
+    progress = _IndexingProgress()
+    pending: set[asyncio.Task] = set()
+    try:
+        async for ids, chunks in _iterate_chunk_batches(
+            sources, chunk_size, overlap, batch_size
+        ):
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    task.result()
+            pending.add(
+                asyncio.create_task(
+                    _index_batch(
+                        collection, model, ids, chunks, embedding_cache, progress
+                    )
+                )
+            )
+        if len(pending) > 0:
+            done, pending = await asyncio.wait(pending)
+            for task in done:
+                task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+    progress.finish()
+
+
+async def _index_batch(
+    collection: Any,
+    model: str,
+    ids: list[str],
+    chunks: list[str],
+    embedding_cache: Optional[EmbeddingCache],
+    progress: "_IndexingProgress",
+):
+    embeddings = [None] * len(chunks)
+    if embedding_cache is not None:
+        embeddings = await asyncio.to_thread(embedding_cache.get_many, model, chunks)
+    missing_indexes = [
+        index for index, embedding in enumerate(embeddings) if embedding is None
+    ]
+    if len(missing_indexes) > 0:
+        missing_chunks = [chunks[index] for index in missing_indexes]
+        response = await aembedding(
+            model=model, input=missing_chunks, priority="background"
+        )
+        missing_embeddings = [
+            item["embedding"]
+            for item in sorted(
+                response["data"], key=lambda item: item.get("index", 0)
+            )
+        ]
+        for index, embedding in zip(missing_indexes, missing_embeddings):
+            embeddings[index] = embedding
+        if embedding_cache is not None:
+            await asyncio.to_thread(
+                embedding_cache.set_many, model, missing_chunks, missing_embeddings
+            )
+    collection.upsert(ids=ids, embeddings=embeddings, documents=chunks)
+    progress.add(len(chunks), len(chunks) - len(missing_indexes))
+
+
+async def _iterate_chunk_batches(
+    sources: AsyncIterator[tuple[str, str]],
+    chunk_size: int,
+    overlap: int,
+    batch_size: int,
+) -> AsyncIterator[tuple[list[str], list[str]]]:
+    ids, chunks = [], []
+    async for source_key, content in sources:
+        for offset, chunk in _iterate_chunks(content, chunk_size, overlap):
+            ids.append(_get_chunk_id(source_key, offset))
+            chunks.append(chunk)
+            if len(chunks) >= batch_size:
+                yield ids, chunks
+                ids, chunks = [], []
+    if len(chunks) > 0:
+        yield ids, chunks
+
+
+def _iterate_chunks(
+    content: str, chunk_size: int, overlap: int
+) -> Iterable[tuple[int, str]]:
+    for offset in range(0, len(content), chunk_size - overlap):
+        chunk = content[offset : offset + chunk_size]
+        if len(chunk) > 0:
+            yield offset, chunk
+
+
+def _get_source_key(document: Document, index: int) -> str:
+    path = getattr(document, "path", None)
+    if path is not None:
+        return os.path.abspath(path)
+    return f"document:{index}"
+
+
+def _get_chunk_id(source_key: str, offset: int) -> str:
+    # Stable across refreshes, so unchanged chunks of a file keep their IDs
+    source_hash = hashlib.sha1(source_key.encode("utf-8")).hexdigest()[:16]
+    return f"{source_hash}-{offset}"
+
+
+def _get_file_stat(document: Document) -> Optional[dict[str, Any]]:
+    path = getattr(document, "path", None)
+    if path is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _is_same_stat(source: dict[str, Any], file_stat: dict[str, Any]) -> bool:
+    return (
+        source.get("size") == file_stat["size"]
+        and source.get("mtime") == file_stat["mtime"]
+    )
+
+
+def _load_manifest(manifest_path: str) -> Optional[dict[str, Any]]:
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except Exception:
+        return None
+    if manifest.get("version") != _MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def _save_manifest(manifest_path: str, manifest: dict[str, Any]):
+    os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f)
+    # An interrupted write never leaves a truncated manifest behind
+    os.replace(temp_path, manifest_path)
+
+
+class _VectorStore:
+    """
+    Long-lived chromadb client of a vector database, with its collections and
+    the time they were last refreshed, shared by every RAG tool using the same
+    `vector_db_path`.
+    """
+
+    def __init__(self, path: str):
+        import chromadb
+        from chromadb.config import Settings
+        self.path = path
+        self._client = chromadb.PersistentClient(
+            path=path, settings=Settings(allow_reset=True)
+        )
+        self._collections: dict[str, Any] = {}
+        self._refreshed_at: dict[str, float] = {}
+        self._locks: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, asyncio.Lock
+        ] = weakref.WeakKeyDictionary()
+
+    def get_lock(self) -> asyncio.Lock:
+        # asyncio locks can't be shared across event loops
+        loop = asyncio.get_running_loop()
+        if loop not in self._locks:
+            self._locks[loop] = asyncio.Lock()
+        return self._locks[loop]
+
+    def get_collection(self, name: str) -> Any:
+        if name not in self._collections:
+            self._collections[name] = self._client.get_or_create_collection(name)
+        return self._collections[name]
+
+    def is_refresh_due(self, name: str, refresh_interval: float) -> bool:
+        if name not in self._refreshed_at:
+            return True
+        return time.monotonic() - self._refreshed_at[name] >= refresh_interval
+
+    def set_refreshed(self, name: str):
+        self._refreshed_at[name] = time.monotonic()
+
+    def delete_collection(self, name: str):
+        self._collections.pop(name, None)
+        self._refreshed_at.pop(name, None)
+        try:
+            self._client.delete_collection(name)
+        except Exception:
+            # The collection does not exist yet
+            pass
+
+
+_vector_stores: dict[str, _VectorStore] = {}
+
+
+def _get_vector_store(vector_db_path: str) -> _VectorStore:
+    path = os.path.abspath(os.path.expanduser(vector_db_path))
+    if path not in _vector_stores:
+        _vector_stores[path] = _VectorStore(path)
+    return _vector_stores[path]
+
+
+class _IndexingProgress:
+    def __init__(self, interval: float = 5):
+        self._interval = interval
+        self._start = time.monotonic()
+        self._last_report = self._start
+        self._chunk_count = 0
+        self._cached_count = 0
+
+    def add(self, chunk_count: int, cached_count: int = 0):
+        self._chunk_count += chunk_count
+        self._cached_count += cached_count
+        now = time.monotonic()
+        if now - self._last_report >= self._interval:
+            self._last_report = now
+            self._report(now, "Indexing")
+
+    def finish(self):
+        if self._chunk_count > 0:
+            self._report(time.monotonic(), "Indexed")
+
+    def _report(self, now: float, caption: str):
+        elapsed = now - self._start
+        rate = self._chunk_count / elapsed if elapsed > 0 else 0
+        details = f"{rate:.1f} chunks/s"
+        if self._cached_count > 0:
+            details += f", {self._cached_count} from embedding cache"
+        _print_dark(f"{caption} {self._chunk_count} chunks ({details})")
 
 
 def get_rag_documents(document_dir_path: str) -> Callable[[], list[Callable[[], str]]]:
@@ -118,6 +604,9 @@ def get_rag_documents(document_dir_path: str) -> Callable[[], list[Callable[[],
                 if file_path.lower().endswith(".pdf"):
                     readers.append(_get_pdf_reader(file_path))
                     continue
+                if file_path.lower().endswith(".gz"):
+                    readers.append(_get_gzip_reader(file_path))
+                    continue
                 readers.append(_get_text_reader(file_path))
         return readers
     return get_documents
@@ -130,6 +619,18 @@ def _get_text_reader(file_path: str):
             content = f.read()
         _print_dark(f"Complete reading {file_path}")
         return content
+    read.path = file_path
+    return read
+
+
+def _get_gzip_reader(file_path: str):
+    def read():
+        _print_dark(f"Start reading {file_path}")
+        with gzip.open(file_path, "rt", encoding="utf-8") as f:
+            content = f.read()
+        _print_dark(f"Complete reading {file_path}")
+        return content
+    read.path = file_path
     return read
 
 
@@ -143,6 +644,7 @@ def _get_pdf_reader(file_path):
                 contents.append(page.extract_text())
         _print_dark(f"Complete reading {file_path}")
         return "\n".join(contents)
+    read.path = file_path
     return read
 
 
@@ -1,9 +1,6 @@
-import subprocess
+from ._subprocess import run_process
 
 
-def run_shell_command(command: str) -> str:
+async def run_shell_command(command: str) -> str:
     """Running a shell command"""
-    output = subprocess.check_output(
-        command, shell=True, stderr=subprocess.STDOUT, text=True
-    )
-    return output
+    return await run_process(command, merge_stderr=True)
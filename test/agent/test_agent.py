@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+import litellm
+from _fake_llm import FakeLLM
+
+from zrb_ollama.agent import Agent, tool_config
+
+
+def add(a: int, b: int) -> int:
+    """Add two numbers"""
+    return a + b
+
+
+@tool_config(max_result_length=100)
+def read_log_file() -> str:
+    """Read the application log"""
+    return "log " * 100
+
+
+def test_read_result_is_only_added_for_tools_with_a_budget():
+    agent = Agent(model="ollama/gemma2", tools=[add], print_fn=lambda text: None)
+    assert "read_result" not in json.dumps(agent.get_system_message())
+    agent = Agent(
+        model="ollama/gemma2", tools=[add, read_log_file], print_fn=lambda text: None
+    )
+    assert "read_result" in json.dumps(agent.get_system_message())
+
+
+def test_native_agent_without_tools_sends_no_tools(monkeypatch):
+    monkeypatch.setattr(litellm, "supports_function_calling", lambda model: True)
+    completion_kwargs = []
+
+    def respond(messages, kwargs):
+        completion_kwargs.append(kwargs)
+        return "Hello"
+
+    agent = Agent(
+        model="gpt-4o", function_call_backend="native", print_fn=lambda text: None
+    )
+    with FakeLLM(responder=respond).install():
+        result = asyncio.run(agent.add_user_message("Hi"))
+    assert result == "Hello"
+    assert "tools" not in completion_kwargs[0]
+    assert "tool_choice" not in completion_kwargs[0]
+
+
+def test_streamed_response_is_printed_line_by_line():
+    content = json.dumps(
+        {
+            "thought": "I know the answer",
+            "function": "finish_conversation",
+            "arguments": {"final_answer": "Hello"},
+        },
+        indent=2,
+    )
+    printed = []
+    agent = Agent(model="ollama/gemma2", stream=True, print_fn=printed.append)
+    with FakeLLM(
+        responder=lambda messages, kwargs: content, stream_chunk_size=3
+    ).install():
+        result = asyncio.run(agent.add_user_message("Hi"))
+    assert result == "Hello"
+    for line in content.split("\n"):
+        assert line in printed
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+from _fake_llm import FakeLLM
+
+from zrb_ollama.agent import BatchRunner
+
+
+def _finish(final_answer: str) -> str:
+    return json.dumps(
+        {
+            "thought": "I know the answer",
+            "function": "finish_conversation",
+            "arguments": {"final_answer": final_answer},
+        }
+    )
+
+
+def _echo(messages, kwargs) -> str:
+    return _finish(f"Answer to {messages[-1]['content']}")
+
+
+def test_concurrency_is_capped():
+    runner = BatchRunner(concurrency=2, print_fn=lambda text: None)
+    in_flight_counts = []
+
+    def respond(messages, kwargs):
+        in_flight_counts.append(runner.get_stats()["in_flight"])
+        return _echo(messages, kwargs)
+
+    prompts = [f"prompt {index}" for index in range(8)]
+    with FakeLLM(responder=respond, latency=0.01).install():
+        results = asyncio.run(runner.run_all(prompts))
+    assert all(result.is_ok() for result in results)
+    assert max(in_flight_counts) == 2
+
+
+def test_failed_prompts_are_retried():
+    runner = BatchRunner(retry=2, retry_interval=0, print_fn=lambda text: None)
+    attempt_counts = {}
+
+    def respond(messages, kwargs):
+        prompt = messages[-1]["content"]
+        attempt_counts[prompt] = attempt_counts.get(prompt, 0) + 1
+        if prompt == "flaky" and attempt_counts[prompt] == 1:
+            raise ConnectionError("Connection reset by peer")
+        if prompt == "broken":
+            raise ConnectionError("Connection refused")
+        return _echo(messages, kwargs)
+
+    with FakeLLM(responder=respond).install():
+        flaky_result, broken_result = asyncio.run(runner.run_all(["flaky", "broken"]))
+    assert flaky_result.is_ok()
+    assert flaky_result.result == "Answer to flaky"
+    assert flaky_result.attempts == 2
+    assert not broken_result.is_ok()
+    assert isinstance(broken_result.error, Exception)
+    assert broken_result.attempts == 3
+    assert runner.get_stats()["retries"] == 3
+
+
+def test_run_all_keeps_the_order_of_the_prompts():
+    runner = BatchRunner(concurrency=4, print_fn=lambda text: None)
+    prompts = [f"prompt {index}" for index in range(12)]
+    with FakeLLM(responder=_echo, latency=0.001, jitter=0.02).install():
+        results = asyncio.run(runner.run_all(prompts))
+    assert [result.index for result in results] == list(range(12))
+    assert [result.result for result in results] == [
+        f"Answer to {prompt}" for prompt in prompts
+    ]
+
+
+def test_stats():
+    printed = []
+    runner = BatchRunner(retry=0, print_fn=printed.append, progress_interval=2)
+
+    def respond(messages, kwargs):
+        if messages[-1]["content"] == "broken":
+            raise ConnectionError("Connection refused")
+        return _echo(messages, kwargs)
+
+    with FakeLLM(responder=respond).install():
+        asyncio.run(runner.run_all(["first", "broken", "second", "third"]))
+    stats = runner.get_stats()
+    assert stats["total"] == 4
+    assert stats["completed"] == 4
+    assert stats["succeeded"] == 3
+    assert stats["failed"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["throughput"] > 0
+    assert any("4/4 done, 1 failed" in text for text in printed)
@@ -0,0 +1,35 @@
+import litellm
+
+from zrb_ollama.agent import ContextWindow
+from zrb_ollama.agent import context_window as context_window_module
+
+
+def _get_model_info(model: str):
+    # Like gpt-4o: `max_tokens` is the output limit, not the context size
+    return {"max_input_tokens": 128000, "max_output_tokens": 16384, "max_tokens": 16384}
+
+
+def test_token_budget_is_based_on_max_input_tokens(monkeypatch):
+    monkeypatch.setattr(context_window_module, "CONTEXT_TOKEN_BUDGET", 0)
+    monkeypatch.setattr(litellm, "get_model_info", _get_model_info)
+    assert ContextWindow().get_token_budget("gpt-4o") == 96000
+
+
+def test_token_budget_falls_back_to_max_tokens(monkeypatch):
+    monkeypatch.setattr(context_window_module, "CONTEXT_TOKEN_BUDGET", 0)
+    monkeypatch.setattr(litellm, "get_model_info", lambda model: {"max_tokens": 8192})
+    assert ContextWindow().get_token_budget("ollama/gemma2") == 6144
+
+
+def test_token_budget_for_unknown_model(monkeypatch):
+    def get_model_info(model: str):
+        raise Exception(f"Unknown model: {model}")
+
+    monkeypatch.setattr(context_window_module, "CONTEXT_TOKEN_BUDGET", 0)
+    monkeypatch.setattr(litellm, "get_model_info", get_model_info)
+    assert ContextWindow().get_token_budget("unknown/model") == 6144
+
+
+def test_explicit_max_tokens(monkeypatch):
+    monkeypatch.setattr(litellm, "get_model_info", _get_model_info)
+    assert ContextWindow(max_tokens=1000).get_token_budget("gpt-4o") == 1000
@@ -0,0 +1,28 @@
+import gzip
+import json
+import os
+import time
+
+from zrb_ollama.agent.conversation_log import ConversationLogWriter
+
+
+def _write_log_file(path: str, mtime: float):
+    with open(path, "w", encoding="utf-8") as log_file:
+        log_file.write(json.dumps({"role": "user", "content": "Hi"}) + "\n")
+    os.utime(path, (mtime, mtime))
+
+
+def test_only_settled_previous_files_are_compressed(tmp_path):
+    settled_file_name = str(tmp_path / "2020-01-01.jsonl")
+    active_file_name = str(tmp_path / "2020-01-02.jsonl")
+    _write_log_file(settled_file_name, time.time() - 3600)
+    # e.g., another session flushed its last records of yesterday
+    _write_log_file(active_file_name, time.time())
+    writer = ConversationLogWriter(str(tmp_path), print_fn=lambda text: None)
+    writer.write({"role": "user", "content": "Hello"})
+    writer.close()
+    assert not os.path.exists(settled_file_name)
+    with gzip.open(f"{settled_file_name}.gz", "rt", encoding="utf-8") as log_file:
+        assert json.loads(log_file.read()) == {"role": "user", "content": "Hi"}
+    assert os.path.exists(active_file_name)
+    assert not os.path.exists(f"{active_file_name}.gz")
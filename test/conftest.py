@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests reuse the fake LLM backend of the benchmarks
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmarks")
+)
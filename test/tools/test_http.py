@@ -0,0 +1,157 @@
+import asyncio
+import importlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from _fake_llm import FakeLLM
+
+from zrb_ollama.agent import Agent
+from zrb_ollama.tools import _http, get_current_location
+
+# The package exports the tool under the same name as its module
+get_current_location_module = importlib.import_module(
+    "zrb_ollama.tools.get_current_location"
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.client_ports.add(self.client_address[1])
+        if self.path.startswith("/slow"):
+            time.sleep(1)
+        body = json.dumps({"lat": -7.25, "lon": 112.75}).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            # The client gave up
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.client_ports = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def server_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_client_is_reused_across_calls(server_url):
+    async def get_twice():
+        client = _http.get_http_client()
+        first_response = await _http.http_get(f"{server_url}/")
+        second_response = await _http.http_get(f"{server_url}/")
+        is_reused = _http.get_http_client() is client
+        await _http.close_http_client()
+        return first_response.json(), second_response.json(), is_reused
+
+    first_result, second_result, is_reused = asyncio.run(get_twice())
+    assert first_result == second_result == {"lat": -7.25, "lon": 112.75}
+    assert is_reused
+
+
+def test_connections_are_kept_alive(server, server_url):
+    async def get_twice():
+        await _http.http_get(f"{server_url}/")
+        await _http.http_get(f"{server_url}/")
+        await _http.close_http_client()
+
+    asyncio.run(get_twice())
+    # Both requests were sent over the same connection
+    assert len(server.client_ports) == 1
+
+
+def test_timeout_raises_timeout_error(server_url, monkeypatch):
+    monkeypatch.setattr(_http, "HTTP_TIMEOUT", 0.1)
+
+    async def get_slow():
+        try:
+            await _http.http_get(f"{server_url}/slow")
+        finally:
+            await _http.close_http_client()
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(get_slow())
+
+
+def test_timeout_is_reported_to_the_llm(server_url, monkeypatch):
+    monkeypatch.setattr(_http, "HTTP_TIMEOUT", 0.1)
+    monkeypatch.setattr(
+        get_current_location_module, "_LOCATION_URL", f"{server_url}/slow"
+    )
+
+    responses = iter(
+        [
+            json.dumps(
+                {
+                    "thought": "I need the location",
+                    "function": "get_current_location",
+                    "arguments": {},
+                }
+            ),
+            json.dumps(
+                {
+                    "thought": "The location is unavailable",
+                    "function": "finish_conversation",
+                    "arguments": {"final_answer": "I don't know"},
+                }
+            ),
+        ]
+    )
+
+    async def ask():
+        agent = Agent(
+            model="ollama/gemma2",
+            tools=[get_current_location],
+            print_fn=lambda text: None,
+        )
+        try:
+            await agent.add_user_message("Where am I?")
+        finally:
+            await _http.close_http_client()
+        return agent.get_previous_messages()
+
+    with FakeLLM(responder=lambda messages, kwargs: next(responses)).install():
+        messages = asyncio.run(ask())
+    errors = [
+        json.loads(message["content"])
+        for message in messages
+        if "function_call_error" in message["content"]
+    ]
+    assert len(errors) == 1
+    assert errors[0]["error"]["error"] == "EXECUTION FAILED"
+    assert "timed out" in errors[0]["error"]["details"]
+    assert "Narrow down" in errors[0]["error"]["required_action"]
+
+
+def test_close_http_client_resets_the_client(server_url):
+    async def get_clients():
+        client = _http.get_http_client()
+        await _http.close_http_client()
+        new_client = _http.get_http_client()
+        await _http.close_http_client()
+        return client, new_client
+
+    client, new_client = asyncio.run(get_clients())
+    assert client.is_closed
+    assert new_client is not client
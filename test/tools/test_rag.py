@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+from _fake_llm import FakeLLM
+
+from zrb_ollama.tools import EmbeddingCache, create_rag
+
+chromadb = pytest.importorskip("chromadb")
+
+
+def test_refresh_is_throttled_across_tool_instances(tmp_path):
+    read_count = 0
+
+    def read_document() -> str:
+        nonlocal read_count
+        read_count += 1
+        return "John Titor introduced himself as a time traveler from 2036."
+
+    def create_tool():
+        return create_rag(
+            tool_name="retrieve",
+            tool_description="Look for John Titor's information",
+            documents=[read_document],
+            vector_db_path=str(tmp_path / "chroma"),
+            embedding_cache=EmbeddingCache(str(tmp_path / "embedding-cache.db")),
+            refresh_interval=3600,
+        )
+
+    with FakeLLM().install():
+        asyncio.run(create_tool()("Who is John Titor?"))
+        # e.g., LLMTask creates its tools again on every run
+        asyncio.run(create_tool()("Who is John Titor?"))
+    assert read_count == 1